@@ -1,6 +1,4 @@
 # backtest.py
-import queue
-import time
 import os
 import sys
 
@@ -10,16 +8,18 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 # ----------------
 
-from src.data_handler import HistoricSQLDataHandler
+from src.data_handler import MemmapDataHandler
 from src.strategy import BuyAndHoldStrategy
 from src.portfolio import Portfolio
 from src.execution import SimulatedExecutionHandler
+from src.event import EventQueue, EventType
+from src.backtest import BacktestEngine
 
 def run_backtest():
     print("--- Starting Backtest Simulation ---")
     
     # 1. Configuration
-    events = queue.Queue()
+    events = EventQueue()
     db_path = os.path.join(current_dir, 'data', 'market_data.db')
     
     # We use 'ABBV' because we know your database has data for it (from the previous test)
@@ -30,7 +30,7 @@ def run_backtest():
 
     # 2. Initialize Components
     # Data Feed
-    data = HistoricSQLDataHandler(events, db_path, symbol_list)
+    data = MemmapDataHandler(events, db_path, symbol_list)
     
     # Portfolio (The Wallet)
     portfolio = Portfolio(data, events, start_date, initial_capital=initial_capital)
@@ -39,56 +39,26 @@ def run_backtest():
     strategy = BuyAndHoldStrategy(data, events)
     
     # Broker (The Execution)
-    broker = SimulatedExecutionHandler(events)
+    broker = SimulatedExecutionHandler(events, data)
     
     # 3. The Main Event Loop
     print("Engine Running...")
-    
-    while True:
-        # A. Update the Market (Tick)
-        if data.continue_backtest:
-            data.update_bars()
-        else:
-            break # End of data
-        
-        # B. Handle Events
-        while True:
-            try:
-                event = events.get(False) # Non-blocking get
-            except queue.Empty:
-                break
-            
-            if event.type == 'MARKET':
-                strategy.calculate_signals(event)
-                portfolio.update_timeindex()
-
-            elif event.type == 'SIGNAL':
-                portfolio.update_signal(event)
-
-            elif event.type == 'ORDER':
-                broker.execute_order(event)
-
-            elif event.type == 'FILL':
-                # Quick Fix: The Sim Broker didn't put a price on the fill.
-                # We fetch the current price from DataHandler to "simulate" execution at current price.
-                latest_bar = data.get_latest_bar(event.symbol)
-                if latest_bar is not None:
-                    # latest_bar is (timestamp, row)
-                    fill_price = latest_bar[1]['Close']
-                    event.fill_cost = fill_price
-                    
-                portfolio.update_fill(event)
-                
-                print(f"Trade Executed: {event.direction} {event.quantity} {event.symbol} @ ${event.fill_cost:.2f}")
+    engine = BacktestEngine(data, strategy, portfolio, broker, events)
+    engine.add_listener(EventType.FILL, lambda event: print(
+        f"Trade Executed: {event.direction} {event.quantity} {event.symbol} @ ${event.fill_cost:.2f}"
+    ))
+    engine.run()
 
     # 4. Results
     print("\n--- Backtest Complete ---")
     final_value = portfolio.current_holdings['Total']
     print(f"Final Portfolio Value: ${final_value:,.2f}")
     
-    # Simple return calculation
-    ret = ((final_value - initial_capital) / initial_capital) * 100.0
-    print(f"Return: {ret:.2f}%")
+    stats = portfolio.stats.summary()
+    print(f"Return: {stats['total_return'] * 100:.2f}%")
+    print(f"Volatility: {stats['volatility'] * 100:.2f}% | Sharpe: {stats['sharpe']:.2f} | Sortino: {stats['sortino']:.2f}")
+    print(f"Max Drawdown: {stats['max_drawdown'] * 100:.2f}%")
+    print(f"Exposure: {stats['exposure'] * 100:.1f}% | Turnover: {stats['turnover']:.1f}x per year")
 
 if __name__ == "__main__":
     run_backtest()
\ No newline at end of file
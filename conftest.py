@@ -0,0 +1,69 @@
+# conftest.py
+# Data factories shared by the test modules (import them from here)
+import sqlite3
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from src.backtest import BacktestEngine
+from src.data_handler import HistoricArrayDataHandler
+from src.event import EventQueue
+from src.execution import SimulatedExecutionHandler
+from src.portfolio import Portfolio
+from src.price_store import ensure_price_table
+
+def make_db(path, frames):
+    """
+    Writes {ticker: DataFrame(OHLCV, index=Date)} into a fresh 'prices' table.
+    """
+    rows = []
+    for ticker, df in frames.items():
+        df = df.copy()
+        df['Ticker'] = ticker
+        rows.append(df.reset_index())
+    data = pd.concat(rows)[['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume']]
+    with sqlite3.connect(path) as conn:
+        data.to_sql('prices', conn, index=False)
+    # The explicit migration step (the handlers only read)
+    engine = create_engine(f'sqlite:///{path}')
+    ensure_price_table(engine)
+    engine.dispose()
+    return str(path)
+
+def make_bars(dates, start=50.0, seed=0):
+    rng = np.random.default_rng(seed)
+    close = start + np.cumsum(rng.normal(0, 1, len(dates)))
+    return pd.DataFrame({
+        'Open': close - 0.5,
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': rng.integers(1_000, 10_000, len(dates)).astype(float),
+    }, index=pd.DatetimeIndex(dates, name='Date'))
+
+def make_pair(dates, hedge_ratio=1.055, seed=3):
+    """
+    X is a random walk, Y = hedge_ratio * X plus a mean-reverting spread.
+    """
+    rng = np.random.default_rng(seed)
+    x = make_bars(dates, start=60.0, seed=seed)
+    spread = np.zeros(len(dates))
+    for t in range(1, len(dates)):
+        spread[t] = 0.8 * spread[t - 1] + rng.normal(0, 1)
+    y = x.copy()
+    for field in ['Open', 'High', 'Low', 'Close']:
+        y[field] = hedge_ratio * x[field] + spread
+    return x, y
+
+def run_engine(db_path, symbols, strategy_cls, portfolio_cls=Portfolio, **kwargs):
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, symbols, **kwargs)
+    portfolio = portfolio_cls(data, events, '2020-01-01', initial_capital=100000.0)
+    strategy = strategy_cls(data, events)
+    broker = SimulatedExecutionHandler(events, data)
+    BacktestEngine(data, strategy, portfolio, broker, events).run()
+    return data, portfolio
+
+def make_pair_db(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    x, y = make_pair(dates)
+    return make_db(tmp_path / 'prices.db', {'XOM': x, 'CVX': y})
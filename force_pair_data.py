@@ -1,13 +1,16 @@
 # force_pair_data.py
 import yfinance as yf
 import pandas as pd
-from sqlalchemy import create_engine, text
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.data_loader import MarketDataEngine
 
 def force_download():
-    # 1. Setup Database Connection
-    db_path = os.path.join(os.getcwd(), 'data', 'market_data.db')
-    engine = create_engine(f'sqlite:///{db_path}')
+    # 1. Setup Database Connection (data/market_data.db)
+    data_engine = MarketDataEngine()
     
     tickers = ['XOM', 'CVX']
     print("--- Force Downloading Data (Robust Mode) ---")
@@ -35,8 +38,6 @@ def force_download():
         # Debug: Print columns to be sure
         # print(f"  - Columns found: {df.columns.tolist()}")
 
-        df['Ticker'] = ticker
-        
         # Ensure 'Close' exists. 
         if 'Close' not in df.columns:
             print(f"  - Warning: 'Close' column missing. Trying to rename 'Adj Close'...")
@@ -48,7 +49,7 @@ def force_download():
             
         # Select strictly the columns we need
         # We iterate and check existence to avoid KeyErrors
-        target_cols = ['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume']
+        target_cols = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
         available_cols = [c for c in target_cols if c in df.columns]
         df = df[available_cols]
         
@@ -56,15 +57,13 @@ def force_download():
         original_len = len(df)
         df = df.dropna(subset=['Close'])
         
-        # 2. Delete old broken data for this ticker
-        print(f"  - Deleting old data for {ticker}...")
-        with engine.connect() as conn:
-            conn.execute(text(f"DELETE FROM prices WHERE Ticker = '{ticker}'"))
-            conn.commit()
-
-        # 3. Save new clean data
+        # 2. Save the clean data through the typed upsert: every stored
+        # (Ticker, Date) row is overwritten with the fresh values, and
+        # the price cache is invalidated
         print(f"  - Saving {len(df)} valid rows (dropped {original_len - len(df)} Empty/NaN)...")
-        df.to_sql('prices', engine, if_exists='append', index=False)
+        data = pd.concat({ticker: df.set_index('Date')}, axis=1)
+        data.columns.names = ['Ticker', 'Price']
+        data_engine.save_to_sql(data)
         print("  - Success.")
 
     print("\n--- Data Repair Complete ---")
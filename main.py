@@ -11,8 +11,9 @@ print(f"--- [DEBUG] 2. Path set to: {current_dir} ---")
 
 try:
     print("--- [DEBUG] 3. Attempting to import modules ---")
-    from src.sp500_tickers import get_sp500_tickers
+    from src.sp500_tickers import get_cached_sp500_tickers
     from src.data_loader import MarketDataEngine
+    from src.downloader import UniverseDownloader
     print("--- [DEBUG] 4. Imports successful ---")
 except ImportError as e:
     print(f"CRITICAL IMPORT ERROR: {e}")
@@ -23,7 +24,9 @@ def run_pipeline():
     
     # 1. Get the universe
     print("Attempting to fetch tickers...")
-    tickers = get_sp500_tickers()
+    # Served from data/sp500_tickers.json when fresh; a stale list is
+    # refreshed in the background while we keep going
+    tickers = get_cached_sp500_tickers()
     
     if not tickers:
         print("CRITICAL ERROR: No tickers found. Exiting.")
@@ -31,22 +34,20 @@ def run_pipeline():
 
     print(f"Successfully found {len(tickers)} tickers.")
     
-    # Test with just 5 tickers first
-    subset_tickers = tickers[:5] 
-    print(f"Downloading data for: {subset_tickers}")
-    
     # 2. Initialize Engine
     data_engine = MarketDataEngine()
     
-    # 3. Download Data
-    raw_data = data_engine.download_data(subset_tickers)
+    # 3. Download and Store Data for the whole universe
+    # Each ticker starts after its last stored date, so a daily run only
+    # fetches the new bars (new tickers start from 2020-01-01). Chunks run
+    # concurrently and are saved as they finish; rerunning after a crash
+    # skips the tickers that already completed.
+    downloader = UniverseDownloader(data_engine, chunk_size=50, max_workers=4)
+    summary = downloader.run(tickers, start_date='2020-01-01')
     
-    # 4. Store Data
-    if not raw_data.empty:
-        data_engine.save_to_sql(raw_data)
-        print("--- [DEBUG] 6. Pipeline Complete! ---")
-    else:
-        print("No data fetched.")
+    if summary['failed']:
+        print(f"Failed tickers (rerun to retry): {summary['failed']}")
+    print("--- [DEBUG] 6. Pipeline Complete! ---")
 
 if __name__ == "__main__":
     run_pipeline()
\ No newline at end of file
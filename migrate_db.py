@@ -0,0 +1,18 @@
+# migrate_db.py
+import os
+import sys
+
+# --- PATH FIX ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+# ----------------
+
+from src.data_loader import MarketDataEngine
+
+# The data handlers only read the prices table and refuse the old untyped
+# schema written by to_sql. Run this once to migrate data/market_data.db
+# (downloads through MarketDataEngine migrate it as well).
+if __name__ == "__main__":
+    db_name = sys.argv[1] if len(sys.argv) > 1 else 'market_data.db'
+    MarketDataEngine(db_name).migrate()
+    print("Prices table is on the typed schema.")
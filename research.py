@@ -30,6 +30,8 @@ def check_cointegration():
     df = pd.merge(df_xom, df_cvx, left_index=True, right_index=True)
     
     # --- CRITICAL FIX: Force data to be numeric ---
+    # This reads SQLite directly, so a database still on the old untyped
+    # schema can hold text or NULLs here.
     # Coerce errors will turn non-numbers into NaN (which we can then drop)
     df['Close_XOM'] = pd.to_numeric(df['Close_XOM'], errors='coerce')
     df['Close_CVX'] = pd.to_numeric(df['Close_CVX'], errors='coerce')
@@ -11,13 +11,9 @@ def get_pairs_data():
 
     engine = MarketDataEngine()
 
-    df = engine.download_data(tickers , start_date = '2020-01-01')
-
-    if not df.empty:
-        engine.save_to_sql(df)
-        print("---Data Ready for Module 3 ---")
-    else:
-        print("Error downloading data.")
+    # Only fetches the dates missing since the last run
+    engine.update_data(tickers , start_date = '2020-01-01')
+    print("---Data Ready for Module 3 ---")
 
 if __name__ == "__main__":
     get_pairs_data()
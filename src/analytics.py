@@ -0,0 +1,176 @@
+# src/analytics.py
+import math
+
+import numpy as np
+
+# Bars per year used to annualize (daily bars)
+PERIODS_PER_YEAR = 252
+
+# Returns are per bar: r_t = equity_t / equity_{t-1} - 1, with the initial
+# capital standing in for the equity before the first bar. Volatility is
+# the sample std (ddof=1), Sharpe and Sortino use a zero risk-free rate,
+# and the downside deviation is sqrt(mean(min(r, 0)^2)) over all bars.
+# Exposure is the average of gross market value / equity, and turnover
+# is the traded notional per year as a multiple of the average equity.
+
+def _divide(a, b):
+    """
+    a / b, or inf / NaN when b is zero (as NumPy divides).
+    """
+    if b:
+        return a / b
+    return math.copysign(math.inf, a) if a else math.nan
+
+def max_drawdown(equity):
+    """
+    Largest peak-to-trough fall of an equity curve, as a fraction of the peak.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / peaks))
+
+def _ratios(n, mean, var, downside_sq, periods_per_year):
+    """
+    Annualized volatility, Sharpe and Sortino from return moments
+    (NaN where undefined).
+    """
+    volatility = sharpe = sortino = math.nan
+    if n > 1:
+        std = math.sqrt(max(var, 0.0))
+        volatility = std * math.sqrt(periods_per_year)
+        if std > 0:
+            sharpe = mean / std * math.sqrt(periods_per_year)
+    if n > 0 and downside_sq > 0:
+        sortino = mean / math.sqrt(downside_sq / n) * math.sqrt(periods_per_year)
+    return volatility, sharpe, sortino
+
+def performance_stats(equity, initial_capital, gross_exposure=None, traded_notional=None,
+                      periods_per_year=PERIODS_PER_YEAR):
+    """
+    Batch statistics of one equity curve (e.g. a sweep or vectorized
+    backtest result), the same numbers PerformanceStats gives online.
+
+    equity: Equity per bar
+    gross_exposure: Optional gross market value per bar
+    traded_notional: Optional traded notional per bar (or the total)
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    n = len(equity)
+    final_value = float(equity[-1]) if n else float(initial_capital)
+
+    returns = np.diff(equity, prepend=initial_capital) / np.concatenate(([initial_capital], equity[:-1]))
+    mean = float(returns.mean()) if n else 0.0
+    var = float(returns.var(ddof=1)) if n > 1 else math.nan
+    downside_sq = float(np.sum(np.minimum(returns, 0.0) ** 2))
+    volatility, sharpe, sortino = _ratios(n, mean, var, downside_sq, periods_per_year)
+
+    exposure = turnover = 0.0
+    if n:
+        if gross_exposure is not None:
+            exposure = float(np.mean(np.asarray(gross_exposure, dtype=np.float64) / equity))
+        if traded_notional is not None:
+            turnover = float(np.sum(traded_notional)) / float(equity.mean()) * periods_per_year / n
+
+    return {
+        'final_value': final_value,
+        'total_return': (final_value - initial_capital) / initial_capital,
+        'volatility': volatility,
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'max_drawdown': max_drawdown(equity),
+        'exposure': exposure,
+        'turnover': turnover,
+    }
+
+class PerformanceStats:
+    """
+    Online version of performance_stats(): the Portfolio feeds it the
+    equity and gross exposure of each bar and the notional of each fill,
+    and every statistic is available at any time.
+
+    It keeps running sums only (a Welford mean/variance of the returns,
+    the downside sum of squares, the running peak), so an update is O(1)
+    and no history is needed.
+    """
+    def __init__(self, initial_capital, periods_per_year=PERIODS_PER_YEAR):
+        self.initial_capital = initial_capital
+        self.periods_per_year = periods_per_year
+        self.bars = 0
+        self.equity = float(initial_capital)   # Equity at the last bar
+        self.peak = -math.inf
+        self.max_drawdown = 0.0
+        self.traded_notional = 0.0
+        self._mean = 0.0         # Mean return
+        self._m2 = 0.0           # Sum of squared deviations of the returns
+        self._downside_sq = 0.0  # Sum of min(r, 0)^2
+        self._exposure_sum = 0.0
+        self._equity_sum = 0.0
+
+    def update(self, equity, gross_exposure=0.0):
+        """
+        Records one bar's equity and gross market value.
+        Zero equity gives an inf or NaN return (and ratios), the values
+        performance_stats() gets for the same curve.
+        """
+        equity = float(equity)
+        r = _divide(equity, self.equity) - 1.0
+        self.equity = equity
+        self.bars += 1
+
+        # 1. Return moments (Welford)
+        delta = r - self._mean
+        self._mean += delta / self.bars
+        self._m2 += delta * (r - self._mean)
+        if r < 0:
+            self._downside_sq += r * r
+
+        # 2. Drawdown from the running peak
+        if equity > self.peak:
+            self.peak = equity
+        drawdown = _divide(self.peak - equity, self.peak)
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+
+        # 3. Exposure and average equity
+        self._exposure_sum += _divide(gross_exposure, equity)
+        self._equity_sum += equity
+
+    def add_trade(self, notional):
+        """
+        Records the absolute notional of one fill.
+        """
+        self.traded_notional += abs(notional)
+
+    @property
+    def total_return(self):
+        return (self.equity - self.initial_capital) / self.initial_capital
+
+    @property
+    def exposure(self):
+        return self._exposure_sum / self.bars if self.bars else 0.0
+
+    @property
+    def turnover(self):
+        if not self.bars:
+            return 0.0
+        return _divide(self.traded_notional, self._equity_sum / self.bars) * self.periods_per_year / self.bars
+
+    def summary(self):
+        """
+        Every statistic, with the keys of performance_stats().
+        """
+        var = self._m2 / (self.bars - 1) if self.bars > 1 else math.nan
+        volatility, sharpe, sortino = _ratios(self.bars, self._mean, var,
+                                              self._downside_sq, self.periods_per_year)
+        return {
+            'final_value': self.equity,
+            'total_return': self.total_return,
+            'volatility': volatility,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'max_drawdown': self.max_drawdown,
+            'exposure': self.exposure,
+            'turnover': self.turnover,
+        }
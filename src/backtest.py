@@ -1,96 +1,112 @@
-# backtest.py
-import queue
-import time
-import os
-import sys
+# src/backtest.py
+from src.event import EventType
 
-# --- PATH FIX ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(current_dir)
-# ----------------
+class BacktestEngine:
+    """
+    The event loop shared by every backtest script.
 
-from src.data_handler import HistoricSQLDataHandler
-from src.strategy import BuyAndHoldStrategy
-from src.portfolio import Portfolio
-from src.execution import SimulatedExecutionHandler
+    Each tick the DataHandler pushes a MARKET event; the loop then drains
+    the queue, routing MARKET -> Strategy + Portfolio, SIGNAL -> Portfolio,
+    ORDER -> ExecutionHandler and FILL -> Portfolio. The ExecutionHandler's
+    flush() then fills the bar's orders in one batch; orders it fills at
+    the next Open come from open_bar() and are handled before the
+    strategy and portfolio see the new bar. Everything runs on
+    one thread, so the queue is a lock-free EventQueue (deque) rather than
+    queue.Queue. Handlers sit in a dispatch table indexed by the event's
+    integer type code, so routing an event is one list lookup.
+    """
+    def __init__(self, data, strategy, portfolio, broker, events):
+        """
+        data: DataHandler
+        strategy: Strategy (calculate_signals)
+        portfolio: Portfolio
+        broker: ExecutionHandler
+        events: The EventQueue shared by all components
+        """
+        self.data = data
+        self.strategy = strategy
+        self.portfolio = portfolio
+        self.broker = broker
+        self.events = events
 
-def run_backtest():
-    print("--- Starting Backtest Simulation ---")
-    
-    # 1. Configuration
-    events = queue.Queue()
-    db_path = os.path.join(current_dir, 'data', 'market_data.db')
-    
-    # We need to find valid tickers again (just like in our test)
-    # Ideally, we would ask the DB, but let's hardcode 'ABBV' since we know it works
-    # OR you can use the DB lookup trick if you prefer.
-    symbol_list = ['ABBV'] 
-    
-    initial_capital = 100000.0
-    start_date = '2020-01-01'
-    heartbeat = 0.0 # No sleep time for backtest (run as fast as possible)
+        # Dispatch table: handlers[event.type] handles the event
+        self.handlers = [None] * len(EventType)
+        self.handlers[EventType.MARKET] = self._on_market
+        self.handlers[EventType.SIGNAL] = self._on_signal
+        self.handlers[EventType.ORDER] = self._on_order
+        self.handlers[EventType.FILL] = self._on_fill
 
-    # 2. Initialize Components
-    # Data Feed
-    data = HistoricSQLDataHandler(events, db_path, symbol_list)
-    
-    # Portfolio (The Wallet)
-    portfolio = Portfolio(data, events, start_date, initial_capital=initial_capital)
-    
-    # Strategy (The Brain)
-    strategy = BuyAndHoldStrategy(data, events)
-    
-    # Broker (The Execution)
-    broker = SimulatedExecutionHandler(events)
-    
-    # 3. The Main Event Loop
-    print("Engine Running...")
-    
-    while True:
-        # A. Update the Market (Tick)
-        if data.continue_backtest:
-            data.update_bars()
-        else:
-            break # End of data
-        
-        # B. Handle Events
-        while True:
-            try:
-                event = events.get(False) # Non-blocking get
-            except queue.Empty:
-                break
-            
-            if event.type == 'MARKET':
-                strategy.calculate_signals(event)
-                portfolio.update_timeindex()
+        # Extra callbacks run after the built-in handling (e.g. UI updates),
+        # indexed the same way
+        self.listeners = [[] for _ in EventType]
+
+        self.bars_processed = 0
+        self.events_processed = 0
+
+    def add_listener(self, event_type, callback):
+        """
+        Calls callback(event) after every event of event_type is handled.
+        event_type: EventType (or its name, e.g. 'FILL')
+        """
+        if isinstance(event_type, str):
+            event_type = EventType[event_type]
+        self.listeners[event_type].append(callback)
+        # Wrap the handler once here, so events without listeners pay nothing
+        handler = self.handlers[event_type]
+        listeners = self.listeners[event_type]
+        if len(listeners) == 1:
+            def notify(event):
+                handler(event)
+                for callback in listeners:
+                    callback(event)
+            self.handlers[event_type] = notify
+
+    def _on_market(self, event):
+        # Fills due at this bar's Open go first, so the strategy and the
+        # bar's holdings already include them
+        if self.broker.open_bar():
+            self._drain()
+        self.strategy.calculate_signals(event)
+        self.portfolio.update_timeindex()
+        self.bars_processed += 1
 
-            elif event.type == 'SIGNAL':
-                portfolio.update_signal(event)
+    def _on_signal(self, event):
+        self.portfolio.update_signal(event)
 
-            elif event.type == 'ORDER':
-                broker.execute_order(event)
+    def _on_order(self, event):
+        self.broker.execute_order(event)
 
-            elif event.type == 'FILL':
-                # Quick Fix: The Sim Broker didn't put a price on the fill.
-                # We fetch the current price from DataHandler to "simulate" execution at current price.
-                latest_bar = data.get_latest_bar(event.symbol)
-                if latest_bar is not None:
-                    # latest_bar is (timestamp, row)
-                    fill_price = latest_bar[1]['Close']
-                    event.fill_cost = fill_price
-                    
-                portfolio.update_fill(event)
-                
-                print(f"Trade Executed: {event.direction} {event.quantity} {event.symbol} @ ${event.fill_cost}")
+    def _on_fill(self, event):
+        self.portfolio.update_fill(event)
+
+    def _drain(self):
+        """
+        Handles queued events until the queue is empty.
+        """
+        events = self.events
+        handlers = self.handlers
+        while events:
+            event = events.popleft()
+            handlers[event.type](event)
+            self.events_processed += 1
+
+    def run(self):
+        """
+        Runs until the DataHandler runs out of bars.
+        Returns the Portfolio.
+        """
+        while True:
+            # A. Update the Market (Tick)
+            if self.data.continue_backtest:
+                self.data.update_bars()
+            else:
+                break # End of data
 
-    # 4. Results
-    print("\n--- Backtest Complete ---")
-    final_value = portfolio.current_holdings['Total']
-    print(f"Final Portfolio Value: ${final_value:,.2f}")
-    
-    # simple return calc
-    ret = ((final_value - initial_capital) / initial_capital) * 100.0
-    print(f"Return: {ret:.2f}%")
+            # B. Handle Events, then let the broker fill the bar's
+            # orders in one batch (and handle those fills)
+            while True:
+                self._drain()
+                if not self.broker.flush():
+                    break
 
-if __name__ == "__main__":
-    run_backtest()
\ No newline at end of file
+        return self.portfolio
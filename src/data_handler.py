@@ -1,17 +1,86 @@
 # src/data_handler.py
-import pandas as pd
-from sqlalchemy import create_engine, text
-import os
+import collections
+import datetime
+import queue
+import threading
+import numpy as np
+from sqlalchemy import create_engine
 from src.event import MarketEvent
+from src.indicators import IndicatorRegistry
+from src.price_store import (
+    BAR_FIELDS, check_price_table, iter_prices_by_date, read_prices, read_prices_frame, ticker_bounds
+)
+from src.price_cache import default_cache_dir, build_price_cache, open_price_cache
+from src.ring_buffer import RingBuffer
+
+# Column layout used by the array-backed handlers (one row per field of BAR_FIELDS)
+FIELD_INDEX = {field: i for i, field in enumerate(BAR_FIELDS)}
+
+# Bars of history kept per symbol by the streaming-style handlers
+DEFAULT_HISTORY = 1000
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def _to_datetime(stamp):
+    """
+    Converts an int64 nanosecond timestamp into a plain datetime,
+    without going through pandas.
+    """
+    return _EPOCH + datetime.timedelta(microseconds=int(stamp) // 1000)
 
 class DataHandler:
     """
     DataHandler is an abstract base class providing an interface for
     all subsequent (inherited) data handlers (both live and historic).
     """
+    # Shared IndicatorRegistry, created on first use of 'indicators'
+    _indicators = None
+
+    @property
+    def indicators(self):
+        """
+        IndicatorRegistry updated by this handler once per tick.
+        """
+        if self._indicators is None:
+            self._indicators = IndicatorRegistry(self)
+        return self._indicators
+
     def get_latest_bar(self, symbol):
         raise NotImplementedError("Should implement get_latest_bar()")
 
+    def get_latest_bars(self, symbol, n, field='Close'):
+        raise NotImplementedError("Should implement get_latest_bars()")
+
+    def get_latest_bar_values(self, field='Close'):
+        """
+        Latest 'field' of every symbol as one array, in symbol_list
+        order (NaN where get_latest_bar() has no bar). Handlers with
+        array storage override this with a single gather.
+        """
+        values = np.full(len(self.symbol_list), np.nan)
+        for i, symbol in enumerate(self.symbol_list):
+            bar = self.get_latest_bar(symbol)
+            if bar is not None:
+                values[i] = bar[1][field]
+        return values
+
+    def get_snapshot(self):
+        """
+        The current cross-section as a Snapshot. Handlers with array
+        storage override this with a single gather.
+        """
+        values = np.full((len(self.symbol_list), len(BAR_FIELDS)), np.nan)
+        present = np.zeros(len(self.symbol_list), dtype=bool)
+        timestamp = None
+        for i, symbol in enumerate(self.symbol_list):
+            latest = self.get_latest_bar(symbol)
+            if latest is not None:
+                dt, bar = latest
+                values[i] = [bar[f] for f in BAR_FIELDS]
+                present[i] = True
+                timestamp = dt if timestamp is None else max(timestamp, dt)
+        return Snapshot(timestamp, self.symbol_list, values, present)
+
     def update_bars(self):
         raise NotImplementedError("Should implement update_bars()")
 
@@ -20,23 +89,29 @@ class HistoricSQLDataHandler(DataHandler):
     HistoricSQLDataHandler is designed to read a SQL database for
     each requested symbol and provide an interface to obtain the
     "latest" bar in a manner identical to a live trading interface.
+    Only the last 'history' bars are kept per symbol, so memory stays
+    flat however long the backtest runs.
     """
-    def __init__(self, events_queue, db_path, symbol_list):
+    def __init__(self, events_queue, db_path, symbol_list, history=DEFAULT_HISTORY):
         """
         events_queue: The Queue object where we push 'MARKET' events.
         db_path: Path to the SQLite database.
         symbol_list: List of ticker symbols (e.g., ['AAPL', 'MSFT'])
+        history: Number of recent bars kept per symbol
         """
         self.events_queue = events_queue
         self.db_path = db_path
         self.symbol_list = symbol_list
+        self.history = history
         
         self.symbol_data = {} # Stores all loaded data (Iterators)
-        self.latest_symbol_data = {} # Stores the list of bars we have "seen" so far
+        self.latest_symbol_data = {} # Stores the last 'history' bars we have "seen"
+        self.bar_buffers = {} # OHLCV ring buffers behind get_latest_bars()
         self.continue_backtest = True       
         
         # Connect to DB
         self.engine = create_engine(f'sqlite:///{db_path}')
+        check_price_table(self.engine)
         
         # Load the data immediately
         self._load_data()
@@ -48,10 +123,11 @@ class HistoricSQLDataHandler(DataHandler):
         print("Loading data from database...")
         combined_index = None
         
+        # One bulk query for the whole symbol list, split per symbol in memory
+        frames = read_prices(self.engine, self.symbol_list)
+        
         for symbol in self.symbol_list:
-            # Load data for this symbol
-            query = text(f"SELECT * FROM prices WHERE Ticker = '{symbol}' ORDER BY Date ASC")
-            self.symbol_data[symbol] = pd.read_sql(query, self.engine, index_col='Date', parse_dates=['Date'])
+            self.symbol_data[symbol] = frames[symbol]
             
             # Combine index to align dates
             if combined_index is None:
@@ -62,8 +138,9 @@ class HistoricSQLDataHandler(DataHandler):
             # Create a generator (iterator)
             self.symbol_data[symbol] = self.symbol_data[symbol].iterrows()
             
-            # Initialize container for the latest bar
-            self.latest_symbol_data[symbol] = []
+            # Initialize containers for the latest bars
+            self.latest_symbol_data[symbol] = collections.deque(maxlen=self.history)
+            self.bar_buffers[symbol] = RingBuffer(self.history, shape=(len(BAR_FIELDS),))
 
     def _get_new_bar(self, symbol):
         """
@@ -94,6 +171,20 @@ class HistoricSQLDataHandler(DataHandler):
             print(f"Symbol {symbol} not found in data.")
             return None
 
+    def get_latest_bars(self, symbol, n, field='Close'):
+        """
+        Returns the last n values of 'field' (oldest first) as a NumPy
+        view into the symbol's ring buffer. Fewer than n values come back
+        early in the backtest. The view is only valid until the next
+        update_bars(); copy it to keep it.
+        """
+        try:
+            buffer = self.bar_buffers[symbol]
+        except KeyError:
+            print(f"Symbol {symbol} not found in data.")
+            return None
+        return buffer.latest(n)[FIELD_INDEX[field]]
+
     def update_bars(self):
         """
         Pushes the latest bar to the latest_symbol_data structure
@@ -107,9 +198,617 @@ class HistoricSQLDataHandler(DataHandler):
                     timestamp, row = bar
                     # We store just the row Series in the list
                     self.latest_symbol_data[symbol].append(row)
+                    self.bar_buffers[symbol].append([row.get(f, np.nan) for f in BAR_FIELDS])
             except StopIteration:
                 self.continue_backtest = False
         
         # If backtest is still going, trigger a Market Event
         if self.continue_backtest:
-            self.events_queue.put(MarketEvent())
\ No newline at end of file
+            if self._indicators is not None:
+                self._indicators.update()
+            self.events_queue.put(MarketEvent())
+
+
+class Snapshot:
+    """
+    The cross-section at one tick: the latest bar of every symbol as
+    aligned arrays, for strategies that rank or filter a whole universe
+    with NumPy instead of one get_latest_bar() call per symbol.
+    """
+    __slots__ = ('timestamp', 'symbols', 'values', 'present')
+
+    def __init__(self, timestamp, symbols, values, present):
+        """
+        timestamp: datetime of the tick (None before the first one)
+        symbols: Symbol of each row (the handler's symbol_list)
+        values: (symbols x fields) float array, columns in BAR_FIELDS
+                order, NaN where a symbol has no bar
+        present: Bool per symbol, True where get_latest_bar() has a bar
+        """
+        self.timestamp = timestamp
+        self.symbols = symbols
+        self.values = values
+        self.present = present
+
+    def __getitem__(self, field):
+        """
+        One field across all symbols, e.g. snapshot['Close'].
+        """
+        return self.values[:, FIELD_INDEX[field]]
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+class Bar:
+    """
+    A lightweight, read-only view of one bar inside a columnar store.
+    It answers bar['Close'] and bar.name the same way a pandas row does,
+    but only holds a reference to the array and a row number.
+    """
+    __slots__ = ('_values', '_row', '_stamp')
+
+    def __init__(self, values, row, stamp):
+        """
+        values: 2D array shaped (fields x rows), see BAR_FIELDS
+        row: Column of 'values' holding this bar
+        stamp: int64 nanosecond timestamp of the bar
+        """
+        self._values = values
+        self._row = row
+        self._stamp = stamp
+
+    def __getitem__(self, field):
+        return self._values[FIELD_INDEX[field], self._row]
+
+    @property
+    def name(self):
+        return _to_datetime(self._stamp)
+
+    def __repr__(self):
+        fields = ', '.join(f"{f}={self[f]}" for f in BAR_FIELDS)
+        return f"Bar({self.name}, {fields})"
+
+
+class BarHistory:
+    """
+    Read-only sequence of the bars a symbol has "seen" so far.
+    Stands in for the list of Series kept by HistoricSQLDataHandler,
+    so code reading latest_symbol_data[symbol][-1]['Close'] keeps working.
+    """
+    __slots__ = ('_handler', '_index')
+
+    def __init__(self, handler, index):
+        self._handler = handler
+        self._index = index
+
+    def __len__(self):
+        row = self._handler._rows[self._index]
+        if row < 0:
+            return 0
+        return int(row - self._handler._offsets[self._index]) + 1
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("bar index out of range")
+        row = int(self._handler._offsets[self._index]) + i
+        return Bar(self._handler._values, row, self._handler._stamps[row])
+
+
+class HistoricArrayDataHandler(HistoricSQLDataHandler):
+    """
+    Columnar variant of HistoricSQLDataHandler.
+
+    OHLCV for every symbol lives in one contiguous NumPy block
+    (fields x rows, symbols stored back to back) and the feed advances an
+    integer cursor instead of building a pandas Series per bar.
+    get_latest_bar() still returns (timestamp, bar) and bar['Close'] works
+    like a pandas row, so strategies and the Portfolio run unchanged.
+
+    Master-clock mode (clock='union' or 'intersection') steps every
+    symbol over one shared timeline, so the cross-section is aligned at
+    each tick and the feed runs until the timeline ends. A symbol with no
+    bar at a tick is forward-filled (fill_policy='ffill') or reported as
+    missing by get_latest_bar() (fill_policy='skip').
+
+    The whole history is already held in the store, so get_latest_bars()
+    slices it directly instead of keeping a separate ring buffer.
+    """
+    CLOCKS = (None, 'union', 'intersection')
+    FILL_POLICIES = ('ffill', 'skip')
+
+    def __init__(self, events_queue, db_path, symbol_list, clock=None, fill_policy='ffill'):
+        """
+        clock: None (each symbol advances on its own, stop at the shortest
+               series), 'union' or 'intersection' of all timestamps
+        fill_policy: 'ffill' or 'skip' for symbols missing a bar on the clock
+        """
+        if clock not in self.CLOCKS:
+            raise ValueError(f"clock must be one of {self.CLOCKS}, got {clock!r}")
+        if fill_policy not in self.FILL_POLICIES:
+            raise ValueError(f"fill_policy must be one of {self.FILL_POLICIES}, got {fill_policy!r}")
+        self.clock = clock
+        self.fill_policy = fill_policy
+        super().__init__(events_queue, db_path, symbol_list)
+
+    def _load_data(self):
+        """
+        Loads every symbol from SQL and packs it into the columnar store.
+        """
+        print("Loading data from database...")
+        # The bulk query returns rows sorted by (Ticker, Date), so each
+        # symbol is already a contiguous block of rows.
+        frame = read_prices_frame(self.engine, self.symbol_list)
+        bounds = ticker_bounds(frame)
+
+        stamps = frame['Date'].to_numpy().astype('datetime64[ns]').view(np.int64)
+        values = np.ascontiguousarray(
+            frame.reindex(columns=BAR_FIELDS).to_numpy(dtype=np.float64).T
+        )
+        offsets = np.array([bounds.get(s, (0, 0))[0] for s in self.symbol_list], dtype=np.int64)
+        lengths = np.array([bounds.get(s, (0, 0))[1] for s in self.symbol_list], dtype=np.int64)
+        self._build_store(stamps, values, offsets, lengths)
+
+    def _build_store(self, stamps, values, offsets, lengths):
+        """
+        stamps: int64 nanosecond timestamps, one per row
+        values: float array shaped (fields x rows)
+        offsets/lengths: Where each symbol's rows start and how many it has
+        (same order as symbol_list)
+        """
+        self._stamps = stamps
+        self._values = values
+        self._offsets = offsets
+        self._lengths = lengths
+        self._symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+
+        # _tick_rows[t, j] is the row of symbol j's latest bar at tick t (-1 = none yet)
+        # _tick_present[t, j] is False when that bar is older than the tick
+        self.timeline = None
+        self._tick_rows, self._tick_present = self._build_clock()
+        self.rewind()
+
+        for i, symbol in enumerate(self.symbol_list):
+            self.latest_symbol_data[symbol] = BarHistory(self, i)
+
+    def _build_clock(self):
+        """
+        Precomputes which row every symbol shows at every tick, so
+        update_bars() only has to move a cursor.
+        """
+        if self.clock is None:
+            # Every symbol advances one row per tick, and the feed ends with
+            # the shortest series (same behaviour as HistoricSQLDataHandler).
+            n_ticks = int(self._lengths.min()) if len(self._lengths) else 0
+            tick_rows = self._offsets[np.newaxis, :] + np.arange(n_ticks, dtype=np.int64)[:, np.newaxis]
+            return tick_rows, np.ones(tick_rows.shape, dtype=bool)
+
+        per_symbol = [self._stamps[o:o + n] for o, n in zip(self._offsets, self._lengths)]
+        if not per_symbol:
+            timeline = np.empty(0, dtype=np.int64)
+        elif self.clock == 'union':
+            timeline = np.unique(np.concatenate(per_symbol))
+        else:
+            timeline = np.unique(per_symbol[0])
+            for stamps in per_symbol[1:]:
+                timeline = np.intersect1d(timeline, stamps)
+        self.timeline = timeline
+
+        n_ticks, n_symbols = len(timeline), len(per_symbol)
+        tick_rows = np.empty((n_ticks, n_symbols), dtype=np.int64)
+        tick_present = np.empty((n_ticks, n_symbols), dtype=bool)
+        for j, stamps in enumerate(per_symbol):
+            if len(stamps) == 0:
+                tick_rows[:, j] = -1
+                tick_present[:, j] = False
+                continue
+            # Latest bar at or before each tick (one merged pass per symbol)
+            pos = np.searchsorted(stamps, timeline, side='right') - 1
+            has_bar = pos >= 0
+            tick_rows[:, j] = np.where(has_bar, self._offsets[j] + pos, -1)
+            tick_present[:, j] = has_bar & (stamps[np.maximum(pos, 0)] == timeline)
+        return tick_rows, tick_present
+
+    def rewind(self, events_queue=None):
+        """
+        Restarts the feed at the first tick, reusing the loaded store,
+        so several backtests can run on one load.
+        events_queue: Queue for the next run (default: keep the current one)
+        """
+        if events_queue is not None:
+            self.events_queue = events_queue
+        self._rows = np.full(len(self.symbol_list), -1, dtype=np.int64)
+        self._present = np.zeros(len(self.symbol_list), dtype=bool)
+        self._cursor = 0
+        self.continue_backtest = True
+        if self._indicators is not None:
+            self._indicators.reset()
+
+    def get_aligned_field(self, field='Close'):
+        """
+        The whole run at once: a (symbols x ticks) array whose column t
+        holds the value latest_symbol_data[s][-1][field] has after the
+        (t+1)-th update_bars() call, NaN where a symbol has no bar yet.
+        Meant for vectorized research (see src/vectorized.py).
+        """
+        rows = self._tick_rows.T
+        values = self._values[FIELD_INDEX[field]][np.maximum(rows, 0)].astype(np.float64)
+        values[rows < 0] = np.nan
+        return values
+
+    @property
+    def current_time(self):
+        """
+        Timestamp of the current tick on the master clock
+        (None before the first tick or without a clock).
+        """
+        if self.timeline is None or self._cursor == 0:
+            return None
+        return _to_datetime(self.timeline[self._cursor - 1])
+
+    def get_latest_bar(self, symbol):
+        """
+        Returns: (Date, Bar) or None
+        """
+        try:
+            i = self._symbol_index[symbol]
+        except KeyError:
+            print(f"Symbol {symbol} not found in data.")
+            return None
+
+        row = int(self._rows[i])
+        if row < 0:
+            return None
+        if self.fill_policy == 'skip' and not self._present[i]:
+            return None
+        stamp = self._stamps[row]
+        return (_to_datetime(stamp), Bar(self._values, row, stamp))
+
+    def get_latest_bars(self, symbol, n, field='Close'):
+        """
+        Returns the last n values of 'field' seen so far (oldest first)
+        as a NumPy view into the store, without copying.
+        """
+        try:
+            i = self._symbol_index[symbol]
+        except KeyError:
+            print(f"Symbol {symbol} not found in data.")
+            return None
+
+        end = int(self._rows[i]) + 1
+        start = max(int(self._offsets[i]), end - n)
+        if end <= 0:
+            start = end = 0
+        return self._values[FIELD_INDEX[field], start:end]
+
+    def get_latest_bar_values(self, field='Close'):
+        """
+        Latest 'field' of every symbol in one gather from the store
+        (NaN where get_latest_bar() would return None).
+        """
+        rows = self._rows
+        missing = rows < 0
+        if self.fill_policy == 'skip':
+            missing = missing | ~self._present
+        values = self._values[FIELD_INDEX[field]][np.maximum(rows, 0)]
+        return np.where(missing, np.nan, values)
+
+    def get_snapshot(self):
+        """
+        The current cross-section, gathered from the store in one step.
+        """
+        rows = self._rows
+        present = rows >= 0
+        if self.fill_policy == 'skip':
+            present = present & self._present
+        values = self._values[:, np.maximum(rows, 0)].T.astype(np.float64)
+        values[~present] = np.nan
+
+        if self.timeline is not None:
+            timestamp = self.current_time
+        elif present.any():
+            # No master clock: each symbol is on its own row; report the latest
+            timestamp = _to_datetime(self._stamps[rows[present]].max())
+        else:
+            timestamp = None
+        return Snapshot(timestamp, self.symbol_list, values, present)
+
+    def update_bars(self):
+        """
+        Moves the cursor one tick forward and triggers a Market Event.
+        """
+        if self._cursor >= len(self._tick_rows):
+            self.continue_backtest = False
+            return
+
+        self._rows = self._tick_rows[self._cursor]
+        self._present = self._tick_present[self._cursor]
+        self._cursor += 1
+        if self._indicators is not None:
+            self._indicators.update()
+        self.events_queue.put(MarketEvent())
+
+
+class MemmapDataHandler(HistoricArrayDataHandler):
+    """
+    HistoricArrayDataHandler that reads from the memory-mapped price
+    cache (see src/price_cache.py) instead of SQLite.
+
+    Opening the cache only maps the files; the OS pages bars in lazily
+    as the backtest touches them, so start-up takes milliseconds however
+    large the table is. If no valid cache exists it is built from db_path
+    first.
+    """
+    def __init__(self, events_queue, db_path, symbol_list, cache_dir=None,
+                 clock=None, fill_policy='ffill'):
+        """
+        db_path: SQLite database the cache is built from (if needed)
+        cache_dir: Cache location, defaults to data/price_cache/
+        clock, fill_policy: See HistoricArrayDataHandler
+        """
+        self.cache_dir = cache_dir or default_cache_dir(db_path)
+        super().__init__(events_queue, db_path, symbol_list, clock=clock, fill_policy=fill_policy)
+
+    def _load_data(self):
+        """
+        Maps the cache files and points the store at them (no copy).
+        """
+        cache = open_price_cache(self.cache_dir, self.db_path)
+        if cache is None:
+            build_price_cache(self.db_path, self.cache_dir)
+            cache = open_price_cache(self.cache_dir)
+
+        manifest, stamps, values = cache
+        if tuple(manifest['fields']) != BAR_FIELDS:
+            raise ValueError(f"Price cache fields {manifest['fields']} do not match {BAR_FIELDS}")
+
+        bounds = manifest['symbols']
+        offsets = np.array([bounds.get(s, (0, 0))[0] for s in self.symbol_list], dtype=np.int64)
+        lengths = np.array([bounds.get(s, (0, 0))[1] for s in self.symbol_list], dtype=np.int64)
+        self._build_store(stamps, values, offsets, lengths)
+
+
+class StreamingBarHistory:
+    """
+    Read-only sequence over the ring buffer of a StreamingSQLDataHandler
+    symbol, so latest_symbol_data[symbol][-1]['Close'] keeps working.
+    """
+    __slots__ = ('_handler', '_index')
+
+    def __init__(self, handler, index):
+        self._handler = handler
+        self._index = index
+
+    def __len__(self):
+        first = self._handler._first_tick[self._index]
+        if first < 0:
+            return 0
+        return min(self._handler._ticks - int(first), len(self._handler._bars))
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("bar index out of range")
+        buffer = self._handler._bars
+        col = buffer.head + buffer.capacity - (n - i)
+        # The symbol's own bar stamp (older than the tick when forward-filled)
+        stamp = self._handler._symbol_stamps.data[self._index, col]
+        return Bar(self._handler._bar_views[self._index], col, stamp)
+
+
+class StreamingSQLDataHandler(DataHandler):
+    """
+    Streams prices from SQL in date-ordered chunks instead of loading
+    every symbol's full history up front.
+
+    A background thread reads and converts the next chunk(s) while the
+    engine consumes the current one, so peak memory is bounded by
+    chunksize x prefetch plus the 'history' ring buffer, not by the
+    length of the data. Symbols are stepped over the union of their
+    dates; a symbol without a bar on a date keeps its last bar
+    (same as HistoricArrayDataHandler with clock='union').
+
+    Call close() (or use the handler as a context manager) to stop the
+    reader early, e.g. when a backtest is abandoned before the data ends.
+    """
+    def __init__(self, events_queue, db_path, symbol_list, chunksize=50000,
+                 history=DEFAULT_HISTORY, prefetch=2):
+        """
+        chunksize: Rows read from SQL per chunk
+        history: Ticks of (forward-filled) OHLCV kept for get_latest_bars()
+        prefetch: Chunks the reader thread may hold ready ahead of the engine
+        """
+        self.events_queue = events_queue
+        self.db_path = db_path
+        self.symbol_list = symbol_list
+        self.chunksize = chunksize
+        self.history = history
+        self.continue_backtest = True
+
+        self.engine = create_engine(f'sqlite:///{db_path}')
+        check_price_table(self.engine)
+
+        n_symbols = len(symbol_list)
+        self._symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        self._latest = np.full((n_symbols, len(BAR_FIELDS)), np.nan)
+        self._last_stamp = np.full(n_symbols, -1, dtype=np.int64)
+        self._first_tick = np.full(n_symbols, -1, dtype=np.int64)
+        self._ticks = 0
+
+        # One cross-section per tick, time on the last axis
+        self._bars = RingBuffer(history, shape=(n_symbols, len(BAR_FIELDS)))
+        self._stamps = RingBuffer(history, dtype=np.int64)
+        # Each symbol's own bar stamp per tick, for latest_symbol_data
+        self._symbol_stamps = RingBuffer(history, shape=(n_symbols,), dtype=np.int64)
+        self._bar_views = [self._bars.data[j] for j in range(n_symbols)]
+        self.latest_symbol_data = {s: StreamingBarHistory(self, j) for s, j in self._symbol_index.items()}
+
+        # Current chunk and position inside it
+        self._chunk = None
+        self._group = 0
+
+        self._chunks = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._reader = threading.Thread(target=self._read_chunks, daemon=True)
+        self._reader.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self, timeout=5.0):
+        """
+        Stops the reader thread and releases its database connection.
+        The handler reports no more bars afterwards.
+        """
+        self._stop.set()
+        self._reader.join(timeout)
+        self.engine.dispose()
+        self.continue_backtest = False
+
+    def _put(self, item):
+        """
+        Hands an item to the engine, waiting while the prefetch queue is
+        full. Returns False if close() was called meanwhile.
+        """
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read_chunks(self):
+        """
+        Background thread: reads SQL chunks, converts them to arrays and
+        hands over only complete dates (the trailing date of a chunk may
+        continue in the next one, so it is carried over).
+        """
+        frames = iter_prices_by_date(self.engine, self.symbol_list, self.chunksize)
+        try:
+            carry = None
+            for frame in frames:
+                if self._stop.is_set():
+                    return
+                if frame.empty:
+                    continue
+                stamps = frame['Date'].to_numpy().astype('datetime64[ns]').view(np.int64)
+                ids = frame['Ticker'].map(self._symbol_index).to_numpy(dtype=np.int64)
+                values = frame.reindex(columns=BAR_FIELDS).to_numpy(dtype=np.float64)
+                if carry is not None:
+                    stamps = np.concatenate((carry[0], stamps))
+                    ids = np.concatenate((carry[1], ids))
+                    values = np.concatenate((carry[2], values))
+
+                cut = int(np.searchsorted(stamps, stamps[-1], side='left'))
+                carry = (stamps[cut:], ids[cut:], values[cut:])
+                if cut > 0 and not self._put(self._make_chunk(stamps[:cut], ids[:cut], values[:cut])):
+                    return
+
+            if carry is not None and not self._put(self._make_chunk(*carry)):
+                return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+        finally:
+            # Closes the SQL cursor and returns the connection
+            frames.close()
+
+    @staticmethod
+    def _make_chunk(stamps, ids, values):
+        """
+        Splits a date-sorted block of rows into per-date groups.
+        """
+        starts = np.flatnonzero(np.diff(stamps)) + 1
+        bounds = np.concatenate(([0], starts, [len(stamps)]))
+        return stamps, ids, values, bounds
+
+    def _next_group(self):
+        """
+        Returns (stamp, symbol ids, values) for the next date, or None
+        once the stream is exhausted.
+        """
+        while self._chunk is None or self._group >= len(self._chunk[3]) - 1:
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if chunk is None:
+                return None
+            self._chunk, self._group = chunk, 0
+
+        stamps, ids, values, bounds = self._chunk
+        start, end = bounds[self._group], bounds[self._group + 1]
+        self._group += 1
+        return stamps[start], ids[start:end], values[start:end]
+
+    def get_latest_bar(self, symbol):
+        """
+        Returns: (Date, Bar) or None
+        """
+        try:
+            j = self._symbol_index[symbol]
+        except KeyError:
+            print(f"Symbol {symbol} not found in data.")
+            return None
+
+        stamp = self._last_stamp[j]
+        if stamp < 0:
+            return None
+        col = self._bars.head + self._bars.capacity - 1
+        return (_to_datetime(stamp), Bar(self._bar_views[j], col, stamp))
+
+    def get_latest_bars(self, symbol, n, field='Close'):
+        """
+        Returns the last n values of 'field' (oldest first, one per tick)
+        as a view into the ring buffer; valid until the next update_bars().
+        """
+        try:
+            j = self._symbol_index[symbol]
+        except KeyError:
+            print(f"Symbol {symbol} not found in data.")
+            return None
+        n = min(n, len(self.latest_symbol_data[symbol]))
+        return self._bars.latest(n)[j, FIELD_INDEX[field]]
+
+    def get_latest_bar_values(self, field='Close'):
+        """
+        Latest 'field' of every symbol (already held as one array).
+        """
+        return self._latest[:, FIELD_INDEX[field]].copy()
+
+    def get_snapshot(self):
+        """
+        The current cross-section (already held as one array).
+        """
+        present = self._last_stamp >= 0
+        timestamp = _to_datetime(self._stamps.last()) if self._ticks else None
+        return Snapshot(timestamp, self.symbol_list, self._latest.copy(), present)
+
+    def update_bars(self):
+        """
+        Applies the next date's bars and triggers a Market Event.
+        """
+        group = self._next_group()
+        if group is None:
+            self.continue_backtest = False
+            return
+
+        stamp, ids, values = group
+        self._latest[ids] = values
+        self._last_stamp[ids] = stamp
+        self._first_tick[ids[self._first_tick[ids] < 0]] = self._ticks
+        self._bars.append(self._latest)
+        self._stamps.append(stamp)
+        self._symbol_stamps.append(self._last_stamp)
+        self._ticks += 1
+        if self._indicators is not None:
+            self._indicators.update()
+        self.events_queue.put(MarketEvent())
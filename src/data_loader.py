@@ -1,8 +1,9 @@
 # src/data_loader.py
 import yfinance as yf
 import pandas as pd
-from sqlalchemy import create_engine
 import os
+from src.price_store import create_price_engine, ensure_price_table, get_high_water_marks, upsert_prices
+from src.price_cache import default_cache_dir, invalidate_price_cache
 
 class MarketDataEngine:
     def __init__(self, db_name='market_data.db'):
@@ -24,6 +25,7 @@ class MarketDataEngine:
             
         # 5. Build the full database path
         db_path = os.path.join(data_dir, db_name)
+        self.db_path = db_path
         
         # 6. Create the Connection String
         # SQLite needs 3 slashes /// for relative, 4 //// for absolute paths on Unix/Mac
@@ -31,7 +33,17 @@ class MarketDataEngine:
         self.db_url = f'sqlite:///{db_path}'
         
         print(f"--- [DEBUG] Database URL: {self.db_url} ---")
-        self.engine = create_engine(self.db_url)
+        # Writer engine: WAL, synchronous=NORMAL and a larger page cache
+        self.engine = create_price_engine(db_path)
+
+    def migrate(self):
+        """
+        Creates the typed prices table, or migrates a legacy to_sql table
+        into it (the data handlers only read and refuse the old schema).
+        """
+        ensure_price_table(self.engine)
+        # The rows were rewritten, so the memory-mapped price cache is stale
+        invalidate_price_cache(default_cache_dir(self.db_path))
 
     def download_data(self, tickers, start_date='2020-01-01', end_date=None):
         """
@@ -80,9 +92,44 @@ class MarketDataEngine:
         available_cols = [c for c in target_cols if c in data_stacked.columns]
         data_stacked = data_stacked[available_cols]
         
+        # 4. Upsert on (Ticker, Date): existing rows are updated, new rows added,
+        # and tickers that are not in this batch are left untouched
         print(f"Saving {len(data_stacked)} rows to database...")
-        data_stacked.to_sql('prices', self.engine, if_exists='replace', index=False)
-        print("Data saved successfully!")
+        saved = upsert_prices(self.engine, data_stacked)
+        
+        # 5. The memory-mapped price cache is now stale
+        invalidate_price_cache(default_cache_dir(self.db_path))
+        print(f"Data saved successfully! ({saved} rows upserted)")
+
+    def update_data(self, tickers, start_date='2020-01-01', end_date=None):
+        """
+        Incremental refresh: downloads only the dates after each ticker's
+        high-water mark (last stored Date) and upserts them.
+        Tickers that are not stored yet are fetched from start_date.
+        Tickers sharing the same start date are downloaded together.
+        """
+        last_dates = get_high_water_marks(self.engine, tickers)
+        end = pd.Timestamp(end_date) if end_date is not None else pd.Timestamp.today().normalize()
+        
+        # Group tickers by the first date they are missing
+        groups = {}
+        for ticker in tickers:
+            if ticker in last_dates:
+                start = last_dates[ticker].normalize() + pd.Timedelta(days=1)
+            else:
+                start = pd.Timestamp(start_date)
+            if start > end:
+                continue # Already up to date
+            groups.setdefault(start, []).append(ticker)
+        
+        if not groups:
+            print("All tickers are up to date.")
+            return
+        
+        for start, group in sorted(groups.items()):
+            print(f"Updating {len(group)} tickers from {start.date()}...")
+            data = self.download_data(group, start_date=start.strftime('%Y-%m-%d'), end_date=end_date)
+            self.save_to_sql(data)
     
 
 if __name__ == "__main__":
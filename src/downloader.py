@@ -0,0 +1,211 @@
+# src/downloader.py
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import yfinance as yf
+from sqlalchemy import text
+
+from src.price_store import get_high_water_marks
+
+PROGRESS_TABLE = 'download_progress'
+
+def yfinance_fetch(ticker, start_date, end_date=None):
+    """
+    Default fetch function: one ticker's OHLCV from Yahoo Finance,
+    indexed by Date (empty if there is none). Uses yf.Ticker, which
+    (unlike yf.download's shared state) is safe to call from several
+    threads at once. One call is one HTTP request.
+    """
+    df = yf.Ticker(ticker).history(start=start_date, end=end_date, auto_adjust=True, actions=False)
+    if df.empty:
+        return pd.DataFrame()
+    df.index = df.index.tz_localize(None)
+    df.index.name = 'Date'
+    return df[['Open', 'High', 'Low', 'Close', 'Volume']]
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart, across all threads.
+    """
+    def __init__(self, rate):
+        """
+        rate: Calls per second (None or 0 disables the limit)
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class UniverseDownloader:
+    """
+    Downloads a large ticker universe on a bounded thread pool and
+    streams every finished chunk of tickers into SQLite through the
+    MarketDataEngine upsert.
+
+    Every ticker is one request: requests share one rate limiter and
+    each is retried with exponential backoff on its own, so one bad
+    ticker neither fails its chunk nor costs the others a retry. Each
+    ticker starts the day after its high-water mark (the last stored
+    Date), so a daily run only fetches new bars. Progress is recorded
+    per ticker in the download_progress table, so a rerun of the same
+    job skips tickers that already completed.
+    """
+    def __init__(self, data_engine, fetch=None, chunk_size=50, max_workers=4,
+                 max_retries=3, backoff=2.0, rate_limit=2.0):
+        """
+        data_engine: MarketDataEngine used for storage
+        fetch: fetch(ticker, start_date, end_date) -> OHLCV DataFrame
+               indexed by Date (default: yfinance_fetch)
+        chunk_size: Tickers per worker task (and per database write)
+        max_workers: Concurrent requests
+        max_retries: Extra attempts per ticker after a failure
+        backoff: Seconds before the first retry, doubled for each next one
+        rate_limit: Requests started per second
+        """
+        self.data_engine = data_engine
+        self.fetch = fetch or yfinance_fetch
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(rate_limit)
+        self._ensure_progress_table()
+
+    def _ensure_progress_table(self):
+        with self.data_engine.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+                f"Job TEXT NOT NULL, Ticker TEXT NOT NULL, Status TEXT NOT NULL, "
+                f"Rows INTEGER, UpdatedAt TEXT, PRIMARY KEY (Job, Ticker))"
+            ))
+
+    def completed_tickers(self, job):
+        """
+        Tickers already finished for this job ('done' or 'empty').
+        """
+        with self.data_engine.engine.connect() as conn:
+            rows = conn.execute(
+                text(f"SELECT Ticker FROM {PROGRESS_TABLE} WHERE Job = :job AND Status IN ('done', 'empty')"),
+                {'job': job}
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def _record(self, job, statuses):
+        """
+        statuses: {ticker: (status, rows)}
+        """
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        with self.data_engine.engine.begin() as conn:
+            conn.execute(
+                text(f"INSERT OR REPLACE INTO {PROGRESS_TABLE} (Job, Ticker, Status, Rows, UpdatedAt) "
+                     f"VALUES (:job, :ticker, :status, :rows, :now)"),
+                [{'job': job, 'ticker': t, 'status': s, 'rows': n, 'now': now}
+                 for t, (s, n) in statuses.items()]
+            )
+
+    def _fetch_ticker(self, ticker, start_date, end_date):
+        """
+        One ticker, with rate limiting and retries.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                return self.fetch(ticker, start_date, end_date)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def _fetch_chunk(self, starts, end_date):
+        """
+        Runs on a worker thread. starts: {ticker: start_date}
+        Returns ({ticker: frame}, {ticker: error}).
+        """
+        frames, errors = {}, {}
+        for ticker, start_date in starts.items():
+            try:
+                frames[ticker] = self._fetch_ticker(ticker, start_date, end_date)
+            except Exception as e:
+                errors[ticker] = e
+        return frames, errors
+
+    def start_dates(self, tickers, start_date, end_date=None):
+        """
+        First date to fetch per ticker: the day after its high-water
+        mark, or start_date if nothing is stored yet. Tickers already
+        up to date (start after end_date, or after today) are left out.
+        """
+        last_dates = get_high_water_marks(self.data_engine.engine, tickers)
+        end = pd.Timestamp(end_date) if end_date is not None else pd.Timestamp.today().normalize()
+        starts = {}
+        for ticker in tickers:
+            if ticker in last_dates:
+                start = last_dates[ticker].normalize() + pd.Timedelta(days=1)
+            else:
+                start = pd.Timestamp(start_date)
+            if start <= end:
+                starts[ticker] = start.strftime('%Y-%m-%d')
+        return starts
+
+    def run(self, tickers, start_date='2020-01-01', end_date=None, job=None):
+        """
+        Downloads every ticker not yet completed for 'job', each from
+        its own start date (see start_dates()).
+        The job defaults to the requested date range (an open end counts
+        as today), so rerunning the same day resumes where it stopped.
+        Returns {'done': [...], 'empty': [...], 'failed': [...], 'skipped': [...]};
+        'skipped' holds tickers completed earlier or already up to date.
+        """
+        job = job or f"{start_date}:{end_date or datetime.date.today().isoformat()}"
+        completed = self.completed_tickers(job)
+        pending = [t for t in dict.fromkeys(tickers) if t not in completed]
+        starts = self.start_dates(pending, start_date, end_date)
+        todo = list(starts)
+        summary = {'done': [], 'empty': [], 'failed': [],
+                   'skipped': [t for t in dict.fromkeys(tickers) if t not in starts]}
+
+        chunks = [todo[i:i + self.chunk_size] for i in range(0, len(todo), self.chunk_size)]
+        print(f"Downloading {len(todo)} tickers in {len(chunks)} chunks "
+              f"({len(summary['skipped'])} already done or up to date)...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._fetch_chunk, {t: starts[t] for t in chunk}, end_date)
+                       for chunk in chunks]
+
+            # Writes stay on this thread: SQLite has a single writer anyway
+            for future in as_completed(futures):
+                frames, errors = future.result()
+                statuses = {}
+                for ticker, e in errors.items():
+                    print(f"{ticker} failed: {e}")
+                    statuses[ticker] = ('failed', None)
+
+                with_data = {t: df for t, df in frames.items() if not df.empty and df['Close'].notna().any()}
+                if with_data:
+                    # Tickers can have different dates: keep the union in date order
+                    data = pd.concat(with_data, axis=1, sort=True)
+                    data.columns.names = ['Ticker', 'Price']
+                    self.data_engine.save_to_sql(data)
+                for ticker, df in frames.items():
+                    rows = int(df['Close'].notna().sum()) if ticker in with_data else 0
+                    statuses[ticker] = ('done' if rows else 'empty', rows)
+
+                self._record(job, statuses)
+                for t, (status, _) in statuses.items():
+                    summary[status].append(t)
+
+        print(f"Download finished: {len(summary['done'])} done, {len(summary['empty'])} empty, "
+              f"{len(summary['failed'])} failed.")
+        return summary
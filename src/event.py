@@ -1,24 +1,68 @@
 # src/event.py
+import collections
+import enum
+import queue
+
+class EventType(enum.IntEnum):
+    """
+    Integer type codes of the events. They double as indexes into the
+    BacktestEngine dispatch table.
+    """
+    MARKET = 0
+    SIGNAL = 1
+    ORDER = 2
+    FILL = 3
+
+class EventQueue(collections.deque):
+    """
+    Single-threaded event queue for the backtest loop.
+    A plain deque (no locks) that also answers the queue.Queue calls the
+    components use: put(), get(), empty() and qsize().
+    """
+    put = collections.deque.append
+
+    def get(self, block=False):
+        try:
+            return self.popleft()
+        except IndexError:
+            raise queue.Empty
+
+    def empty(self):
+        return not self
+
+    def qsize(self):
+        return len(self)
+
+def default_commission(quantity):
+    """
+    Simple commission model (e.g., Interactive Brokers min)
+    """
+    return max(1.3, 0.01 * quantity)
 
 class Event:
     """
     Base class for all events.
+    Events are slotted (no per-instance __dict__) and carry their type
+    code as a class attribute, so creating one only stores its fields.
     """
-    pass
+    __slots__ = ()
+    type = None
 
 class MarketEvent(Event):
     """
     Triggered when new market data (OHLCV) is available.
     """
-    def __init__(self):
-        self.type = 'MARKET'
+    __slots__ = ()
+    type = EventType.MARKET
 
 class SignalEvent(Event):
     """
     Triggered by the Strategy. Tells the Portfolio to buy/sell.
     """
+    __slots__ = ('symbol', 'datetime', 'signal_type')
+    type = EventType.SIGNAL
+
     def __init__(self, symbol, datetime, signal_type):
-        self.type = 'SIGNAL'
         self.symbol = symbol
         self.datetime = datetime
         self.signal_type = signal_type # 'LONG' or 'SHORT'
@@ -27,23 +71,35 @@ class OrderEvent(Event):
     """
     Triggered by the Portfolio. Requests execution from the Broker.
     """
-    def __init__(self, symbol, order_type, quantity, direction):
-        self.type = 'ORDER'
+    __slots__ = ('symbol', 'order_type', 'quantity', 'direction',
+                 'limit_price', 'stop_price', 'order_id')
+    type = EventType.ORDER
+
+    def __init__(self, symbol, order_type, quantity, direction,
+                 limit_price=None, stop_price=None, order_id=None):
         self.symbol = symbol
-        self.order_type = order_type # 'MKT' or 'LMT'
+        self.order_type = order_type # 'MKT', 'LMT' or 'STP'
         self.quantity = quantity
         self.direction = direction # 'BUY' or 'SELL'
+        self.limit_price = limit_price # 'LMT' orders
+        self.stop_price = stop_price # 'STP' orders
+        self.order_id = order_id # Set by the broker if None (for cancel/replace)
     
     def print_order(self):
-        print(f"Order: {self.direction} {self.quantity} {self.symbol} @ {self.order_type}")
+        price = self.limit_price if self.order_type == 'LMT' else self.stop_price
+        suffix = f" {price}" if price is not None else ""
+        print(f"Order: {self.direction} {self.quantity} {self.symbol} @ {self.order_type}{suffix}")
 
 class FillEvent(Event):
     """
     Triggered by the Execution Handler. Represents a completed trade.
     """
+    __slots__ = ('timeindex', 'symbol', 'exchange', 'quantity',
+                 'direction', 'fill_cost', 'commission')
+    type = EventType.FILL
+
     def __init__(self, timeindex, symbol, exchange, quantity, 
                  direction, fill_cost, commission=None):
-        self.type = 'FILL'
         self.timeindex = timeindex
         self.symbol = symbol
         self.exchange = exchange
@@ -51,8 +107,7 @@ class FillEvent(Event):
         self.direction = direction
         self.fill_cost = fill_cost
         
-        # Simple commission model (e.g., Interactive Brokers min)
         if commission is None:
-            self.commission = max(1.3, 0.01 * quantity)
+            self.commission = default_commission(quantity)
         else:
             self.commission = commission
\ No newline at end of file
@@ -1,49 +1,151 @@
 # src/execution.py
-from src.event import FillEvent
-import datetime
+import numpy as np
+from src.event import EventType, FillEvent
+from src.slippage import NoSlippage
 
 class ExecutionHandler:
     """
-    Handles the interaction between the Order generated by the 
+    Handles the interaction between the Order generated by the
     Portfolio and the ultimate Fill object.
     """
     def execute_order(self, event):
         raise NotImplementedError("Should implement execute_order()")
 
-class SimulatedExecutionHandler(ExecutionHandler):
+    def open_bar(self):
+        """
+        Called by the BacktestEngine when a new bar arrives, before the
+        bar is handled. Handlers that fill at the Open put those Fill
+        Events here and return how many they put; the default fills nothing.
+        """
+        return 0
+
+    def flush(self):
+        """
+        Called by the BacktestEngine once the events of a bar are handled.
+        Handlers that fill in batches put their Fill Events here and
+        return how many they put; the default fills nothing.
+        """
+        return 0
+
+class BarExecutionHandler(ExecutionHandler):
     """
-    The simulated execution handler simply converts all order objects
-    into their equivalent fill objects automatically without latency, 
-    slippage or fill-ratio issues.
+    Simulated broker that fills orders from the bars of the DataHandler.
+
+    Orders are collected during the bar and priced together, from one
+    Snapshot of the cross-section: fill_at='close' fills them in flush()
+    at the Close of the bar they were placed on, fill_at='next_open' in
+    open_bar() at the Open of the symbol's next bar, so those fills are
+    handled before that bar's MARKET event. The price then goes through
+    the slippage model, and the Fill Event is stamped with the bar's
+    time. An order whose symbol has no bar yet (NaN price) waits for
+    the next bar.
     """
-    def __init__(self, events):
+    def __init__(self, events, bars, slippage=None, fill_at='close', exchange='ARCA'):
+        """
+        events: The Queue object (to send Fills)
+        bars: The DataHandler the fills are priced from
+        slippage: SlippageModel (default: NoSlippage)
+        fill_at: 'close' or 'next_open'
+        """
+        if fill_at not in ('close', 'next_open'):
+            raise ValueError("fill_at must be 'close' or 'next_open'")
         self.events = events
+        self.bars = bars
+        self.slippage = slippage or NoSlippage()
+        self.fill_at = fill_at
+        self.exchange = exchange
+        self.symbol_index = {symbol: i for i, symbol in enumerate(bars.symbol_list)}
+
+        self._pending = []  # Orders placed during the current bar
+        self._waiting = []  # (order, stamp of its symbol's bar when placed), for open_bar()
 
     def execute_order(self, event):
         """
-        Simply converts Order -> Fill
-        """
-        if event.type == 'ORDER':
-            # Create the Fill Event
-            # In a real sim, we would calculate slippage here.
-            fill_event = FillEvent(
-                datetime.datetime.utcnow(), 
-                event.symbol, 
-                'ARCA',  # Mock Exchange
-                event.quantity, 
-                event.direction, 
-                fill_cost=None,  # We don't know the price here?
-                commission=None
-            )
-            # wait! The standard fill event needs a price (fill_cost).
-            # But the 'Order' doesn't usually carry the price (it's a Market Order).
-            # In simple backtests, we usually cheat and let the Portfolio 
-            # estimate the cost, OR we look up the price here.
-            
-            # To keep it simple for Module 2: 
-            # We will pass 'None' and let the Portfolio fill in the price 
-            # from the DataHandler during the update.
-            # *Correction for this specific architecture:* # It's cleaner to handle Fills inside the loop where we have price access.
-            # But for now, let's push the fill.
-            
-            self.events.put(fill_event)
\ No newline at end of file
+        Queues the market order for the end of the bar. Limit and stop
+        orders need a MatchingExecutionHandler.
+        """
+        if event.type == EventType.ORDER:
+            if event.order_type != 'MKT':
+                raise ValueError(f"{type(self).__name__} only fills 'MKT' orders, "
+                                 f"got {event.order_type!r} (use MatchingExecutionHandler)")
+            self._pending.append(event)
+
+    def open_bar(self):
+        """
+        fill_at='next_open': fills the waiting orders at the Open of the
+        new bar of their symbol. An order whose symbol has no bar newer
+        than the one it was placed on (a forward-filled tick) keeps
+        waiting, rather than filling at the stale Open.
+        Returns the number of fills.
+        """
+        if self.fill_at != 'next_open' or not self._waiting:
+            return 0
+        due, stamps, waiting = [], [], []
+        for order, placed in self._waiting:
+            latest = self.bars.get_latest_bar(order.symbol)
+            if latest is None or latest[0] == placed:
+                waiting.append((order, placed))
+            else:
+                due.append(order)
+                stamps.append(latest[0])
+        if not due:
+            return 0
+        fills, unfilled = self._fill(due, 'Open', stamps)
+        # No Open on the new bar: wait for a bar after it
+        stamp_of = {id(order): stamp for order, stamp in zip(due, stamps)}
+        self._waiting = waiting + [(order, stamp_of[id(order)]) for order in unfilled]
+        return fills
+
+    def flush(self):
+        """
+        fill_at='close': fills the bar's orders at its Close.
+        fill_at='next_open': sets them aside for the next open_bar().
+        Returns the number of fills.
+        """
+        due, self._pending = self._pending, []
+        if self.fill_at == 'next_open':
+            for order in due:
+                latest = self.bars.get_latest_bar(order.symbol)
+                self._waiting.append((order, latest[0] if latest is not None else None))
+            return 0
+        if not due:
+            return 0
+        fills, unfilled = self._fill(due, 'Close')
+        self._pending = unfilled + self._pending
+        return fills
+
+    def _fill(self, due, field, stamps=None):
+        """
+        Prices the due orders in one batch and puts their Fill Events,
+        stamped with stamps[i] (default: the snapshot's time).
+        Returns (number of fills, orders left without a price).
+        """
+        # 1. One gather for every order of the bar
+        snapshot = self.bars.get_snapshot()
+        n = len(due)
+        ids = np.fromiter((self.symbol_index[order.symbol] for order in due), dtype=np.intp, count=n)
+        sides = np.fromiter((1.0 if order.direction == 'BUY' else -1.0 for order in due),
+                            dtype=np.float64, count=n)
+        quantities = np.fromiter((order.quantity for order in due), dtype=np.float64, count=n)
+        prices = self.slippage.fill_prices(snapshot[field][ids], sides, quantities,
+                                           snapshot['Volume'][ids])
+
+        # 2. Fill what has a price, keep the rest for the next bar
+        fills, unfilled = 0, []
+        for i, (order, price) in enumerate(zip(due, prices.tolist())):
+            if price != price: # NaN: no bar for this symbol yet
+                unfilled.append(order)
+                continue
+            stamp = stamps[i] if stamps is not None else snapshot.timestamp
+            self.events.put(FillEvent(stamp, order.symbol, self.exchange,
+                                      order.quantity, order.direction, price))
+            fills += 1
+        return fills, unfilled
+
+class SimulatedExecutionHandler(BarExecutionHandler):
+    """
+    The simulated execution handler fills every order at the Close of
+    the bar it was placed on, without slippage.
+    """
+    def __init__(self, events, bars):
+        super().__init__(events, bars)
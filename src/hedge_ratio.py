@@ -0,0 +1,107 @@
+# src/hedge_ratio.py
+import numpy as np
+
+# Online estimators of the pair regression  y = hedge_ratio * x + intercept.
+#
+# Both keep a 2-element state and a 2x2 covariance in plain floats, so an
+# update is a handful of multiplications (O(1), no refit) and they can
+# run inside the event loop. Use them through
+# PairsTradingStrategy(hedge_estimator=...) or, for the vectorized
+# backtest, hedge_ratio_path().
+
+class HedgeRatioEstimator:
+    """
+    HedgeRatioEstimator is an abstract base class for online estimators.
+    hedge_ratio always holds the estimate from the bars seen so far.
+    """
+    def update(self, x, y):
+        raise NotImplementedError("Should implement update()")
+
+    def _apply_gain(self, x, y, p00, p01, p11, noise):
+        """
+        Shared measurement update for the regressor h = [x, 1]:
+        gain K = P h / (h' P h + noise), state += K * error,
+        P -= K h' P. Returns the new P entries.
+        """
+        ph0 = p00 * x + p01
+        ph1 = p01 * x + p11
+        s = x * ph0 + ph1 + noise
+        k0 = ph0 / s
+        k1 = ph1 / s
+        error = y - (self.hedge_ratio * x + self.intercept)
+        self.hedge_ratio += k0 * error
+        self.intercept += k1 * error
+        return p00 - k0 * ph0, p01 - k0 * ph1, p11 - k1 * ph1
+
+class RecursiveLeastSquares(HedgeRatioEstimator):
+    """
+    Recursive least squares with exponential forgetting: the OLS fit of
+    research.py, updated one bar at a time, with old bars down-weighted
+    by 'forgetting' per bar (1.0 = plain expanding-window OLS).
+    """
+    def __init__(self, forgetting=0.99, initial=1.0, delta=100.0):
+        """
+        forgetting: Weight decay per bar, in (0, 1]; the effective memory
+                    is about 1 / (1 - forgetting) bars
+        initial: Hedge ratio before the first bar
+        delta: Initial covariance scale (large = trust the data quickly)
+        """
+        if not 0.0 < forgetting <= 1.0:
+            raise ValueError("forgetting must be in (0, 1]")
+        self.forgetting = forgetting
+        self.hedge_ratio = float(initial)
+        self.intercept = 0.0
+        self._p = (float(delta), 0.0, float(delta))
+
+    def update(self, x, y):
+        """
+        Adds one (x, y) observation. Returns the new hedge ratio.
+        """
+        lam = self.forgetting
+        p00, p01, p11 = self._apply_gain(float(x), float(y), *self._p, lam)
+        self._p = (p00 / lam, p01 / lam, p11 / lam)
+        return self.hedge_ratio
+
+class KalmanHedgeRatio(HedgeRatioEstimator):
+    """
+    Kalman filter treating the hedge ratio and intercept as a random walk
+    observed through y = hedge_ratio * x + intercept + noise.
+    """
+    def __init__(self, delta=1e-4, observation_var=1e-3, initial=1.0):
+        """
+        delta: How fast the coefficients may drift (process noise
+               delta / (1 - delta) per bar)
+        observation_var: Variance of the measurement noise
+        initial: Hedge ratio before the first bar
+        """
+        if not 0.0 < delta < 1.0:
+            raise ValueError("delta must be in (0, 1)")
+        self.process_var = delta / (1.0 - delta)
+        self.observation_var = observation_var
+        self.hedge_ratio = float(initial)
+        self.intercept = 0.0
+        self._p = (1.0, 0.0, 1.0)
+
+    def update(self, x, y):
+        """
+        Adds one (x, y) observation. Returns the new hedge ratio.
+        """
+        # Predict: the coefficients drift, so their uncertainty grows
+        p00, p01, p11 = self._p
+        q = self.process_var
+        self._p = self._apply_gain(float(x), float(y), p00 + q, p01, p11 + q, self.observation_var)
+        return self.hedge_ratio
+
+def hedge_ratio_path(estimator, x, y):
+    """
+    Runs 'estimator' over whole x/y arrays for the vectorized backtest.
+    Returns the hedge ratio in force at each bar: the estimate from the
+    bars before it, as PairsTradingStrategy uses it (a bar never
+    prices its own spread with a fit that has already seen it).
+    """
+    path = np.empty(len(x))
+    for t, (xt, yt) in enumerate(zip(np.asarray(x, dtype=np.float64).tolist(),
+                                     np.asarray(y, dtype=np.float64).tolist())):
+        path[t] = estimator.hedge_ratio
+        estimator.update(xt, yt)
+    return path
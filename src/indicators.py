@@ -0,0 +1,172 @@
+# src/indicators.py
+import math
+
+from src.rolling import RollingStats
+
+class Indicator:
+    """
+    Indicator is an abstract base class for incrementally updated
+    per-symbol indicators. update() gets each new bar of the symbol once;
+    value is NaN until the indicator is warmed up.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.value = math.nan
+
+    def update(self, bar):
+        raise NotImplementedError("Should implement update()")
+
+class SMA(Indicator):
+    """
+    Simple moving average of Close over 'window' bars.
+    """
+    def __init__(self, window):
+        super().__init__(window)
+        self.stats = RollingStats(window)
+
+    def update(self, bar):
+        self.stats.update(bar['Close'])
+        if self.stats.ready:
+            self.value = self.stats.mean
+
+class RollingStd(Indicator):
+    """
+    Rolling population std (like np.std) of Close over 'window' bars.
+    """
+    def __init__(self, window):
+        super().__init__(window)
+        self.stats = RollingStats(window)
+
+    def update(self, bar):
+        self.stats.update(bar['Close'])
+        if self.stats.ready:
+            self.value = self.stats.std
+
+class EMA(Indicator):
+    """
+    Exponential moving average of Close, alpha = 2 / (window + 1),
+    seeded with the first Close (pandas ewm(adjust=False)).
+    """
+    def __init__(self, window):
+        super().__init__(window)
+        self.alpha = 2.0 / (window + 1)
+
+    def update(self, bar):
+        close = float(bar['Close'])
+        if math.isnan(self.value):
+            self.value = close
+        else:
+            self.value += self.alpha * (close - self.value)
+
+class ATR(Indicator):
+    """
+    Average True Range with Wilder's smoothing, seeded with the simple
+    average of the first 'window' true ranges.
+    """
+    def __init__(self, window):
+        super().__init__(window)
+        self.prev_close = math.nan
+        self._seed = []
+
+    def update(self, bar):
+        high, low, close = float(bar['High']), float(bar['Low']), float(bar['Close'])
+        if math.isnan(self.prev_close):
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+
+        if self._seed is not None:
+            self._seed.append(true_range)
+            if len(self._seed) == self.window:
+                self.value = sum(self._seed) / self.window
+                self._seed = None
+        else:
+            self.value += (true_range - self.value) / self.window
+
+# Names accepted by IndicatorRegistry.register()
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'std': RollingStd,
+    'atr': ATR,
+}
+
+class IndicatorRegistry:
+    """
+    Indicators shared by every strategy on one DataHandler.
+
+    Strategies register (symbol, name, window) keys; asking for a key that
+    already exists returns the same indicator, so ten strategies wanting
+    the 20-bar SMA of XOM cost one SMA. The handler calls update() once
+    per tick, before the Market Event goes out, and each indicator takes
+    its symbol's bar only when that bar is new (a forward-filled bar is
+    not counted twice). Between ticks the values are plain cached
+    attributes: reading one costs a dict lookup.
+    """
+    def __init__(self, bars):
+        """
+        bars: The DataHandler that owns this registry
+        """
+        self.bars = bars
+        self._indicators = {}   # (symbol, name, window) -> Indicator
+        self._by_symbol = {}    # symbol -> [Indicator]
+        self._last_stamp = {}   # symbol -> timestamp of the bar last fed in
+        self.updates = 0        # Indicator updates performed (for profiling)
+
+    def register(self, symbol, name, window):
+        """
+        Registers an indicator (or finds the existing one) and returns its
+        key for get() / []. Indicators registered mid-run start warming up
+        with the next new bar.
+        """
+        key = (symbol, name, window)
+        if key not in self._indicators:
+            if name not in INDICATORS:
+                raise ValueError(f"Unknown indicator {name!r}, expected one of {sorted(INDICATORS)}")
+            if symbol not in self.bars.symbol_list:
+                raise ValueError(f"Symbol {symbol} not found in data.")
+            indicator = INDICATORS[name](window)
+            self._indicators[key] = indicator
+            self._by_symbol.setdefault(symbol, []).append(indicator)
+        return key
+
+    def __contains__(self, key):
+        return key in self._indicators
+
+    def __getitem__(self, key):
+        return self._indicators[key].value
+
+    def get(self, symbol, name, window):
+        """
+        Current value of a registered indicator (NaN while warming up).
+        """
+        return self._indicators[(symbol, name, window)].value
+
+    def update(self):
+        """
+        Feeds every symbol's new bar (if any) to its indicators.
+        Called by the DataHandler once per tick.
+        """
+        for symbol, indicators in self._by_symbol.items():
+            latest = self.bars.get_latest_bar(symbol)
+            if latest is None:
+                continue
+            stamp, bar = latest
+            if self._last_stamp.get(symbol) == stamp:
+                continue # Same bar as last tick (forward-filled)
+            self._last_stamp[symbol] = stamp
+            for indicator in indicators:
+                indicator.update(bar)
+            self.updates += len(indicators)
+
+    def reset(self):
+        """
+        Clears all indicator state and the update count, keeping the
+        registrations (used when the handler is rewound).
+        """
+        keys = list(self._indicators)
+        self._indicators, self._by_symbol, self._last_stamp = {}, {}, {}
+        self.updates = 0
+        for key in keys:
+            self.register(*key)
@@ -0,0 +1,322 @@
+# src/matching.py
+import heapq
+import itertools
+import math
+
+import numpy as np
+
+from src.event import EventType, FillEvent
+from src.execution import BarExecutionHandler
+
+# The four resting books of a symbol: (name, sign, bar field).
+# Each book is a heap keyed by sign * price, so the order that triggers
+# first is always on top, and an order triggers when its key is
+# <= sign * bar[field]:
+#   buy limit   fills when Low  <= limit  (highest limit first)
+#   sell limit  fills when High >= limit  (lowest limit first)
+#   buy stop    fires when High >= stop   (lowest stop first)
+#   sell stop   fires when Low  <= stop   (highest stop first)
+BOOKS = (
+    ('buy_limit', -1, 'Low'),
+    ('sell_limit', 1, 'High'),
+    ('buy_stop', 1, 'High'),
+    ('sell_stop', -1, 'Low'),
+)
+_BOOK_OF = {('BUY', 'LMT'): 0, ('SELL', 'LMT'): 1, ('BUY', 'STP'): 2, ('SELL', 'STP'): 3}
+# The books of each side, which share one capacity per bar
+SIDES = ((0, 2), (1, 3))
+
+class RestingOrder:
+    """
+    An order in an OrderBook: the OrderEvent plus what is left of it.
+    seq changes on every (re)insertion, so heap entries of an order
+    that was replaced or cancelled are recognised as stale.
+    """
+    __slots__ = ('event', 'remaining', 'seq', 'active')
+
+    def __init__(self, event):
+        self.event = event
+        self.remaining = event.quantity
+        self.seq = None
+        self.active = True
+
+    @property
+    def price(self):
+        if self.event.order_type == 'LMT':
+            return self.event.limit_price
+        return self.event.stop_price
+
+class OrderBook:
+    """
+    Resting limit and stop orders of one symbol, in price-ordered heaps
+    (best price, then time priority, on top).
+
+    Matching a bar only looks at the top of each heap, so an order costs
+    O(log n) when it is added or filled and nothing on bars where it does
+    not trigger. Cancelled and replaced orders are removed lazily: their
+    old heap entries are dropped when they reach the top, and the heaps
+    are rebuilt from the live orders once stale entries outnumber them,
+    so the heaps stay within twice the live orders.
+    """
+    def __init__(self):
+        self.heaps = [[] for _ in BOOKS]
+        self.live = 0  # Active orders in the book
+        self.stale = 0 # Heap entries of cancelled or replaced orders
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return self.live
+
+    def add(self, order):
+        """
+        Pushes an order (new, or replaced: it goes to the back of its price).
+        """
+        index = _BOOK_OF[(order.event.direction, order.event.order_type)]
+        order.seq = next(self._seq)
+        if not order.active or order.remaining <= 0:
+            return
+        heapq.heappush(self.heaps[index], (BOOKS[index][1] * order.price, order.seq, order))
+        self.live += 1
+
+    def discard(self, order):
+        """
+        Takes an order out of the book (its heap entry goes stale).
+        """
+        if order.active:
+            order.active = False
+            self.live -= 1
+            self.stale += 1
+            if self.stale > self.live:
+                self.compact()
+
+    def compact(self):
+        """
+        Drops every stale entry and re-heapifies the live ones, O(n).
+        """
+        for heap in self.heaps:
+            heap[:] = [entry for entry in heap if entry[2].active and entry[2].seq == entry[1]]
+            heapq.heapify(heap)
+        self.stale = 0
+
+    def _top(self, index, threshold):
+        """
+        The top entry of a heap if it triggers at 'threshold', else None.
+        Stale entries met on the way are popped.
+        """
+        heap = self.heaps[index]
+        while heap:
+            key, seq, order = heap[0]
+            if not order.active or order.seq != seq:
+                heapq.heappop(heap) # Stale: cancelled or replaced
+                self.stale -= 1
+                continue
+            return heap[0] if key <= threshold else None
+        return None
+
+    def match(self, bar, capacity=math.inf):
+        """
+        Matches the book against one bar. Buy orders and sell orders
+        each may fill up to 'capacity' shares: they trade against the
+        other side of the market, not against each other. Within a side
+        the limit and stop books compete for it: each book is taken best
+        price first, and of the two book tops that trigger, the order
+        placed (or repriced) first goes first.
+
+        A limit order fills at its limit or the Open if that is better
+        (a gap through the limit); a triggered stop fills at its stop or
+        the Open if that is worse. An order that does not fit in the
+        capacity is filled partially and keeps its place.
+        Returns [(order, quantity, price, is_stop)], buys first.
+        """
+        fills = []
+        bar_open = bar['Open']
+        for side in SIDES:
+            thresholds = [(index, BOOKS[index][1] * bar[BOOKS[index][2]]) for index in side]
+            remaining = capacity
+            while remaining > 0:
+                best = None
+                for index, threshold in thresholds:
+                    entry = self._top(index, threshold)
+                    if entry is not None and (best is None or entry[1] < best[1][1]):
+                        best = (index, entry)
+                if best is None:
+                    break
+                index, (key, seq, order) = best
+                sign = BOOKS[index][1]
+                price = sign * key
+                price = min(bar_open, price) if sign < 0 else max(bar_open, price)
+                quantity = min(order.remaining, remaining)
+                fills.append((order, quantity, price, order.event.order_type == 'STP'))
+                order.remaining -= quantity
+                remaining -= quantity
+                if order.remaining == 0:
+                    heapq.heappop(self.heaps[index])
+                    order.active = False
+                    self.live -= 1
+        return fills
+
+class MatchingExecutionHandler(BarExecutionHandler):
+    """
+    Simulated broker with resting limit ('LMT') and stop ('STP') orders.
+
+    Market orders are filled by BarExecutionHandler. Limit and stop
+    orders go into the OrderBook of their symbol at the end of the bar
+    they were placed on, and from the next bar on are matched against
+    each new bar's High/Low in flush(). Only symbols with resting orders
+    are visited, and each book only looks at its heap tops.
+
+    Each bar, the resting buy orders of a symbol can trade at most
+    volume_limit * Volume shares together, and so can its sell orders
+    (None = no limit; see OrderBook.match for the priority within a
+    side). The rest of a partially filled order stays in the book. A bar
+    with a NaN Volume is treated as no bar: nothing is matched on it. Triggered stops are
+    priced through the slippage model like market orders.
+
+    Orders get an order_id (written back to the OrderEvent) for
+    cancel() and replace().
+    """
+    def __init__(self, events, bars, slippage=None, fill_at='close', volume_limit=0.25,
+                 exchange='ARCA'):
+        """
+        volume_limit: Fraction of each bar's Volume the resting buys, and
+                      separately the resting sells, of a symbol may fill
+                      (None = no limit)
+        """
+        super().__init__(events, bars, slippage=slippage, fill_at=fill_at, exchange=exchange)
+        self.volume_limit = volume_limit
+        self.books = {symbol: OrderBook() for symbol in bars.symbol_list}
+        self.orders = {}          # order_id -> RestingOrder (until done)
+        self._new = []            # Orders placed during this bar
+        self._active = set()      # Symbols with resting orders
+        self._last_stamp = {}     # symbol -> stamp of the bar last matched
+        self._ids = itertools.count(1)
+
+    def execute_order(self, event):
+        """
+        Market orders are queued for the bar's batch fill; limit and stop
+        orders for the books.
+        """
+        if event.type != EventType.ORDER:
+            return
+        if event.order_type == 'MKT':
+            super().execute_order(event)
+            return
+        if event.order_type not in ('LMT', 'STP'):
+            raise ValueError(f"Unknown order type {event.order_type!r}")
+        if event.symbol not in self.books:
+            raise ValueError(f"Symbol {event.symbol} not found in data.")
+        price = event.limit_price if event.order_type == 'LMT' else event.stop_price
+        if price is None:
+            raise ValueError(f"{event.order_type} order needs a price")
+        if event.order_id is None:
+            event.order_id = next(self._ids)
+        order = RestingOrder(event)
+        self.orders[event.order_id] = order
+        self._new.append(order)
+
+    def cancel(self, order_id):
+        """
+        Cancels the unfilled part of a resting order.
+        Returns False if the order is unknown or already done.
+        """
+        order = self.orders.pop(order_id, None)
+        if order is None or not order.active:
+            return False
+        if order.seq is None:
+            order.active = False # Not booked yet: flush() skips it
+        else:
+            self.books[order.event.symbol].discard(order)
+        return True
+
+    def replace(self, order_id, quantity=None, limit_price=None, stop_price=None):
+        """
+        Changes the open quantity and/or price of a resting order.
+        Cutting the quantity keeps the order's place; any other change
+        sends it to the back of its new price. A limit_price for a stop
+        order (or a stop_price for a limit order) raises ValueError.
+        Returns False if the order is unknown or already done.
+        """
+        order = self.orders.get(order_id)
+        if order is None or not order.active:
+            return False
+        event = order.event
+        if limit_price is not None and event.order_type != 'LMT':
+            raise ValueError(f"Order {order_id} is a {event.order_type} order: it has no limit price")
+        if stop_price is not None and event.order_type != 'STP':
+            raise ValueError(f"Order {order_id} is a {event.order_type} order: it has no stop price")
+        keeps_place = (limit_price in (None, event.limit_price) and
+                       stop_price in (None, event.stop_price) and
+                       (quantity is None or quantity <= order.remaining))
+        if limit_price is not None:
+            event.limit_price = limit_price
+        if stop_price is not None:
+            event.stop_price = stop_price
+        if quantity is not None:
+            order.remaining = quantity
+        if quantity == 0:
+            return self.cancel(order_id)
+        if keeps_place or order.seq is None:
+            return True # Unchanged priority, or not in a book yet
+        book = self.books[event.symbol]
+        book.discard(order)
+        order.active = True
+        book.add(order)
+        return True
+
+    def flush(self):
+        """
+        Fills the bar's market orders, matches the books against the new
+        bars and then books the limit/stop orders placed during this bar.
+        Returns the number of fills.
+        """
+        fills = super().flush() + self._match()
+        new, self._new = self._new, []
+        for order in new:
+            if not order.active:
+                continue # Cancelled before it reached the book
+            symbol = order.event.symbol
+            self.books[symbol].add(order)
+            self._active.add(symbol)
+            # Resting from the next bar on: do not match the current one
+            latest = self.bars.get_latest_bar(symbol)
+            if latest is not None:
+                self._last_stamp[symbol] = latest[0]
+        return fills
+
+    def _match(self):
+        fills = 0
+        for symbol in list(self._active):
+            book = self.books[symbol]
+            if not book.live:
+                self._active.discard(symbol)
+                continue
+            latest = self.bars.get_latest_bar(symbol)
+            if latest is None:
+                continue
+            stamp, bar = latest
+            if self._last_stamp.get(symbol) == stamp:
+                continue # No new bar (forward-filled) or already matched
+            self._last_stamp[symbol] = stamp
+
+            volume = bar['Volume']
+            if volume != volume:
+                continue # NaN Volume: no trading on this bar, wait for the next one
+
+            capacity = math.inf
+            if self.volume_limit is not None:
+                capacity = int(self.volume_limit * volume) if volume > 0 else 0
+            for order, quantity, price, is_stop in book.match(bar, capacity):
+                event = order.event
+                if is_stop:
+                    side = 1.0 if event.direction == 'BUY' else -1.0
+                    price = self.slippage.fill_prices(np.array([price]), np.array([side]),
+                                                      np.array([float(quantity)]),
+                                                      np.array([float(bar['Volume'])]))[0]
+                self.events.put(FillEvent(stamp, symbol, self.exchange, quantity,
+                                          event.direction, float(price)))
+                if not order.active:
+                    self.orders.pop(event.order_id, None)
+                fills += 1
+            if not book.live:
+                self._active.discard(symbol)
+        return fills
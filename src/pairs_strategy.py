@@ -1,38 +1,56 @@
 # src/pairs_strategy.py
 import numpy as np
 import pandas as pd
-from src.event import SignalEvent
+from src.event import EventType, SignalEvent
+from src.rolling import RollingStats
 from src.strategy import Strategy
 
 class PairsTradingStrategy(Strategy):
-    def __init__(self, bars, events, hedge_ratio=1.055):
+    def __init__(self, bars, events, hedge_ratio=1.055, window=30, entry_z=2.0, exit_z=0.5,
+                 hedge_estimator=None):
         """
         bars: DataHandler
         events: Event Queue
         hedge_ratio: Calculated from research.py (Slope of OLS)
+        window: Rolling window for Mean/Std Dev
+        entry_z: Enter trade when Z-score > entry_z or < -entry_z
+        exit_z: Exit when |Z-score| falls below exit_z
+        hedge_estimator: Optional online estimator from src/hedge_ratio.py
+                         (RecursiveLeastSquares, KalmanHedgeRatio); when
+                         given, it replaces the fixed hedge_ratio and is
+                         updated with every bar
         """
         self.bars = bars
         self.events = events
-        self.hedge_ratio = hedge_ratio
+        self.hedge_estimator = hedge_estimator
+        self.hedge_ratio = hedge_estimator.hedge_ratio if hedge_estimator else hedge_ratio
         self.tickers = bars.symbol_list # Expecting ['XOM', 'CVX']
         
         # Parameters
-        self.window = 30         # Rolling window for Mean/Std Dev
-        self.entry_z = 2.0       # Enter trade when Z-score > 2 or < -2
-        self.exit_z = 0.5        # Exit when spread returns to normal
+        self.window = window
+        self.entry_z = entry_z
+        self.exit_z = exit_z
         
-        # History for calculation
-        self.spread_history = [] 
+        # Rolling Mean/Std Dev of the spread, O(1) per bar with fixed memory
+        self.stats = RollingStats(window)
+        self.spread = np.nan   # Latest spread
+        self.z_score = np.nan  # Latest Z-score (NaN until the window is full)
         
         # Track position state
         self.long_spread = False 
         self.short_spread = False
 
+    def calculate_signals(self, event):
+        """
+        Strategy interface entry point (used by BacktestEngine).
+        """
+        self.calculate_xy_signals(event)
+
     def calculate_xy_signals(self, event):
         """
         Compute the Spread, Z-Score, and generate Signals.
         """
-        if event.type == 'MARKET':
+        if event.type == EventType.MARKET:
             # 1. Get latest prices for both assets
             x_ticker = self.tickers[0] # XOM
             y_ticker = self.tickers[1] # CVX
@@ -51,22 +69,27 @@ class PairsTradingStrategy(Strategy):
             # 2. Calculate Spread
             # Spread = Y - (Hedge_Ratio * X)
             spread = y_price - (self.hedge_ratio * x_price)
-            self.spread_history.append(spread)
+            self.spread = spread
+            self.stats.update(spread)
+            
+            # Online hedge ratio: this bar refines the ratio for the next one
+            if self.hedge_estimator is not None:
+                self.hedge_ratio = self.hedge_estimator.update(x_price, y_price)
             
             # We need enough history to calculate Z-Score
-            if len(self.spread_history) < self.window:
+            if not self.stats.ready:
                 return
 
-            # 3. Calculate Z-Score
-            # Take the last 'window' days
-            rolling_spreads = self.spread_history[-self.window:]
-            mean = np.mean(rolling_spreads)
-            std = np.std(rolling_spreads)
+            # 3. Calculate Z-Score over the last 'window' days
+            mean = float(self.stats.mean)
+            std = float(self.stats.std)
             
             if std == 0:
+                self.z_score = np.nan
                 return
             
             z_score = (spread - mean) / std
+            self.z_score = z_score
             
             # print(f"Date: {dt} | Z-Score: {z_score:.2f}") # Debug
             
@@ -109,4 +132,99 @@ class PairsTradingStrategy(Strategy):
                         # We were Short Y / Long X. So Buy Y / Sell X.
                         self.events.put(SignalEvent(y_ticker, dt, 'LONG'))
                         self.events.put(SignalEvent(x_ticker, dt, 'SHORT'))
-                        self.short_spread = False
\ No newline at end of file
+                        self.short_spread = False
+
+
+class MultiPairTradingStrategy(Strategy):
+    """
+    The PairsTradingStrategy rules for many pairs at once.
+
+    Hedge ratios, spreads, rolling statistics (RollingStats) and position
+    states are NumPy vectors with one entry per pair, so every bar costs one gather
+    of the latest closes and a few vector operations, however many pairs
+    are in the book. Signals are only built for the pairs whose state
+    changes. All pairs trade through one shared Portfolio.
+    """
+    def __init__(self, bars, events, pairs, hedge_ratios, window=30, entry_z=2.0,
+                 exit_z=0.5, verbose=False):
+        """
+        bars: DataHandler (its symbol_list must contain every ticker of 'pairs')
+        events: Event Queue
+        pairs: [(x_ticker, y_ticker), ...], spread = Y - hedge_ratio * X
+        hedge_ratios: One per pair
+        window, entry_z, exit_z: As in PairsTradingStrategy (shared by all pairs)
+        verbose: Print every entry and exit
+        """
+        self.bars = bars
+        self.events = events
+        self.pairs = [tuple(p) for p in pairs]
+        self.hedge_ratios = np.asarray(hedge_ratios, dtype=np.float64)
+        if len(self.hedge_ratios) != len(self.pairs):
+            raise ValueError("Need one hedge ratio per pair")
+        self.window = window
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.verbose = verbose
+
+        # Column of each leg in the handler's symbol order
+        index = {s: i for i, s in enumerate(bars.symbol_list)}
+        self.x_index = np.array([index[x] for x, _ in self.pairs], dtype=np.int64)
+        self.y_index = np.array([index[y] for _, y in self.pairs], dtype=np.int64)
+
+        # Rolling statistics of every pair's spread
+        self.stats = RollingStats(window, shape=(len(self.pairs),))
+        self.z_score = np.full(len(self.pairs), np.nan)
+
+        # Position state per pair: +1 long spread, -1 short spread, 0 flat
+        self.state = np.zeros(len(self.pairs), dtype=np.int8)
+
+    def calculate_signals(self, event):
+        """
+        Updates every pair's z-score and sends the signals for the pairs
+        whose state changes.
+        """
+        if event.type != EventType.MARKET:
+            return
+
+        # 1. Spread of every pair from one gather of the latest closes
+        closes = self.bars.get_latest_bar_values('Close')
+        x_price = closes[self.x_index]
+        y_price = closes[self.y_index]
+        if np.isnan(x_price).all() and np.isnan(y_price).all():
+            return # Not enough data yet
+        spread = y_price - self.hedge_ratios * x_price
+        self.stats.update(spread)
+        if not self.stats.ready:
+            return
+
+        # 2. Z-Scores (NaN while a pair's window still has missing bars)
+        std = self.stats.std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(std != 0, (spread - self.stats.mean) / std, np.nan)
+        self.z_score = z
+
+        # 3. State machine (same precedence as PairsTradingStrategy)
+        with np.errstate(invalid='ignore'):
+            go_long = (z < -self.entry_z) & (self.state != 1)
+            go_short = ~go_long & (z > self.entry_z) & (self.state != -1)
+            go_flat = ~go_long & ~go_short & (np.abs(z) < self.exit_z) & (self.state != 0)
+        changed = np.flatnonzero(go_long | go_short | go_flat)
+        if len(changed) == 0:
+            return
+
+        new_state = self.state.copy()
+        new_state[go_long] = 1
+        new_state[go_short] = -1
+        new_state[go_flat] = 0
+
+        # 4. Signals: one pair of signals per state change, Y first
+        for k in changed:
+            x_ticker, y_ticker = self.pairs[k]
+            dt = self.bars.get_latest_bar(y_ticker)[0]
+            buy_y = new_state[k] > self.state[k]
+            if self.verbose:
+                action = {1: 'ENTRY LONG', -1: 'ENTRY SHORT', 0: 'EXIT'}[int(new_state[k])]
+                print(f"[{dt.date()}] {action} {y_ticker}/{x_ticker} (Z: {z[k]:.2f})")
+            self.events.put(SignalEvent(y_ticker, dt, 'LONG' if buy_y else 'SHORT'))
+            self.events.put(SignalEvent(x_ticker, dt, 'SHORT' if buy_y else 'LONG'))
+        self.state = new_state
@@ -1,13 +1,31 @@
 # src/portfolio.py
+from collections.abc import Mapping, Sequence
+import numpy as np
 import pandas as pd
-from src.event import OrderEvent
+from src.analytics import PerformanceStats
+from src.event import EventType, OrderEvent
 import queue
 
+class _TrackedPositions(dict):
+    """
+    Position dict that remembers which symbols were assigned since it
+    was last cleared, so Portfolio can revalue just those.
+    """
+    def __init__(self, positions):
+        super().__init__(positions)
+        self.changed = set()
+
+    def __setitem__(self, symbol, quantity):
+        super().__setitem__(symbol, quantity)
+        self.changed.add(symbol)
+
 class Portfolio:
-    def __init__(self, bars, events, start_date, initial_capital=100000.0):
+    def __init__(self, bars, events, start_date, initial_capital=100000.0, revalue_every=None):
         """
         bars: The DataHandler object (to get current prices)
         events: The Queue object (to send Orders)
+        revalue_every: Also revalue every symbol from scratch every N bars,
+                       as a check on the incremental marks (None = never)
         """
         self.bars = bars
         self.events = events
@@ -16,7 +34,7 @@ class Portfolio:
         
         # 1. Current Positions (Quantity of shares held)
         # e.g., {'AAPL': 100, 'MSFT': 0}
-        self.current_positions = {symbol: 0 for symbol in self.bars.symbol_list}
+        self.current_positions = _TrackedPositions({symbol: 0 for symbol in self.bars.symbol_list})
         
         # 2. Current Holdings (Value in Dollars)
         # e.g., {'AAPL': 15000.0, 'Cash': 85000.0, 'Total': 100000.0}
@@ -25,6 +43,18 @@ class Portfolio:
         # 3. History (To track performance over time)
         self.all_holdings = [] # List of dictionaries
 
+        # 4. Incremental marking: only symbols with a position, or traded
+        # since the last bar, are revalued; Total moves by their deltas
+        self.open_symbols = set()   # Symbols with a non-zero position
+        self._dirty = self.current_positions.changed # Symbols set since the last bar
+        self._market_value = 0.0    # Sum of the symbol values in current_holdings
+        self._gross_value = 0.0     # Sum of their absolute values
+        self.revalue_every = revalue_every
+        self.max_revaluation_error = 0.0 # Largest |incremental - full| Total seen
+
+        # 5. Running performance statistics (Sharpe, drawdown, turnover, ...)
+        self.stats = PerformanceStats(initial_capital)
+
     def construct_current_holdings(self):
         """
         Sets up the dictionary to track cash and assets.
@@ -38,38 +68,81 @@ class Portfolio:
         """
         Called at the end of every "Bar" (day).
         Updates the Market Value of our stocks using the latest prices.
+
+        Only open positions and symbols traded since the last bar are
+        revalued, so the cost follows the size of the book rather than
+        the universe.
         """
-        bars = {}
-        for sym in self.bars.symbol_list:
-            # Get latest data from the DataHandler
-            if sym in self.bars.latest_symbol_data and self.bars.latest_symbol_data[sym]:
-                bars[sym] = self.bars.latest_symbol_data[sym][-1]
-            else:
-                bars[sym] = None
+        if self._dirty:
+            to_mark = self.open_symbols | self._dirty
+            self._dirty.clear()
+        else:
+            to_mark = self.open_symbols
+        for sym in tuple(to_mark):
+            self._mark(sym)
+
+        if self.revalue_every and (len(self.all_holdings) + 1) % self.revalue_every == 0:
+            self.revalue()
+
+        self.current_holdings['Total'] = self.current_holdings['Cash'] + self._market_value
+        self.stats.update(self.current_holdings['Total'], self._gross_value)
+        # Record this moment in history
+        self.all_holdings.append(self.current_holdings.copy())
+
+    def _latest_close(self, sym):
+        """
+        Latest Close of 'sym', or None before its first bar.
+        """
+        if sym in self.bars.latest_symbol_data and self.bars.latest_symbol_data[sym]:
+            return self.bars.latest_symbol_data[sym][-1]['Close']
+        return None
 
-        # Update holdings
-        dp = {symbol: 0.0 for symbol in self.bars.symbol_list}
-        dp['Cash'] = self.current_holdings['Cash']
-        dp['Total'] = self.current_holdings['Cash']
+    def _mark(self, sym):
+        """
+        Revalues one symbol and moves the running market value by the change.
+        """
+        quantity = self.current_positions[sym]
+        market_value = 0.0
+        if quantity != 0:
+            self.open_symbols.add(sym)
+            market_price = self._latest_close(sym)
+            if market_price is not None:
+                market_value = quantity * market_price
+        else:
+            self.open_symbols.discard(sym)
+        old_value = self.current_holdings[sym]
+        self._market_value += market_value - old_value
+        self._gross_value += abs(market_value) - abs(old_value)
+        self.current_holdings[sym] = market_value
 
+    def revalue(self):
+        """
+        Full revaluation of every symbol, the way each bar was marked
+        before the incremental update. Replaces the running market value
+        and records how far it had drifted in max_revaluation_error.
+        """
+        total = gross = 0.0
         for sym in self.bars.symbol_list:
+            market_value = 0.0
+            market_price = self._latest_close(sym)
             # If we have shares and a valid price, calculate value
-            if self.current_positions[sym] != 0 and bars[sym] is not None:
-                market_price = bars[sym]['Close']
+            if self.current_positions[sym] != 0 and market_price is not None:
                 market_value = self.current_positions[sym] * market_price
-                dp[sym] = market_value
-                dp['Total'] += market_value
-        
-        # Record this moment in history
-        self.current_holdings = dp
-        # Add timestamp if available, else just append
-        self.all_holdings.append(self.current_holdings.copy())
+            self.current_holdings[sym] = market_value
+            total += market_value
+            gross += abs(market_value)
+        self.open_symbols = {sym for sym in self.bars.symbol_list if self.current_positions[sym] != 0}
+        self._dirty.clear()
+
+        self.max_revaluation_error = max(self.max_revaluation_error, abs(total - self._market_value))
+        self._market_value = total
+        self._gross_value = gross
 
     def update_signal(self, event):
         """
         Acts on a SignalEvent to generate an OrderEvent.
         """
-        if event.type == 'SIGNAL':
+        if event.type == EventType.SIGNAL:
             order_event = self.generate_naive_order(event)
             self.events.put(order_event)
 
@@ -95,7 +168,7 @@ class Portfolio:
         Updates the portfolio current positions and holdings 
         from a FillEvent.
         """
-        if event.type == 'FILL':
+        if event.type == EventType.FILL:
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
 
@@ -123,4 +196,195 @@ class Portfolio:
             
         # Cost of the trade = (Price * Quantity) + Commission
         cost = fill_dir * fill.fill_cost * fill.quantity
-        self.current_holdings['Cash'] -= (cost + fill.commission)
\ No newline at end of file
+        self.current_holdings['Cash'] -= (cost + fill.commission)
+        self.stats.add_trade(cost)
+
+class _SymbolView(Mapping):
+    """
+    Read-only {symbol: value} view of a vector indexed by symbol id,
+    so ArrayPortfolio.current_positions reads like the Portfolio dict.
+    """
+    def __init__(self, symbol_index, values):
+        self._symbol_index = symbol_index
+        self._values = values
+
+    def __getitem__(self, symbol):
+        return self._values[self._symbol_index[symbol]].item()
+
+    def __iter__(self):
+        return iter(self._symbol_index)
+
+    def __len__(self):
+        return len(self._symbol_index)
+
+class _HoldingsView(Mapping):
+    """
+    Read-only view of ArrayPortfolio's current holdings: market value
+    per symbol plus 'Cash' and 'Total'.
+    """
+    def __init__(self, portfolio):
+        self._portfolio = portfolio
+
+    def __getitem__(self, key):
+        if key == 'Cash':
+            return self._portfolio.cash
+        if key == 'Total':
+            return self._portfolio.total
+        return self._portfolio.market_values[self._portfolio.symbol_index[key]].item()
+
+    def __iter__(self):
+        return iter(self._portfolio.columns)
+
+    def __len__(self):
+        return len(self._portfolio.columns)
+
+class _HoldingsHistory(Sequence):
+    """
+    all_holdings for ArrayPortfolio: row i of the history matrix as a
+    dict, built only when asked for.
+    """
+    def __init__(self, portfolio):
+        self._portfolio = portfolio
+
+    def __len__(self):
+        return self._portfolio._n_rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("holdings index out of range")
+        return dict(zip(self._portfolio.columns, self._portfolio._history[i].tolist()))
+
+class ArrayPortfolio(Portfolio):
+    """
+    Portfolio with the same orders and accounting, kept in NumPy arrays.
+
+    Positions and market values are vectors indexed by symbol id (the
+    position in bars.symbol_list), and cash and total are floats, so a
+    bar costs one gather of the latest closes and a few vector
+    operations instead of fresh dicts. Each bar's holdings are written
+    into a preallocated (bars x columns) matrix, symbols then 'Cash' and
+    'Total', which doubles when full. holdings_frame() wraps the filled
+    rows in a DataFrame without copying them.
+
+    current_positions, current_holdings and all_holdings are read-only
+    views with the same keys as in Portfolio. Every Portfolio method that
+    writes to them is overridden to write to the arrays instead.
+    """
+    # Rows preallocated for the history when no capacity is given
+    INITIAL_ROWS = 1024
+
+    def __init__(self, bars, events, start_date, initial_capital=100000.0, capacity=None):
+        """
+        bars: The DataHandler object (to get current prices)
+        events: The Queue object (to send Orders)
+        capacity: Expected number of bars (the history grows past it if needed)
+        """
+        self.bars = bars
+        self.events = events
+        self.start_date = start_date
+        self.initial_capital = initial_capital
+
+        self.symbol_list = list(self.bars.symbol_list)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbol_list)}
+        self.columns = self.symbol_list + ['Cash', 'Total']
+        n_symbols = len(self.symbol_list)
+
+        # 1. Current state, by symbol id
+        self.positions = np.zeros(n_symbols, dtype=np.int64)
+        self.market_values = np.zeros(n_symbols)
+        self.cash = float(initial_capital)
+        self.total = float(initial_capital)
+        # Last known Close per symbol (kept through bars a symbol skips)
+        self._last_close = np.full(n_symbols, np.nan)
+
+        # 2. History matrix, rows [0, _n_rows) are filled
+        self._history = np.empty((max(capacity or self.INITIAL_ROWS, 1), len(self.columns)))
+        self._n_rows = 0
+
+        # 3. Running performance statistics. Every bar is a full
+        # revaluation, so there is no incremental drift to check
+        self.stats = PerformanceStats(initial_capital)
+        self.revalue_every = None
+        self.max_revaluation_error = 0.0
+
+        # 4. Dict-like views for code written against Portfolio
+        self.current_positions = _SymbolView(self.symbol_index, self.positions)
+        self.current_holdings = _HoldingsView(self)
+        self.all_holdings = _HoldingsHistory(self)
+
+    def update_timeindex(self):
+        """
+        Marks every position to the latest Close and records the bar.
+        """
+        self.revalue()
+        self.stats.update(self.total, float(np.abs(self.market_values).sum()))
+
+        if self._n_rows == len(self._history):
+            self._grow()
+        row = self._history[self._n_rows]
+        row[:-2] = self.market_values
+        row[-2] = self.cash
+        row[-1] = self.total
+        self._n_rows += 1
+
+    def revalue(self):
+        """
+        Marks every position to the latest Close (the whole universe in
+        a few vector operations) and updates the total.
+        """
+        closes = self.bars.get_latest_bar_values('Close')
+        np.copyto(self._last_close, closes, where=~np.isnan(closes))
+
+        # Symbols without a position (or without a price yet) are worth 0
+        valued = (self.positions != 0) & ~np.isnan(self._last_close)
+        self.market_values.fill(0.0)
+        np.multiply(self.positions, self._last_close, out=self.market_values, where=valued)
+        self.total = self.cash + float(self.market_values.sum())
+
+    def _grow(self):
+        """
+        Doubles the history matrix, so appending stays amortized O(1).
+        """
+        history = np.empty((2 * len(self._history), len(self.columns)))
+        history[:self._n_rows] = self._history[:self._n_rows]
+        self._history = history
+
+    def update_positions_from_fill(self, fill):
+        """
+        Update the share count in the position vector.
+        """
+        fill_dir = 0
+        if fill.direction == 'BUY':
+            fill_dir = 1
+        if fill.direction == 'SELL':
+            fill_dir = -1
+
+        self.positions[self.symbol_index[fill.symbol]] += fill_dir * fill.quantity
+
+    def update_holdings_from_fill(self, fill):
+        """
+        Update the cash balance.
+        """
+        fill_dir = 0
+        if fill.direction == 'BUY':
+            fill_dir = 1
+        if fill.direction == 'SELL':
+            fill_dir = -1
+
+        cost = fill_dir * fill.fill_cost * fill.quantity
+        self.cash -= cost + fill.commission
+        self.stats.add_trade(cost)
+
+    def holdings_frame(self):
+        """
+        The recorded history as a DataFrame (one row per bar, columns
+        symbols + 'Cash' + 'Total') that shares memory with the history
+        matrix. Take it at the end of the run: a later bar can move the
+        matrix to a bigger buffer, leaving an older frame behind.
+        """
+        return pd.DataFrame(self._history[:self._n_rows], columns=self.columns, copy=False)
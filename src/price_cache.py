@@ -0,0 +1,136 @@
+# src/price_cache.py
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from src.price_store import BAR_FIELDS, PRICES_TABLE, ticker_bounds
+
+# Binary cache layout (inside cache_dir):
+#   stamps.npy     int64 nanosecond timestamps, one per row
+#   values.npy     float array shaped (fields x rows)
+#   manifest.json  fields, dtype and {ticker: [offset, n_rows]}
+# Rows are sorted by (Ticker, Date), so each symbol is one contiguous
+# block per field. The manifest is written last: no manifest, no cache.
+# It also records the source database's path, modification time and row
+# count; a cache whose source has changed since is not used.
+MANIFEST = 'manifest.json'
+STAMPS_FILE = 'stamps.npy'
+VALUES_FILE = 'values.npy'
+CACHE_VERSION = 2
+
+def default_cache_dir(db_path):
+    """
+    The cache lives next to the database: data/price_cache/
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'price_cache')
+
+def source_signature(db_path):
+    """
+    Identifies the state of the database a cache is built from: its
+    path, the row count of the prices table and the latest modification
+    time of the file or its WAL (committed writes may sit in the WAL
+    until a checkpoint).
+    """
+    db_path = os.path.abspath(db_path)
+    engine = create_engine(f'sqlite:///{db_path}')
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT COUNT(*) FROM {PRICES_TABLE}")).scalar()
+    engine.dispose()
+
+    # Stat after the query: closing the last connection may checkpoint the WAL
+    mtime = os.stat(db_path).st_mtime_ns
+    wal_path = db_path + '-wal'
+    if os.path.exists(wal_path) and os.path.getsize(wal_path) > 0:
+        mtime = max(mtime, os.stat(wal_path).st_mtime_ns)
+    return {'source': db_path, 'source_mtime_ns': mtime, 'source_rows': int(rows)}
+
+def _save_array(path, array):
+    """
+    Writes a .npy file next to 'path' and renames it into place. Processes
+    that have the old file memory-mapped keep reading the old (unlinked)
+    file instead of seeing it rewritten under them.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def build_price_cache(db_path, cache_dir=None, dtype=np.float64):
+    """
+    Exports the whole prices table into the memory-mapped cache.
+    dtype: float64 (exact) or float32 (half the disk and page cache)
+    Returns the manifest dict.
+    """
+    cache_dir = cache_dir or default_cache_dir(db_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    invalidate_price_cache(cache_dir)
+
+    print(f"Building price cache in {cache_dir}...")
+    engine = create_engine(f'sqlite:///{db_path}')
+    frame = pd.read_sql(
+        text(f"SELECT * FROM {PRICES_TABLE} ORDER BY Ticker ASC, Date ASC"),
+        engine, parse_dates=['Date']
+    )
+
+    stamps = frame['Date'].to_numpy().astype('datetime64[ns]').view(np.int64)
+    values = np.ascontiguousarray(
+        frame.reindex(columns=BAR_FIELDS).to_numpy(dtype=np.float64).T, dtype=dtype
+    )
+    engine.dispose()
+    _save_array(os.path.join(cache_dir, STAMPS_FILE), stamps)
+    _save_array(os.path.join(cache_dir, VALUES_FILE), values)
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        **source_signature(db_path),
+        'fields': list(BAR_FIELDS),
+        'dtype': np.dtype(dtype).name,
+        'rows': int(len(stamps)),
+        'symbols': {t: [s, n] for t, (s, n) in ticker_bounds(frame).items()},
+    }
+    # Write to a temp file and rename, so readers never see half a manifest
+    tmp_path = os.path.join(cache_dir, MANIFEST + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST))
+
+    print(f"Cached {manifest['rows']} rows for {len(manifest['symbols'])} symbols.")
+    return manifest
+
+def open_price_cache(cache_dir, db_path=None):
+    """
+    Memory-maps the cache. Nothing is read until the pages are touched.
+    db_path: If given, the cache must have been built from this database
+             in its current state (same path, modification time and rows)
+    Returns (manifest, stamps, values) or None if there is no valid cache.
+    """
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != CACHE_VERSION:
+        return None
+    if db_path is not None:
+        signature = source_signature(db_path)
+        if any(manifest.get(key) != value for key, value in signature.items()):
+            return None
+
+    stamps = np.load(os.path.join(cache_dir, STAMPS_FILE), mmap_mode='r')
+    values = np.load(os.path.join(cache_dir, VALUES_FILE), mmap_mode='r')
+    if len(stamps) != manifest['rows'] or values.shape[-1] != manifest['rows']:
+        return None # Files replaced by a rebuild after the manifest was read
+    return manifest, stamps, values
+
+def invalidate_price_cache(cache_dir):
+    """
+    Marks the cache as stale by removing its manifest.
+    The next handler (or build_price_cache) rebuilds it.
+    """
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
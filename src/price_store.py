@@ -0,0 +1,318 @@
+# src/price_store.py
+from bisect import bisect_right
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, text, bindparam, inspect
+
+PRICES_TABLE = 'prices'
+
+# Dates are stored as ISO text in the format pandas' to_sql has always
+# written, so new rows conflict with (and replace) the rows already stored
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# Price columns of the prices table, in the order the array stores use
+BAR_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# SQLite caps the number of bound parameters per statement (999 on older builds)
+MAX_SYMBOLS_PER_QUERY = 500
+
+# Rows written per executemany() call by upsert_prices()
+UPSERT_BATCH_SIZE = 10000
+
+# Rows fetched per ticker cursor at a time by iter_prices_by_date()
+MERGE_BLOCK_ROWS = 128
+
+# Explicit schema: typed columns with CHECKs (SQLite would otherwise store
+# whatever it is given) and a clustered (Ticker, Date) primary key, so
+# one ticker's history is a single contiguous range on disk.
+PRICES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    Date   TEXT    NOT NULL CHECK (Date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'),
+    Ticker TEXT    NOT NULL,
+    Open   REAL    CHECK (typeof(Open) IN ('real', 'null')),
+    High   REAL    CHECK (typeof(High) IN ('real', 'null')),
+    Low    REAL    CHECK (typeof(Low) IN ('real', 'null')),
+    Close  REAL    NOT NULL CHECK (typeof(Close) = 'real'),
+    Volume INTEGER CHECK (typeof(Volume) IN ('integer', 'null')),
+    PRIMARY KEY (Ticker, Date)
+) WITHOUT ROWID
+"""
+
+# Write-path settings applied by create_price_engine()
+WRITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",   # 64 MB page cache
+    "PRAGMA temp_store=MEMORY",
+)
+
+def create_price_engine(db_path):
+    """
+    SQLAlchemy engine for writers of the prices table, with the
+    write-path PRAGMAs applied to every new connection.
+    """
+    engine = create_engine(f'sqlite:///{db_path}')
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for pragma in WRITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+def _has_typed_schema(conn):
+    """
+    True if prices already has the (Ticker, Date) primary key.
+    """
+    columns = conn.execute(text(f"PRAGMA table_info({PRICES_TABLE})")).fetchall()
+    return any(row[1] == 'Ticker' and row[5] > 0 for row in columns)
+
+def check_price_table(engine):
+    """
+    Read-only check for readers (the data handlers): raises ValueError
+    unless the prices table exists with the typed schema. Migrating is
+    left to the ingest path (MarketDataEngine) or migrate_db.py, so a
+    backtest never writes to its source database.
+    """
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        if not inspector.has_table(PRICES_TABLE):
+            raise ValueError(f"No '{PRICES_TABLE}' table in {engine.url.database}")
+        if inspector.has_table(f"{PRICES_TABLE}_legacy") or not _has_typed_schema(conn):
+            raise ValueError(
+                f"The '{PRICES_TABLE}' table in {engine.url.database} uses the old untyped "
+                f"schema (or its migration was interrupted). Migrate it once with: "
+                f"python migrate_db.py {engine.url.database}"
+            )
+
+def ensure_price_table(engine):
+    """
+    Creates the typed prices table, or migrates a table created by
+    pandas' to_sql (untyped, no key) into it. Migrated rows go through
+    upsert_prices(), so they get the same type conversion as new data:
+    rows with a non-numeric Close are dropped, and for duplicate
+    (Ticker, Date) rows the most recently inserted one wins.
+    Safe to call repeatedly; an interrupted migration resumes.
+    """
+    legacy = f"{PRICES_TABLE}_legacy"
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        exists = inspector.has_table(PRICES_TABLE)
+        pending = inspector.has_table(legacy)
+        if exists and _has_typed_schema(conn) and not pending:
+            return
+        if exists and not _has_typed_schema(conn):
+            print("Migrating prices table to the typed schema...")
+            conn.execute(text(f"ALTER TABLE {PRICES_TABLE} RENAME TO {legacy}"))
+            pending = True
+        conn.execute(text(PRICES_SCHEMA.format(table=PRICES_TABLE)))
+
+    if pending:
+        # Page through the legacy table by rowid. Each page is read in full
+        # before it is written: an open streaming cursor would keep the
+        # database locked against our own writes.
+        query = text(f"SELECT rowid AS _rowid, * FROM {legacy} "
+                     f"WHERE rowid > :last ORDER BY rowid LIMIT :limit")
+        last = -1
+        while True:
+            chunk = pd.read_sql(query, engine, params={'last': last, 'limit': UPSERT_BATCH_SIZE * 10})
+            if chunk.empty:
+                break
+            last = int(chunk['_rowid'].iloc[-1])
+            _write_rows(engine, _typed_rows(chunk))
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {legacy}"))
+
+def get_high_water_marks(engine, tickers=None):
+    """
+    Returns {ticker: last stored Date (Timestamp)}.
+    Tickers with no rows are left out.
+    """
+    if not inspect(engine).has_table(PRICES_TABLE):
+        return {}
+    query = f"SELECT Ticker, MAX(Date) AS LastDate FROM {PRICES_TABLE}"
+    params = {}
+    if tickers is not None:
+        query += " WHERE Ticker IN :tickers"
+        params['tickers'] = list(tickers)
+    query = text(query + " GROUP BY Ticker")
+    if tickers is not None:
+        query = query.bindparams(bindparam('tickers', expanding=True))
+
+    with engine.connect() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return {ticker: pd.Timestamp(last) for ticker, last in rows}
+
+def _typed_rows(frame):
+    """
+    Converts a long-format frame into tuples matching the schema types:
+    ISO text dates, REAL prices, INTEGER volume and None for missing
+    values. Rows without a numeric Close are skipped.
+    """
+    columns = ['Date', 'Ticker'] + list(BAR_FIELDS)
+    frame = frame.reindex(columns=columns)
+    prices = frame[list(BAR_FIELDS)].apply(pd.to_numeric, errors='coerce')
+    keep = prices['Close'].notna().to_numpy()
+    if not keep.any():
+        return []
+    frame, prices = frame[keep], prices[keep]
+
+    dates = pd.to_datetime(frame['Date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    dates = dates.dt.strftime(DATE_FORMAT).tolist()
+
+    real_columns = [prices[c].astype(object).where(prices[c].notna(), None).tolist()
+                    for c in BAR_FIELDS[:-1]]
+    volume = prices['Volume']
+    has_volume = volume.notna().tolist()
+    volume = volume.fillna(0).round().astype(np.int64).tolist()
+    volume = [v if ok else None for v, ok in zip(volume, has_volume)]
+    return list(zip(dates, frame['Ticker'].tolist(), *real_columns, volume))
+
+def _write_rows(engine, rows, batch_size=UPSERT_BATCH_SIZE):
+    """
+    Upserts schema-typed row tuples in executemany() batches,
+    all inside one transaction.
+    """
+    columns = ['Date', 'Ticker'] + list(BAR_FIELDS)
+    updates = ', '.join(f"{c} = excluded.{c}" for c in BAR_FIELDS)
+    sql = (
+        f"INSERT INTO {PRICES_TABLE} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(Ticker, Date) DO UPDATE SET {updates}"
+    )
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+def upsert_prices(engine, frame, batch_size=UPSERT_BATCH_SIZE):
+    """
+    Inserts or updates rows of a long-format frame
+    (Date, Ticker, Open, High, Low, Close, Volume) keyed on (Ticker, Date).
+    Values are converted to the schema types here, once, so readers
+    never have to coerce them. Rows without a numeric Close are skipped.
+    Returns the number of rows written.
+    """
+    ensure_price_table(engine)
+    rows = _typed_rows(frame)
+    if rows:
+        _write_rows(engine, rows, batch_size)
+    return len(rows)
+
+def read_prices_frame(engine, symbols, batch_size=MAX_SYMBOLS_PER_QUERY):
+    """
+    Loads the price history of many symbols with one parameterized
+    query per batch of symbols.
+    Returns a single DataFrame sorted by (Ticker, Date) with Date parsed.
+    """
+    symbols = list(dict.fromkeys(symbols))  # de-duplicate, keep order
+    query = text(
+        f"SELECT * FROM {PRICES_TABLE} WHERE Ticker IN :tickers ORDER BY Ticker ASC, Date ASC"
+    ).bindparams(bindparam('tickers', expanding=True))
+
+    frames = []
+    for start in range(0, len(symbols), batch_size):
+        batch = symbols[start:start + batch_size]
+        frames.append(pd.read_sql(query, engine, params={'tickers': batch}, parse_dates=['Date']))
+
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+def ticker_bounds(frame):
+    """
+    For a frame sorted by Ticker, returns {ticker: (start_row, n_rows)}.
+    """
+    tickers = frame['Ticker'].to_numpy()
+    if len(tickers) == 0:
+        return {}
+    starts = np.concatenate(([0], np.flatnonzero(tickers[1:] != tickers[:-1]) + 1))
+    ends = np.append(starts[1:], len(tickers))
+    return {tickers[s]: (int(s), int(e - s)) for s, e in zip(starts, ends)}
+
+def read_prices(engine, symbols, batch_size=MAX_SYMBOLS_PER_QUERY):
+    """
+    Same bulk load as read_prices_frame(), split in memory into
+    {symbol: DataFrame indexed by Date}. Symbols with no rows map to
+    an empty DataFrame.
+    """
+    frame = read_prices_frame(engine, symbols, batch_size)
+    bounds = ticker_bounds(frame)
+    result = {}
+    for symbol in symbols:
+        start, n = bounds.get(symbol, (0, 0))
+        result[symbol] = frame.iloc[start:start + n].set_index('Date')
+    return result
+
+def iter_prices_by_date(engine, symbols, chunksize, block_rows=MERGE_BLOCK_ROWS):
+    """
+    Streams the price history of 'symbols' in (Date, Ticker) order,
+    'chunksize' rows at a time, without loading the whole result.
+    Yields DataFrames with Date parsed.
+
+    Each ticker is read on its own cursor, which the (Ticker, Date) key
+    already returns in date order, so SQLite never sorts the result and
+    no statement binds more than one symbol. The cursors are merged
+    'block_rows' rows at a time.
+    """
+    columns = ['Date', 'Ticker'] + list(BAR_FIELDS)
+    sql = (
+        f"SELECT {', '.join(columns)} FROM {PRICES_TABLE} "
+        f"WHERE Ticker = ? ORDER BY Date ASC"
+    )
+
+    def to_frame(rows):
+        frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        return frame
+
+    raw = engine.raw_connection()
+    try:
+        cursors = [raw.cursor().execute(sql, (symbol,)) for symbol in dict.fromkeys(symbols)]
+        held = [[] for _ in cursors]  # Fetched rows of each cursor, not yet merged
+        merged = []
+        while cursors:
+            # 1. Refill the drained cursors, forget the exhausted ones
+            for i, cursor in enumerate(cursors):
+                if not held[i]:
+                    held[i] = cursor.fetchmany(block_rows)
+            live = [i for i, rows in enumerate(held) if rows]
+            cursors, held = [cursors[i] for i in live], [held[i] for i in live]
+            if not cursors:
+                break
+
+            # 2. Every cursor has been read up to 'ready', so the rows up
+            # to it are final; sorting them is a merge of short runs
+            ready = min(rows[-1][0] for rows in held)
+            batch = []
+            for i, rows in enumerate(held):
+                cut = bisect_right(rows, ready, key=itemgetter(0))
+                batch.extend(rows[:cut])
+                held[i] = rows[cut:]
+            batch.sort()
+            merged.extend(batch)
+
+            # 3. Hand out full chunks
+            while len(merged) >= chunksize:
+                yield to_frame(merged[:chunksize])
+                del merged[:chunksize]
+        if merged:
+            yield to_frame(merged)
+    finally:
+        raw.close()
@@ -0,0 +1,57 @@
+# src/ring_buffer.py
+import numpy as np
+
+class RingBuffer:
+    """
+    Fixed-capacity history of the last 'capacity' values appended.
+
+    Every value is written twice (at head and head + capacity), so the
+    latest n values always sit in one contiguous slice and latest(n)
+    returns a NumPy view without copying. Time runs along the last axis;
+    a (fields,) shape keeps one row per field, e.g. OHLCV.
+    Memory is fixed at creation, no matter how many values go through.
+    """
+    def __init__(self, capacity, shape=(), dtype=np.float64):
+        """
+        capacity: Number of most recent values kept
+        shape: Shape of a single value (() for scalars, (5,) for OHLCV)
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        fill = np.nan if np.issubdtype(dtype, np.floating) else 0
+        self.data = np.full(tuple(shape) + (2 * capacity,), fill, dtype=dtype)
+        self.head = 0   # Next write position in [0, capacity)
+        self.count = 0  # Values currently held (<= capacity)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        """
+        Adds one value, overwriting the oldest once the buffer is full.
+        """
+        self.data[..., self.head] = value
+        self.data[..., self.head + self.capacity] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self, n=None):
+        """
+        Returns a view of the last n values (oldest first).
+        The view aliases the buffer, so it is only valid until the next
+        append(); copy it if it has to outlive the current bar.
+        """
+        if n is None or n > self.count:
+            n = self.count
+        end = self.head + self.capacity
+        return self.data[..., end - n:end]
+
+    def last(self):
+        """
+        Returns the most recent value (None if empty).
+        """
+        if self.count == 0:
+            return None
+        return self.data[..., self.head + self.capacity - 1]
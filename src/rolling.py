@@ -0,0 +1,163 @@
+# src/rolling.py
+import math
+
+import numpy as np
+
+from src.ring_buffer import RingBuffer
+
+# Resync when the running M2 falls below this fraction of window * mean^2:
+# that is where cancellation in the sliding update has eaten its digits
+DRIFT_TOLERANCE = 1e-10
+
+class RollingStats:
+    """
+    Rolling mean and population variance (like np.mean / np.std) of the
+    last 'window' values, updated in O(1) per value.
+
+    Values are kept in a fixed RingBuffer. Each update slides a Welford
+    accumulator: the new value is added and the one leaving the window
+    removed, so the cost does not depend on the window length and memory
+    stays flat.
+
+    Sliding updates slowly accumulate rounding error. The stats are
+    recomputed exactly from the buffer every 'resync_every' updates,
+    and also when a positive variance gets small next to the mean
+    (cancellation) or goes negative. The amortized cost stays O(1).
+
+    While a window holds a NaN (or inf) its mean and variance are NaN,
+    as with np.mean; the series is recomputed once, when the last one
+    leaves the window. An exactly zero variance (a flat window) is
+    exact and needs no recomputation. In vector mode only the series
+    that need it are recomputed.
+
+    Works on scalars (shape=()) or on vectors of independent series,
+    e.g. shape=(n_pairs,).
+    """
+    def __init__(self, window, shape=(), resync_every=1000):
+        """
+        window: Number of values in the rolling window
+        shape: Shape of one value
+        resync_every: Exact recomputation interval, in updates
+        """
+        self.window = window
+        self.resync_every = max(resync_every, 1)
+        self.values = RingBuffer(window, shape=shape)
+        # Scalars run on Python floats, which is cheaper than 0-d arrays
+        self._scalar = tuple(shape) == ()
+        self._mean = 0.0 if self._scalar else np.zeros(shape)
+        self._m2 = 0.0 if self._scalar else np.zeros(shape)
+        self._nonfinite = 0 if self._scalar else np.zeros(shape, dtype=np.int64) # Count in window
+        self._since_resync = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def ready(self):
+        """
+        True once the window is full.
+        """
+        return len(self.values) == self.window
+
+    def update(self, value):
+        """
+        Adds one value (dropping the oldest once the window is full).
+        """
+        if self._scalar:
+            value = float(value)
+            self._nonfinite += not math.isfinite(value)
+        else:
+            value = np.asarray(value, dtype=np.float64)
+            self._nonfinite += ~np.isfinite(value)
+        values = self.values
+        n = values.count
+        if n == self.window:
+            # The slot at head holds the oldest value, about to be overwritten
+            old = values.data[..., values.head]
+            if self._scalar:
+                old = float(old)
+                self._nonfinite -= not math.isfinite(old)
+            else:
+                old = old.copy()
+                self._nonfinite -= ~np.isfinite(old)
+            values.append(value)
+            # Slide: replace 'old' by 'value', window size unchanged
+            new_mean = self._mean + (value - old) / n
+            self._m2 = self._m2 + (value - old) * (value - new_mean + old - self._mean)
+            self._mean = new_mean
+        else:
+            values.append(value)
+            n += 1
+            # Grow: plain Welford step
+            delta = value - self._mean
+            self._mean = self._mean + delta / n
+            self._m2 = self._m2 + delta * (value - self._mean)
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self.resync()
+            return
+        drifted = self._drifted(n)
+        if self._scalar:
+            if drifted:
+                self.resync()
+        elif drifted.any():
+            self.resync(drifted)
+
+    def _drifted(self, n):
+        """
+        Which series need a resync: those with only finite values in the
+        window whose M2 is not finite (a NaN just left the window), is
+        negative, or is positive but small next to n * mean^2.
+        A window holding a NaN stays NaN, and M2 == 0 is a flat window.
+        """
+        m2 = self._m2
+        limit = DRIFT_TOLERANCE * n * self._mean * self._mean
+        if self._scalar:
+            if self._nonfinite:
+                return False
+            return not math.isfinite(m2) or m2 < 0.0 or 0.0 < m2 <= limit
+        with np.errstate(invalid='ignore'):
+            return (self._nonfinite == 0) & (~np.isfinite(m2) | (m2 < 0.0) | ((m2 > 0.0) & (m2 <= limit)))
+
+    def resync(self, mask=None):
+        """
+        Recomputes mean and M2 exactly from the buffered values.
+        mask: Boolean array of the series to recompute (vector mode;
+              None = all)
+        """
+        window = self.values.latest()
+        if window.shape[-1] == 0:
+            return
+        if mask is not None and not self._scalar:
+            window = window[mask]
+            self._mean[mask] = window.mean(axis=-1)
+            self._m2[mask] = window.var(axis=-1) * window.shape[-1]
+            return
+        mean = window.mean(axis=-1)
+        m2 = window.var(axis=-1) * window.shape[-1]
+        self._mean = float(mean) if self._scalar else mean
+        self._m2 = float(m2) if self._scalar else m2
+        self._since_resync = 0
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def var(self):
+        """
+        Population variance (ddof=0) of the values in the window.
+        """
+        n = len(self.values)
+        if n == 0:
+            return np.full(np.shape(self._m2), np.nan)
+        if self._scalar:
+            return max(self._m2, 0.0) / n
+        return np.maximum(self._m2, 0.0) / n
+
+    @property
+    def std(self):
+        if self._scalar:
+            return math.sqrt(self.var)
+        return np.sqrt(self.var)
@@ -0,0 +1,48 @@
+# src/slippage.py
+import numpy as np
+
+# Slippage models for BarExecutionHandler. Each one prices a whole
+# bar's batch of orders at once: given the reference bar prices, the
+# side (+1 buy, -1 sell), the quantities and the bar volumes (arrays,
+# one entry per order), fill_prices() returns the fill price per order.
+# Slippage always moves the price against the order.
+
+class SlippageModel:
+    """
+    SlippageModel is an abstract base class for batch fill pricing.
+    """
+    def fill_prices(self, prices, sides, quantities, volumes):
+        raise NotImplementedError("Should implement fill_prices()")
+
+class NoSlippage(SlippageModel):
+    """
+    Fills at the reference price.
+    """
+    def fill_prices(self, prices, sides, quantities, volumes):
+        return prices
+
+class FixedBpsSlippage(SlippageModel):
+    """
+    Fixed cost of 'bps' basis points of the price per share.
+    """
+    def __init__(self, bps=5.0):
+        self.bps = bps
+
+    def fill_prices(self, prices, sides, quantities, volumes):
+        return prices * (1.0 + sides * (self.bps / 10000.0))
+
+class VolumeParticipationSlippage(SlippageModel):
+    """
+    Market impact growing with the order's share of the bar volume:
+    price * (1 + side * price_impact * participation^2), where
+    participation = quantity / volume, capped at 1 (also used when the
+    bar has no volume).
+    """
+    def __init__(self, price_impact=0.1):
+        self.price_impact = price_impact
+
+    def fill_prices(self, prices, sides, quantities, volumes):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            participation = np.where(volumes > 0, quantities / volumes, 1.0)
+        participation = np.minimum(participation, 1.0)
+        return prices * (1.0 + sides * self.price_impact * participation ** 2)
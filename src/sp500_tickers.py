@@ -1,8 +1,18 @@
 # src/sp500_tickers.py
+import datetime
+import json
+import os
+import threading
 import pandas as pd
 import requests
 from io import StringIO
 
+# Constituent list cache: data/sp500_tickers.json
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sp500_tickers.json'
+)
+DEFAULT_TTL = datetime.timedelta(days=7)
+
 def get_sp500_tickers():
     """
     Scrapes the Wikipedia page for the S&P 500 list using a fake User-Agent
@@ -40,6 +50,90 @@ def get_sp500_tickers():
         print(f"Error fetching tickers: {e}")
         return []
 
+class TickerUniverse:
+    """
+    Cached provider for the ticker universe.
+
+    The constituent list is stored on disk with the time it was fetched.
+    Within the TTL it is served straight from the cache. Once stale, the
+    cached list is still returned immediately and a refresh runs in the
+    background, so startup never waits on HTTP plus HTML parsing when a
+    cache exists. Offline runs keep using the last good list.
+    """
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, fetch=get_sp500_tickers):
+        """
+        cache_path: JSON file holding the list and its timestamp
+        ttl: How long a cached list counts as fresh (timedelta)
+        fetch: Function returning the live list ([] on failure)
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.fetch = fetch
+        self.refresh_thread = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Returns (tickers, fetched_at) from the cache, or None.
+        """
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            return cached['tickers'], datetime.datetime.fromisoformat(cached['fetched_at'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, tickers):
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'tickers': tickers}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self):
+        """
+        Fetches the live list now and updates the cache.
+        A failed fetch leaves the cache untouched and returns [].
+        """
+        with self._lock:
+            tickers = self.fetch()
+            if tickers:
+                self._save(tickers)
+            return tickers
+
+    def get(self, refresh=False, background=True):
+        """
+        Returns the ticker list.
+        refresh: Fetch now instead of trusting the cache (falls back to
+                 the cache if the fetch fails)
+        background: Refresh a stale cache on a background thread instead
+                    of waiting for it
+        """
+        cached = self.load()
+        if refresh or cached is None:
+            tickers = self.refresh()
+            if tickers or cached is None:
+                return tickers
+            print("Ticker refresh failed, using cached list.")
+            return cached[0]
+
+        tickers, fetched_at = cached
+        if datetime.datetime.now() - fetched_at > self.ttl:
+            if background:
+                if self.refresh_thread is None or not self.refresh_thread.is_alive():
+                    self.refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+                    self.refresh_thread.start()
+            else:
+                tickers = self.refresh() or tickers
+        return tickers
+
+def get_cached_sp500_tickers(refresh=False, background=True, cache_path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+    """
+    S&P 500 tickers served from the on-disk cache (see TickerUniverse).
+    """
+    return TickerUniverse(cache_path, ttl).get(refresh=refresh, background=background)
+
 if __name__ == "__main__":
     # Test the function if run directly
     tickers = get_sp500_tickers()
@@ -1,6 +1,7 @@
 # src/strategy.py
-from src.event import SignalEvent
+from src.event import EventType, SignalEvent
 import datetime
+import numpy as np
 
 class Strategy:
     """
@@ -26,19 +27,25 @@ class BuyAndHoldStrategy(Strategy):
         
         # Keep track if we have bought already
         self.bought = {s: False for s in self.symbol_list}
+        # The same flags as an array, to filter the snapshot in one go
+        self._bought = np.zeros(len(self.symbol_list), dtype=bool)
 
     def calculate_signals(self, event):
         """
         For "Buy and Hold", we generate a single signal per symbol
-        on the first market event.
+        on the first market event where it has a bar. The whole
+        universe is checked at once on the handler's snapshot.
         """
-        if event.type == 'MARKET':
-            for s in self.symbol_list:
+        if event.type == EventType.MARKET:
+            snapshot = self.bars.get_snapshot()
+            
+            # Symbols with data that we haven't bought yet
+            to_buy = np.flatnonzero(snapshot.present & ~self._bought)
+            for i in to_buy:
+                s = self.symbol_list[i]
+                # Create the Signal, stamped with the symbol's own bar
                 bars = self.bars.get_latest_bar(s)
-                
-                # Check if we have data and haven't bought yet
-                if bars is not None and not self.bought[s]:
-                    # Create the Signal
-                    signal = SignalEvent(s, bars[0], 'LONG')
-                    self.events.put(signal)
-                    self.bought[s] = True
\ No newline at end of file
+                signal = SignalEvent(s, bars[0], 'LONG')
+                self.events.put(signal)
+                self.bought[s] = True
+            self._bought[to_buy] = True
@@ -0,0 +1,174 @@
+# src/sweep.py
+import itertools
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from src.analytics import performance_stats
+from src.backtest import BacktestEngine
+from src.data_handler import MemmapDataHandler
+from src.event import EventQueue
+from src.execution import SimulatedExecutionHandler
+from src.pairs_strategy import PairsTradingStrategy
+from src.portfolio import Portfolio
+from src.vectorized import backtest_pairs
+
+def param_grid(grid):
+    """
+    Expands {'window': [20, 30], 'entry_z': [1.5, 2.0]} into one dict
+    per combination (in itertools.product order).
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+# Metrics reported per run (keys of analytics.performance_stats)
+SUMMARY_METRICS = ['final_value', 'total_return', 'max_drawdown', 'sharpe']
+
+def summarize(equity, initial_capital):
+    """
+    Results-table metrics for one run.
+    """
+    stats = performance_stats(equity, initial_capital)
+    return {metric: stats[metric] for metric in SUMMARY_METRICS}
+
+# --- Worker side ---
+# Each worker process maps the price cache once (initializer) and keeps
+# the handler in this global, so every run it executes reuses that load.
+_worker = {}
+
+def _init_worker(db_path, symbol_list, cache_dir, clock, quiet):
+    # Ctrl+C is handled by the parent, which cancels the pending runs
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if quiet:
+        # Strategies print every trade; thousands of runs would flood the console
+        sys.stdout = open(os.devnull, 'w')
+    data = MemmapDataHandler(EventQueue(), db_path, symbol_list, cache_dir=cache_dir, clock=clock)
+    _worker['data'] = data
+    _worker['closes'] = data.get_aligned_field('Close')
+
+def _run_event(strategy_cls, params, initial_capital):
+    data = _worker['data']
+    events = EventQueue()
+    data.rewind(events)
+    portfolio = Portfolio(data, events, None, initial_capital=initial_capital)
+    strategy = strategy_cls(data, events, **params)
+    broker = SimulatedExecutionHandler(events, data)
+    BacktestEngine(data, strategy, portfolio, broker, events).run()
+    return [h['Total'] for h in portfolio.all_holdings]
+
+def _run_vectorized(strategy_cls, params, initial_capital):
+    if strategy_cls is not PairsTradingStrategy:
+        raise ValueError(f"No vectorized mode for {strategy_cls.__name__}")
+    closes = _worker['closes']
+    result = backtest_pairs(closes[0], closes[1], initial_capital=initial_capital, **params)
+    return result['equity']
+
+def _run_batch(strategy_cls, batch, vectorized, initial_capital):
+    """
+    Runs a batch of (run_id, params) in this worker.
+    Returns [(run_id, metrics)].
+    """
+    run = _run_vectorized if vectorized else _run_event
+    return [(run_id, summarize(run(strategy_cls, params, initial_capital), initial_capital))
+            for run_id, params in batch]
+
+class ParameterSweep:
+    """
+    Runs one strategy over a grid of parameter combinations on a process
+    pool and collects final value, return, max drawdown and Sharpe per run.
+
+    Each worker loads the price data once (from the memory-mapped price
+    cache, so the OS shares the pages between workers) and rewinds the
+    same handler for every run it executes. Runs go out in batches to
+    keep inter-process overhead small next to fast (vectorized) runs.
+
+    The sweep stops early on Ctrl+C, cancel(), or when an on_result
+    callback returns True; pending batches are cancelled and run()
+    returns the results collected so far.
+    """
+    def __init__(self, db_path, symbol_list, strategy_cls=PairsTradingStrategy,
+                 vectorized=False, clock='intersection', cache_dir=None,
+                 initial_capital=100000.0, max_workers=None, batch_size=None, quiet=True):
+        """
+        db_path: SQLite database (the price cache is built from it if needed)
+        symbol_list: Symbols the strategy trades
+        strategy_cls: Called as strategy_cls(bars, events, **params)
+        vectorized: Use src/vectorized.py instead of the event loop
+                    (PairsTradingStrategy only)
+        clock: Master clock of the data handler
+        max_workers: Worker processes (default: all cores)
+        batch_size: Runs per task (default: about 4 tasks per worker)
+        quiet: Silence the strategies' prints inside the workers
+        """
+        self.db_path = db_path
+        self.symbol_list = symbol_list
+        self.strategy_cls = strategy_cls
+        self.vectorized = vectorized
+        self.clock = clock
+        self.cache_dir = cache_dir
+        self.initial_capital = initial_capital
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.quiet = quiet
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """
+        Stops a running sweep (safe to call from another thread).
+        """
+        self._cancel.set()
+
+    def run(self, grid, on_result=None):
+        """
+        grid: {param: [values]} (see param_grid) or a list of param dicts
+        on_result: Optional on_result(row) called for each finished run;
+                   returning True stops the sweep
+        Returns a DataFrame with one row per finished run: the parameters,
+        final_value, total_return, max_drawdown and sharpe (indexed by run id).
+        """
+        combos = param_grid(grid) if isinstance(grid, dict) else list(grid)
+        if not combos:
+            return pd.DataFrame()
+
+        # Build the price cache once, here, instead of racing in every worker
+        MemmapDataHandler(EventQueue(), self.db_path, self.symbol_list,
+                          cache_dir=self.cache_dir, clock=self.clock)
+
+        self._cancel.clear()
+        workers = min(self.max_workers, len(combos))
+        batch_size = self.batch_size or max(1, len(combos) // (workers * 4))
+        runs = list(enumerate(combos))
+        batches = [runs[i:i + batch_size] for i in range(0, len(runs), batch_size)]
+        print(f"Sweeping {len(combos)} combinations on {workers} workers...")
+
+        rows = {}
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(self.db_path, self.symbol_list, self.cache_dir, self.clock, self.quiet)
+        )
+        try:
+            pending = {pool.submit(_run_batch, self.strategy_cls, batch, self.vectorized,
+                                   self.initial_capital) for batch in batches}
+            # Wake up regularly so cancel() from another thread is noticed
+            while pending and not self._cancel.is_set():
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for run_id, metrics in future.result():
+                        row = dict(combos[run_id], **metrics)
+                        rows[run_id] = row
+                        if on_result is not None and on_result(row):
+                            self._cancel.set()
+        except KeyboardInterrupt:
+            self._cancel.set()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        if self._cancel.is_set():
+            print(f"Sweep cancelled after {len(rows)} of {len(combos)} runs.")
+        results = pd.DataFrame.from_dict(rows, orient='index').sort_index()
+        results.index.name = 'run'
+        return results
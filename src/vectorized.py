@@ -0,0 +1,144 @@
+# src/vectorized.py
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.event import default_commission
+from src.hedge_ratio import hedge_ratio_path
+
+# Vectorized backtests for parameter research.
+#
+# They compute the whole run with array math instead of stepping the
+# event loop, and reproduce what BacktestEngine + Portfolio record in
+# all_holdings for the same data:
+#   - every signal becomes a 'quantity' share market order,
+#   - orders fill at the Close of the bar that produced the signal,
+#     with the FillEvent commission,
+#   - equity at bar t is the cash before bar t's fills plus the
+#     positions before those fills, marked at bar t's Close
+#     (Portfolio.update_timeindex() runs before the fills arrive).
+#
+# Inputs are aligned close arrays, e.g. from
+# HistoricArrayDataHandler.get_aligned_field('Close').
+
+def rolling_zscore(series, window):
+    """
+    Z-score of each value against the last 'window' values (itself
+    included), with the population std like np.std.
+    NaN during the warm-up and where the window is flat (std == 0).
+    """
+    series = np.asarray(series, dtype=np.float64)
+    z = np.full(len(series), np.nan)
+    if len(series) < window:
+        return z
+
+    windows = sliding_window_view(series, window)
+    mean = windows.mean(axis=1)
+    std = windows.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z[window - 1:] = np.where(std != 0, (series[window - 1:] - mean) / std, np.nan)
+    return z
+
+def spread_state(z_score, entry_z=2.0, exit_z=0.5):
+    """
+    PairsTradingStrategy's entry/exit state machine over a whole z-score
+    series: +1 long spread, -1 short spread, 0 flat.
+    z < -entry_z goes long, z > entry_z goes short, |z| < exit_z goes
+    flat, and anything else (including NaN) keeps the previous state.
+    """
+    if exit_z > entry_z:
+        # Inside entry_z < |z| < exit_z the event strategy flips between
+        # entering and exiting on every bar, which is not a forward fill
+        raise ValueError(f"exit_z ({exit_z}) must not exceed entry_z ({entry_z})")
+
+    z_score = np.asarray(z_score, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        target = np.full(len(z_score), np.nan)
+        target[z_score < -entry_z] = 1.0
+        target[z_score > entry_z] = -1.0
+        target[np.abs(z_score) < exit_z] = 0.0
+
+    # Forward-fill the bars where the state machine decides something
+    decided = ~np.isnan(target)
+    last = np.maximum.accumulate(np.where(decided, np.arange(len(target)), -1))
+    state = np.where(last >= 0, target[np.maximum(last, 0)], 0.0)
+    return state.astype(np.int8)
+
+def simulate_trades(closes, trades, initial_capital=100000.0):
+    """
+    Books share trades the way Portfolio does.
+    closes: (symbols x bars) Close prices (NaN where a symbol has no bar yet)
+    trades: (symbols x bars) signed share quantities filled at that Close
+    Returns {'positions', 'cash', 'equity', 'commission'}, where positions
+    and cash are after each bar's fills and equity is the all_holdings Total.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    trades = np.atleast_2d(np.asarray(trades, dtype=np.float64))
+
+    # 1. Positions after each bar's fills
+    positions = np.cumsum(trades, axis=1)
+
+    # 2. Cash: cost of the fills plus one commission per fill
+    filled = trades != 0
+    commission = np.zeros(trades.shape)
+    for qty in np.unique(np.abs(trades[filled])):
+        commission[np.abs(trades) == qty] = default_commission(qty)
+    flows = np.where(filled, trades * closes, 0.0) + commission
+    cash = initial_capital - np.cumsum(flows.sum(axis=0))
+
+    # 3. Equity, marked before the bar's own fills
+    held = np.concatenate([np.zeros((len(trades), 1)), positions[:, :-1]], axis=1)
+    cash_before = np.concatenate([[initial_capital], cash[:-1]])
+    market_value = np.where(held != 0, held * np.nan_to_num(closes), 0.0)
+    equity = cash_before + market_value.sum(axis=0)
+
+    return {'positions': positions, 'cash': cash, 'equity': equity,
+            'commission': commission.sum()}
+
+def backtest_pairs(x_close, y_close, hedge_ratio=1.055, window=30, entry_z=2.0,
+                   exit_z=0.5, quantity=100, initial_capital=100000.0, hedge_estimator=None):
+    """
+    Vectorized PairsTradingStrategy on aligned X/Y closes (no gaps, as an
+    'intersection' clock gives). Spread = Y - hedge_ratio * X.
+    hedge_ratio: A constant, or one value per bar
+    hedge_estimator: Optional online estimator (src/hedge_ratio.py),
+                     run over the closes instead of hedge_ratio
+    Returns simulate_trades()' dict plus 'spread', 'z_score', 'state',
+    'hedge_ratio' and the (2 x bars) 'trades' (row 0 = X, row 1 = Y).
+    """
+    x_close = np.asarray(x_close, dtype=np.float64)
+    y_close = np.asarray(y_close, dtype=np.float64)
+    if np.isnan(x_close).any() or np.isnan(y_close).any():
+        raise ValueError("x_close and y_close must be aligned without gaps")
+
+    # 1. Spread, Z-Score and the position state
+    if hedge_estimator is not None:
+        hedge_ratio = hedge_ratio_path(hedge_estimator, x_close, y_close)
+    spread = y_close - hedge_ratio * x_close
+    z_score = rolling_zscore(spread, window)
+    state = spread_state(z_score, entry_z, exit_z)
+
+    # 2. Every state change sends one signal pair: Y with the change, X against it
+    step = np.sign(np.diff(state, prepend=0)).astype(np.float64) * quantity
+    trades = np.vstack([-step, step])
+
+    result = simulate_trades(np.vstack([x_close, y_close]), trades, initial_capital)
+    result.update(spread=spread, z_score=z_score, state=state, trades=trades,
+                  hedge_ratio=hedge_ratio)
+    return result
+
+def backtest_buy_and_hold(closes, quantity=100, initial_capital=100000.0):
+    """
+    Vectorized BuyAndHoldStrategy: each symbol buys 'quantity' shares on
+    its first bar and holds them.
+    closes: (symbols x bars), NaN before a symbol's first bar
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    trades = np.zeros(closes.shape)
+    has_bar = ~np.isnan(closes)
+    first = has_bar.argmax(axis=1)
+    bought = has_bar.any(axis=1)
+    trades[np.flatnonzero(bought), first[bought]] = quantity
+
+    result = simulate_trades(closes, trades, initial_capital)
+    result['trades'] = trades
+    return result
@@ -0,0 +1,243 @@
+# src/walk_forward.py
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.data_handler import MemmapDataHandler
+from src.event import EventQueue
+from src.sweep import param_grid, summarize
+from src.vectorized import backtest_pairs
+
+# Candidates tried on every train slice (hedge_ratio is fitted by OLS)
+DEFAULT_GRID = {
+    'window': [20, 30, 45, 60],
+    'entry_z': [1.5, 2.0, 2.5],
+    'exit_z': [0.0, 0.25, 0.5],
+}
+
+# Bump when fold results change meaning, so old cache files are ignored
+FOLD_CACHE_VERSION = 2
+
+def walk_forward_folds(n_bars, train_size, test_size, step=None):
+    """
+    Rolling train/test splits over n_bars bars, anchored at bar 0, so
+    extending the history only appends folds.
+    Returns [(train_start, test_start, test_end)], train = [train_start,
+    test_start) and test = [test_start, test_end).
+    """
+    step = step or test_size
+    folds = []
+    start = 0
+    while start + train_size + test_size <= n_bars:
+        folds.append((start, start + train_size, start + train_size + test_size))
+        start += step
+    return folds
+
+def fit_hedge_ratio(x, y):
+    """
+    OLS slope of y on x with an intercept (as in research.py).
+    """
+    return float(np.polyfit(x, y, 1)[0])
+
+def run_fold(x, y, n_train, grid, initial_capital):
+    """
+    Fits on the first n_train bars of x/y and trades the rest.
+
+    The hedge ratio comes from OLS on the train slice; window and z
+    thresholds from the grid combination with the best train return.
+    Out of sample the z-score warms up on the end of the train slice,
+    so trading can start on the first test bar; nothing after the train
+    slice is used for fitting.
+
+    A fold where no combination is usable (every one has exit_z above
+    entry_z, or a NaN train return) is not traded: it holds its capital
+    through the test slice and 'skipped' gives the reason.
+    """
+    x_train, y_train = x[:n_train], y[:n_train]
+    hedge_ratio = fit_hedge_ratio(x_train, y_train)
+
+    # 1. In-sample: pick the best combination
+    best, best_return, tried = None, -np.inf, 0
+    for params in param_grid(grid):
+        if params['exit_z'] > params['entry_z']:
+            continue
+        tried += 1
+        equity = backtest_pairs(x_train, y_train, hedge_ratio=hedge_ratio,
+                                initial_capital=initial_capital, **params)['equity']
+        total_return = summarize(equity, initial_capital)['total_return']
+        if total_return > best_return:
+            best, best_return = params, total_return
+
+    if best is None:
+        if not tried:
+            reason = "no grid combination has exit_z <= entry_z"
+        else:
+            reason = "no grid combination has a finite train return"
+        return dict(
+            hedge_ratio=hedge_ratio, **{param: None for param in grid},
+            train_return=np.nan,
+            test_final_value=initial_capital,
+            test_return=0.0,
+            test_max_drawdown=0.0,
+            test_equity=[float(initial_capital)] * (len(x) - n_train),
+            skipped=reason,
+        )
+
+    # 2. Out of sample, with window - 1 train bars as warm-up
+    warmup = best['window'] - 1
+    result = backtest_pairs(x[n_train - warmup:], y[n_train - warmup:], hedge_ratio=hedge_ratio,
+                            initial_capital=initial_capital, **best)
+    equity = result['equity'][warmup:]
+
+    test = summarize(equity, initial_capital)
+    return dict(
+        hedge_ratio=hedge_ratio, **best,
+        train_return=best_return,
+        test_final_value=test['final_value'],
+        test_return=test['total_return'],
+        test_max_drawdown=test['max_drawdown'],
+        test_equity=[float(v) for v in equity],
+        skipped=None,
+    )
+
+def _run_fold_task(args):
+    return run_fold(*args)
+
+class WalkForward:
+    """
+    Walk-forward optimization of the pairs strategy.
+
+    The aligned history is split into rolling train/test folds. Each fold
+    fits its parameters on the train slice only and is scored on the
+    following test slice, so no result uses data from its own future.
+    Folds are independent and run on a process pool.
+
+    Every finished fold is cached on disk under a hash of its prices and
+    settings. When the history is extended, the old folds are served from
+    the cache and only the new folds are computed; revised prices
+    change the hash, so stale folds are never reused.
+    """
+    def __init__(self, db_path, symbol_list, train_size=252, test_size=63, step=None,
+                 grid=None, cache_dir=None, initial_capital=100000.0, max_workers=None):
+        """
+        symbol_list: [X, Y] tickers (spread = Y - hedge_ratio * X)
+        train_size/test_size: Bars per train and test slice
+        step: Bars between fold starts (default: test_size, back-to-back tests)
+        grid: {param: [values]} for window, entry_z and exit_z (default: DEFAULT_GRID)
+        cache_dir: Fold cache, defaults to data/walk_forward_cache/
+        """
+        self.db_path = db_path
+        self.symbol_list = symbol_list
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step or test_size
+        self.grid = grid or DEFAULT_GRID
+        self.cache_dir = cache_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_path)), 'walk_forward_cache')
+        self.initial_capital = initial_capital
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        if max(self.grid['window']) > train_size:
+            raise ValueError("train_size must cover the largest window")
+
+        # Stitched out-of-sample equity curve of the last run()
+        self.equity = None
+
+    def _fold_key(self, stamps, x, y):
+        """
+        Cache key: the fold's timestamps and prices plus every setting
+        that changes its result.
+        """
+        digest = hashlib.sha1()
+        settings = [FOLD_CACHE_VERSION, self.symbol_list, self.train_size, self.test_size,
+                    self.grid, self.initial_capital]
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        for array in (stamps, x, y):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def _load_cached(self, key):
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_cached(self, key, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temp file and rename, so a crash never leaves half a fold
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        with open(path + '.tmp', 'w') as f:
+            json.dump(result, f)
+        os.replace(path + '.tmp', path)
+
+    def run(self):
+        """
+        Returns one row per fold: its date ranges, the fitted parameters,
+        the train return and the out-of-sample metrics, plus 'cached'.
+        The stitched out-of-sample equity curve is left in self.equity.
+        """
+        print("--- Walk-Forward Optimization ---")
+        data = MemmapDataHandler(EventQueue(), self.db_path, self.symbol_list, clock='intersection')
+        closes = data.get_aligned_field('Close')
+        stamps = data.timeline
+        x, y = closes[0], closes[1]
+
+        folds = walk_forward_folds(len(stamps), self.train_size, self.test_size, self.step)
+        if not folds:
+            print(f"Not enough data: {len(stamps)} bars for one {self.train_size}+{self.test_size} fold.")
+            self.equity = pd.Series(dtype=float)
+            return pd.DataFrame()
+
+        # 1. Serve what we can from the cache
+        results, todo = {}, []
+        for i, (start, test_start, end) in enumerate(folds):
+            key = self._fold_key(stamps[start:end], x[start:end], y[start:end])
+            cached = self._load_cached(key)
+            if cached is not None:
+                results[i] = (cached, True)
+            else:
+                todo.append((i, key, (x[start:end], y[start:end], test_start - start,
+                                      self.grid, self.initial_capital)))
+        print(f"{len(folds)} folds: {len(results)} cached, {len(todo)} to compute.")
+
+        # 2. Compute the rest in parallel
+        if len(todo) > 1 and self.max_workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(todo))) as pool:
+                computed = list(pool.map(_run_fold_task, [args for _, _, args in todo]))
+        else:
+            computed = [_run_fold_task(args) for _, _, args in todo]
+        for (i, key, _), result in zip(todo, computed):
+            self._save_cached(key, result)
+            results[i] = (result, False)
+
+        # 3. Fold table and stitched out-of-sample curve
+        rows, curves, scale = [], [], 1.0
+        for i, (start, test_start, end) in enumerate(folds):
+            result, cached = results[i]
+            result = dict(result)
+            equity = np.array(result.pop('test_equity'))
+            rows.append(dict(
+                fold=i,
+                train_start=pd.Timestamp(stamps[start]),
+                test_start=pd.Timestamp(stamps[test_start]),
+                test_end=pd.Timestamp(stamps[end - 1]),
+                **result, cached=cached,
+            ))
+            # Each fold starts from initial_capital; chain them by return
+            # (overlapping test slices, when step < test_size, are cut)
+            keep = min(self.step, end - test_start)
+            curves.append(pd.Series(scale * equity[:keep], index=pd.to_datetime(stamps[test_start:test_start + keep])))
+            scale *= equity[keep - 1] / self.initial_capital
+
+        self.equity = pd.concat(curves)
+        table = pd.DataFrame(rows).set_index('fold')
+        for i, reason in table['skipped'].dropna().items():
+            print(f"Fold {i} skipped (held cash): {reason}")
+        oos_return = self.equity.iloc[-1] / self.initial_capital - 1
+        print(f"Out-of-sample return over {len(folds)} folds: {oos_return * 100:.2f}%")
+        return table
@@ -0,0 +1,57 @@
+# sweep.py
+import argparse
+import os
+import sys
+
+# --- PATH FIX ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+# ----------------
+
+from src.sweep import ParameterSweep
+
+def float_list(text):
+    return [float(v) for v in text.split(',')]
+
+def int_list(text):
+    return [int(v) for v in text.split(',')]
+
+def run_sweep():
+    parser = argparse.ArgumentParser(description="Parameter sweep for the pairs trading strategy")
+    parser.add_argument('--symbols', nargs=2, default=['XOM', 'CVX'], help="X and Y tickers")
+    parser.add_argument('--hedge-ratio', type=float_list, default=[1.0552])
+    parser.add_argument('--window', type=int_list, default=[20, 30, 45, 60])
+    parser.add_argument('--entry-z', type=float_list, default=[1.5, 2.0, 2.5])
+    parser.add_argument('--exit-z', type=float_list, default=[0.0, 0.25, 0.5])
+    parser.add_argument('--workers', type=int, default=None, help="Default: all cores")
+    parser.add_argument('--event', action='store_true',
+                        help="Run the full event loop instead of the vectorized backtest")
+    parser.add_argument('--out', default=None, help="Write the results table to this CSV")
+    args = parser.parse_args()
+
+    print("--- Parameter Sweep: Pairs Trading ---")
+    db_path = os.path.join(current_dir, 'data', 'market_data.db')
+    grid = {
+        'hedge_ratio': args.hedge_ratio,
+        'window': args.window,
+        'entry_z': args.entry_z,
+        'exit_z': args.exit_z,
+    }
+
+    sweep = ParameterSweep(db_path, args.symbols, vectorized=not args.event,
+                           max_workers=args.workers)
+    # Ctrl+C stops the sweep and still prints what finished
+    results = sweep.run(grid)
+
+    if results.empty:
+        print("No runs finished.")
+        return
+    results = results.sort_values('total_return', ascending=False)
+    print("\n--- Top 10 by Return ---")
+    print(results.head(10).to_string())
+    if args.out:
+        results.to_csv(args.out)
+        print(f"\nSaved {len(results)} rows to {args.out}")
+
+if __name__ == "__main__":
+    run_sweep()
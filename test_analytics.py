@@ -0,0 +1,55 @@
+# test_analytics.py
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from src.analytics import PerformanceStats, performance_stats
+from src.pairs_strategy import PairsTradingStrategy
+from src.portfolio import ArrayPortfolio, Portfolio
+from conftest import make_db, make_pair, run_engine
+
+def test_online_stats_match_batch():
+    rng = np.random.default_rng(5)
+    equity = 100000.0 * np.cumprod(1 + rng.normal(0.0005, 0.01, 500))
+    gross = rng.random(500) * 50000.0
+    traded = np.where(rng.random(500) < 0.1, 7000.0, 0.0)
+
+    online = PerformanceStats(100000.0)
+    for e, g, t in zip(equity, gross, traded):
+        if t:
+            online.add_trade(-t)
+        online.update(e, g)
+
+    expected = performance_stats(equity, 100000.0, gross_exposure=gross, traded_notional=traded)
+    assert online.summary() == pytest.approx(expected, rel=1e-9)
+
+    returns = pd.Series(np.concatenate(([100000.0], equity))).pct_change().dropna()
+    assert expected['sharpe'] == pytest.approx(returns.mean() / returns.std() * math.sqrt(252))
+
+def test_online_stats_survive_zero_equity():
+    equity = [100000.0, 0.0, 0.0, 50000.0]
+    gross = [50000.0, 0.0, 0.0, 10000.0]
+    online = PerformanceStats(100000.0)
+    for e, g in zip(equity, gross):
+        online.update(e, g)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = performance_stats(equity, 100000.0, gross_exposure=gross)
+    assert online.summary() == pytest.approx(expected, nan_ok=True)
+    assert online.max_drawdown == 1.0 and math.isnan(online.summary()['volatility'])
+
+def test_portfolio_stats_match_vectorized_equity(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    x, y = make_pair(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': x, 'CVX': y})
+
+    for portfolio_cls in (Portfolio, ArrayPortfolio):
+        _, portfolio = run_engine(db_path, ['XOM', 'CVX'], PairsTradingStrategy, portfolio_cls=portfolio_cls)
+        frame = pd.DataFrame(list(portfolio.all_holdings))
+        expected = performance_stats(frame['Total'], 100000.0,
+                                     gross_exposure=frame[['XOM', 'CVX']].abs().sum(axis=1))
+        online = portfolio.stats.summary()
+
+        assert online['turnover'] > 0 and online['exposure'] > 0
+        del online['turnover'], expected['turnover']
+        assert online == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,114 @@
+# test_backtest.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.backtest import BacktestEngine
+from src.data_handler import HistoricArrayDataHandler
+from src.event import EventQueue, EventType, MarketEvent, SignalEvent, OrderEvent, FillEvent
+from src.execution import BarExecutionHandler, SimulatedExecutionHandler
+from src.portfolio import Portfolio
+from src.slippage import FixedBpsSlippage, VolumeParticipationSlippage
+from src.strategy import BuyAndHoldStrategy
+from conftest import make_db, make_bars
+
+def test_engine_runs_buy_and_hold_and_calls_listeners(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=10)
+    bars = make_bars(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'ABBV': bars})
+
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['ABBV'])
+    portfolio = Portfolio(data, events, '2020-01-01', initial_capital=100000.0)
+    strategy = BuyAndHoldStrategy(data, events)
+    broker = SimulatedExecutionHandler(events, data)
+
+    engine = BacktestEngine(data, strategy, portfolio, broker, events)
+    fills = []
+    engine.add_listener(EventType.FILL, fills.append)
+    assert engine.run() is portfolio
+
+    # One bought lot, filled at the first Close
+    assert len(fills) == 1
+    assert fills[0].fill_cost == pytest.approx(bars['Close'].iloc[0])
+    assert fills[0].timeindex == dates[0]
+    assert portfolio.current_positions['ABBV'] == 100
+    assert engine.bars_processed == 10
+    # 10 MARKET + SIGNAL + ORDER + FILL
+    assert engine.events_processed == 13
+    assert events.empty()
+    assert portfolio.all_holdings[-1]['ABBV'] == 100 * bars['Close'].iloc[-1]
+
+def test_buy_and_hold_stamps_signals_with_each_symbols_bar(tmp_path):
+    abbv_dates = pd.bdate_range('2020-01-01', periods=5)
+    msft_dates = pd.bdate_range('2020-01-03', periods=5)
+    db_path = make_db(tmp_path / 'prices.db', {'ABBV': make_bars(abbv_dates),
+                                               'MSFT': make_bars(msft_dates)})
+
+    # No master clock: the first tick holds ABBV's Jan 1 and MSFT's Jan 3 bar
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['ABBV', 'MSFT'])
+    strategy = BuyAndHoldStrategy(data, events)
+    data.update_bars()
+    strategy.calculate_signals(events.get())
+
+    signals = [events.get() for _ in range(2)]
+    assert [(e.symbol, e.datetime) for e in signals] == [('ABBV', abbv_dates[0]), ('MSFT', msft_dates[0])]
+    assert strategy.bought == {'ABBV': True, 'MSFT': True}
+
+def test_events_are_slotted_with_type_codes():
+    events = [MarketEvent(), SignalEvent('XOM', None, 'LONG'),
+              OrderEvent('XOM', 'MKT', 100, 'BUY'), FillEvent(None, 'XOM', 'ARCA', 100, 'BUY', 50.0)]
+    assert [e.type for e in events] == [EventType.MARKET, EventType.SIGNAL, EventType.ORDER, EventType.FILL]
+    for event in events:
+        assert not hasattr(event, '__dict__')
+    assert events[3].commission == 1.3
+
+def test_bar_execution_fills_next_open_with_slippage(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=10)
+    bars = make_bars(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'ABBV': bars})
+
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['ABBV'])
+    portfolio = Portfolio(data, events, '2020-01-01', initial_capital=100000.0)
+    broker = BarExecutionHandler(events, data, slippage=FixedBpsSlippage(10.0), fill_at='next_open')
+    engine = BacktestEngine(data, BuyAndHoldStrategy(data, events), portfolio, broker, events)
+    fills = []
+    engine.add_listener(EventType.FILL, fills.append)
+    engine.run()
+
+    # Ordered on the first bar, bought at the second bar's Open plus 10bps
+    assert len(fills) == 1
+    assert fills[0].timeindex == dates[1]
+    assert fills[0].fill_cost == pytest.approx(bars['Open'].iloc[1] * 1.001)
+    # The fill is handled before the second bar is marked
+    assert portfolio.all_holdings[0]['ABBV'] == 0.0
+    assert portfolio.all_holdings[1]['ABBV'] == pytest.approx(100 * bars['Close'].iloc[1])
+    assert portfolio.current_holdings['Cash'] == pytest.approx(100000.0 - 100 * fills[0].fill_cost - 1.3)
+
+def test_next_open_waits_for_the_symbols_next_bar(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=5)
+    xom = make_bars(dates, seed=1)
+    cvx = make_bars(dates, seed=2).drop(dates[1])   # Forward-filled on the second tick
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': xom, 'CVX': cvx})
+
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['XOM', 'CVX'], clock='union')
+    portfolio = Portfolio(data, events, '2020-01-01', initial_capital=100000.0)
+    broker = BarExecutionHandler(events, data, fill_at='next_open')
+    engine = BacktestEngine(data, BuyAndHoldStrategy(data, events), portfolio, broker, events)
+    fills = []
+    engine.add_listener(EventType.FILL, fills.append)
+    engine.run()
+
+    # Both ordered on the first bar: XOM fills at the second bar's Open,
+    # CVX (no second bar) at the Open of its next real bar, not a stale one
+    fills = {f.symbol: (f.timeindex, f.fill_cost) for f in fills}
+    assert fills['XOM'] == (dates[1], pytest.approx(xom['Open'].iloc[1]))
+    assert fills['CVX'] == (dates[2], pytest.approx(cvx['Open'].loc[dates[2]]))
+
+def test_volume_participation_slippage():
+    model = VolumeParticipationSlippage(price_impact=0.1)
+    prices = model.fill_prices(np.array([100.0, 100.0, 100.0]), np.array([1.0, -1.0, 1.0]),
+                               np.array([500.0, 500.0, 100.0]), np.array([1000.0, 1000.0, 0.0]))
+    np.testing.assert_allclose(prices, [102.5, 97.5, 110.0])
@@ -0,0 +1,341 @@
+# test_data_handler.py
+import queue
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from src.data_handler import HistoricSQLDataHandler, HistoricArrayDataHandler
+from src.portfolio import Portfolio
+from src.price_store import read_prices
+from conftest import make_db, make_bars
+
+def test_array_handler_matches_sql_handler(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=40)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(dates[:35], seed=2),
+    })
+
+    sql_data = HistoricSQLDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'])
+    array_data = HistoricArrayDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'])
+
+    # Nothing has been seen before the first tick
+    assert array_data.get_latest_bar('XOM') is None
+    assert len(array_data.latest_symbol_data['XOM']) == 0
+
+    ticks = 0
+    while sql_data.continue_backtest:
+        sql_data.update_bars()
+        array_data.update_bars()
+        assert sql_data.continue_backtest == array_data.continue_backtest
+        if not sql_data.continue_backtest:
+            break
+        ticks += 1
+
+        for symbol in ['XOM', 'CVX']:
+            sql_dt, sql_bar = sql_data.get_latest_bar(symbol)
+            array_dt, array_bar = array_data.get_latest_bar(symbol)
+            assert sql_dt == array_dt
+            for field in ['Open', 'High', 'Low', 'Close', 'Volume']:
+                assert sql_bar[field] == array_bar[field]
+            assert array_data.latest_symbol_data[symbol][-1]['Close'] == sql_bar['Close']
+
+    # Feed stops with the shortest series, one Market Event per tick
+    assert ticks == 35
+    assert array_data.events_queue.qsize() == 35
+    assert len(array_data.latest_symbol_data['XOM']) == 35
+
+def test_handlers_refuse_legacy_schema_without_writing(tmp_path):
+    from src.data_handler import StreamingSQLDataHandler
+
+    dates = pd.bdate_range('2020-01-01', periods=5)
+    path = tmp_path / 'legacy.db'
+    with sqlite3.connect(path) as conn:
+        make_bars(dates).reset_index().assign(Ticker='XOM').to_sql('prices', conn, index=False)
+    before = path.read_bytes()
+
+    for handler_cls in (HistoricSQLDataHandler, HistoricArrayDataHandler, StreamingSQLDataHandler):
+        with pytest.raises(ValueError, match='untyped.*python migrate_db.py'):
+            handler_cls(queue.Queue(), str(path), ['XOM'])
+    assert path.read_bytes() == before
+
+def test_portfolio_runs_on_array_handler(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=5)
+    db_path = make_db(tmp_path / 'prices.db', {'ABBV': make_bars(dates)})
+
+    data = HistoricArrayDataHandler(queue.Queue(), db_path, ['ABBV'])
+    port = Portfolio(data, queue.Queue(), start_date='2020-01-01')
+    port.current_positions['ABBV'] = 10
+
+    data.update_bars()
+    port.update_timeindex()
+
+    close = data.get_latest_bar('ABBV')[1]['Close']
+    assert port.current_holdings['ABBV'] == 10 * close
+    assert port.current_holdings['Total'] == 100000.0 + 10 * close
+
+def test_bulk_load_uses_keyed_table_and_splits_symbols(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=10)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(dates[:7], seed=2),
+        'ABBV': make_bars(dates, seed=3),
+    })
+
+    # make_db migrated the to_sql-created table to the (Ticker, Date) keyed
+    # schema, which the handler accepts without writing to it
+    HistoricSQLDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'])
+    with sqlite3.connect(db_path) as conn:
+        key = [r[1] for r in sorted(conn.execute("PRAGMA table_info('prices')"), key=lambda r: r[5]) if r[5]]
+    assert key == ['Ticker', 'Date']
+
+    # Small batches must give the same split as a single query
+    engine = create_engine(f'sqlite:///{db_path}')
+    frames = read_prices(engine, ['CVX', 'MISSING', 'XOM'], batch_size=1)
+    assert len(frames['XOM']) == 10
+    assert len(frames['CVX']) == 7
+    assert frames['MISSING'].empty
+    assert frames['CVX'].index.is_monotonic_increasing
+    assert (frames['CVX']['Ticker'] == 'CVX').all()
+
+def test_master_clock_aligns_symbols(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=6)
+    # CVX misses the 3rd day and stops one day early
+    cvx_dates = dates[[0, 1, 3, 4]]
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(cvx_dates, seed=2),
+    })
+
+    def run(**kwargs):
+        data = HistoricArrayDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'], **kwargs)
+        ticks = []
+        while True:
+            data.update_bars()
+            if not data.continue_backtest:
+                return ticks
+            xom, cvx = data.get_latest_bar('XOM'), data.get_latest_bar('CVX')
+            ticks.append((data.current_time, xom and xom[0], cvx and cvx[0]))
+
+    # Union + forward fill: runs over every XOM date, CVX carries its last bar
+    ticks = run(clock='union', fill_policy='ffill')
+    assert [t[0] for t in ticks] == list(dates.to_pydatetime())
+    assert all(t[1] == t[0] for t in ticks)
+    assert ticks[2][2] == dates[1]
+    assert ticks[5][2] == dates[4]
+
+    # Union + skip: CVX is reported missing on the ticks it has no bar
+    ticks = run(clock='union', fill_policy='skip')
+    assert len(ticks) == 6
+    assert ticks[2][2] is None and ticks[5][2] is None
+    assert ticks[3][2] == dates[3]
+
+    # Intersection: only the dates both symbols trade
+    ticks = run(clock='intersection')
+    assert [t[0] for t in ticks] == list(cvx_dates.to_pydatetime())
+    assert all(t[1] == t[0] and t[2] == t[0] for t in ticks)
+
+def test_ring_buffer_returns_views_of_latest_values():
+    from src.ring_buffer import RingBuffer
+
+    buf = RingBuffer(4)
+    assert len(buf.latest(3)) == 0
+    for value in range(1, 11):
+        buf.append(value)
+        expected = np.arange(max(1, value - 3), value + 1, dtype=float)
+        assert np.array_equal(buf.latest(10), expected)
+
+    # Zero-copy: the window aliases the buffer's storage
+    assert np.shares_memory(buf.latest(4), buf.data)
+    assert np.array_equal(buf.latest(2), [9.0, 10.0])
+    assert buf.last() == 10.0
+
+def test_get_latest_bars_is_bounded_and_matches_between_handlers(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=30)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': make_bars(dates, seed=1)})
+
+    sql_data = HistoricSQLDataHandler(queue.Queue(), db_path, ['XOM'], history=10)
+    array_data = HistoricArrayDataHandler(queue.Queue(), db_path, ['XOM'])
+    assert len(array_data.get_latest_bars('XOM', 5)) == 0
+
+    for _ in range(25):
+        sql_data.update_bars()
+        array_data.update_bars()
+
+    closes = array_data.get_latest_bars('XOM', 5)
+    assert np.array_equal(closes, sql_data.get_latest_bars('XOM', 5))
+    assert np.array_equal(closes, make_bars(dates, seed=1)['Close'].to_numpy()[20:25])
+    assert np.shares_memory(closes, array_data._values)
+
+    # The SQL handler never keeps more than 'history' bars
+    assert len(sql_data.latest_symbol_data['XOM']) == 10
+    assert len(sql_data.get_latest_bars('XOM', 50, field='High')) == 10
+
+def test_memmap_handler_matches_array_handler_and_invalidates(tmp_path):
+    from src.data_handler import MemmapDataHandler
+    from src.price_cache import open_price_cache, invalidate_price_cache
+
+    dates = pd.bdate_range('2020-01-01', periods=20)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(dates[2:], seed=2),
+        'ABBV': make_bars(dates, seed=3),
+    })
+    cache_dir = str(tmp_path / 'cache')
+
+    # First use builds the cache, the second only maps it
+    MemmapDataHandler(queue.Queue(), db_path, ['XOM'], cache_dir=cache_dir)
+    manifest, stamps, values = open_price_cache(cache_dir)
+    assert isinstance(values, np.memmap)
+    assert sorted(manifest['symbols']) == ['ABBV', 'CVX', 'XOM']
+
+    memmap_data = MemmapDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'],
+                                    cache_dir=cache_dir, clock='union')
+    array_data = HistoricArrayDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'], clock='union')
+    while True:
+        memmap_data.update_bars()
+        array_data.update_bars()
+        assert memmap_data.continue_backtest == array_data.continue_backtest
+        if not array_data.continue_backtest:
+            break
+        for symbol in ['XOM', 'CVX']:
+            a, b = memmap_data.get_latest_bar(symbol), array_data.get_latest_bar(symbol)
+            assert (a is None) == (b is None)
+            if a is not None:
+                assert a[0] == b[0] and a[1]['Close'] == b[1]['Close']
+
+    invalidate_price_cache(cache_dir)
+    assert open_price_cache(cache_dir) is None
+
+def test_memmap_cache_is_rebuilt_when_the_database_changes(tmp_path):
+    from src.data_handler import MemmapDataHandler
+    from src.price_cache import open_price_cache
+    from src.price_store import create_price_engine, upsert_prices
+
+    dates = pd.bdate_range('2020-01-01', periods=20)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': make_bars(dates[:10], seed=1)})
+    cache_dir = str(tmp_path / 'cache')
+
+    MemmapDataHandler(queue.Queue(), db_path, ['XOM'], cache_dir=cache_dir)
+    assert open_price_cache(cache_dir, db_path) is not None
+
+    # A direct write to the table, without going through MarketDataEngine
+    new_rows = make_bars(dates[10:], seed=1).reset_index().assign(Ticker='XOM')
+    engine = create_price_engine(db_path)
+    upsert_prices(engine, new_rows)
+    engine.dispose()
+    assert open_price_cache(cache_dir, db_path) is None
+
+    data = MemmapDataHandler(queue.Queue(), db_path, ['XOM'], cache_dir=cache_dir)
+    assert data._lengths[0] == 20
+    assert open_price_cache(cache_dir, db_path) is not None
+
+def test_streaming_handler_matches_union_clock(tmp_path):
+    from src.data_handler import StreamingSQLDataHandler
+
+    dates = pd.bdate_range('2020-01-01', periods=30)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(dates[3:].delete(10), seed=2),
+        'ABBV': make_bars(dates[:25], seed=3),
+    })
+    symbols = ['XOM', 'CVX', 'ABBV']
+
+    # Tiny chunks so dates are split across chunk boundaries
+    stream = StreamingSQLDataHandler(queue.Queue(), db_path, symbols, chunksize=7, history=5)
+    array_data = HistoricArrayDataHandler(queue.Queue(), db_path, symbols, clock='union')
+
+    ticks = 0
+    while True:
+        stream.update_bars()
+        array_data.update_bars()
+        assert stream.continue_backtest == array_data.continue_backtest
+        if not array_data.continue_backtest:
+            break
+        ticks += 1
+        for symbol in symbols:
+            a, b = stream.get_latest_bar(symbol), array_data.get_latest_bar(symbol)
+            assert (a is None) == (b is None)
+            if a is not None:
+                assert a[0] == b[0]
+                assert a[1]['Close'] == b[1]['Close'] == stream.latest_symbol_data[symbol][-1]['Close']
+                # Forward-filled bars keep their own date in both APIs
+                assert stream.latest_symbol_data[symbol][-1].name == a[0] == a[1].name
+
+    assert ticks == 30
+    # XOM has a bar every tick, so its history matches the store; it is capped at 'history'
+    assert np.array_equal(stream.get_latest_bars('XOM', 10), array_data.get_latest_bars('XOM', 5))
+    assert len(stream.latest_symbol_data['CVX']) == 5
+
+def test_stream_by_date_merges_ticker_cursors_without_sorting(tmp_path):
+    from src.price_store import PRICES_TABLE, iter_prices_by_date
+
+    dates = pd.bdate_range('2020-01-01', periods=20)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(dates[2:].delete(5), seed=2),
+        'ABBV': make_bars(dates[:15], seed=3),
+    })
+
+    # Each per-ticker query is a range of the (Ticker, Date) key, no sort
+    with sqlite3.connect(db_path) as conn:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM {PRICES_TABLE} "
+                            f"WHERE Ticker = 'XOM' ORDER BY Date ASC").fetchall()
+    assert not any('TEMP B-TREE' in row[-1] for row in plan)
+
+    # The merged stream is the same as sorting everything in SQL, however
+    # the cursors' blocks fall against the chunks
+    engine = create_engine(f'sqlite:///{db_path}')
+    expected = pd.read_sql(f"SELECT Date, Ticker, Open, High, Low, Close, Volume FROM {PRICES_TABLE} "
+                           f"ORDER BY Date ASC, Ticker ASC", engine, parse_dates=['Date'])
+    assert len(expected) == 20 + 17 + 15
+    for block_rows in (1, 3, 100):
+        chunks = list(iter_prices_by_date(engine, ['XOM', 'CVX', 'ABBV', 'XOM'], chunksize=7,
+                                          block_rows=block_rows))
+        assert [len(c) for c in chunks[:-1]] == [7] * (len(chunks) - 1)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+def test_streaming_handler_close_stops_the_reader(tmp_path):
+    from src.data_handler import StreamingSQLDataHandler
+
+    dates = pd.bdate_range('2020-01-01', periods=50)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': make_bars(dates, seed=1)})
+
+    # One-row chunks and a one-chunk queue: the reader is blocked on a full queue
+    with StreamingSQLDataHandler(queue.Queue(), db_path, ['XOM'], chunksize=1, prefetch=1) as stream:
+        stream.update_bars()
+        assert stream._reader.is_alive()
+    assert not stream._reader.is_alive()
+    assert not stream.continue_backtest
+
+def test_snapshot_matches_latest_bars_on_every_handler(tmp_path):
+    from src.data_handler import StreamingSQLDataHandler
+    from src.price_store import BAR_FIELDS
+
+    dates = pd.bdate_range('2020-01-01', periods=12)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'XOM': make_bars(dates, seed=1),
+        'CVX': make_bars(dates[3:], seed=2).drop(dates[6]),
+    })
+    handlers = [
+        HistoricSQLDataHandler(queue.Queue(), db_path, ['XOM', 'CVX']),
+        HistoricArrayDataHandler(queue.Queue(), db_path, ['XOM', 'CVX']),
+        HistoricArrayDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'], clock='union', fill_policy='skip'),
+        StreamingSQLDataHandler(queue.Queue(), db_path, ['XOM', 'CVX'], chunksize=5),
+    ]
+    for data in handlers:
+        assert not data.get_snapshot().present.any()
+        while True:
+            data.update_bars()
+            if not data.continue_backtest:
+                break
+            snapshot = data.get_snapshot()
+            for i, symbol in enumerate(['XOM', 'CVX']):
+                latest = data.get_latest_bar(symbol)
+                assert snapshot.present[i] == (latest is not None)
+                if latest is not None:
+                    assert list(snapshot.values[i]) == [latest[1][f] for f in BAR_FIELDS]
+                    assert snapshot.timestamp >= latest[0]
+                else:
+                    assert np.isnan(snapshot['Close'][i])
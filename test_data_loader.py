@@ -0,0 +1,218 @@
+# test_data_loader.py
+import sqlite3
+import numpy as np
+import pandas as pd
+from src.data_loader import MarketDataEngine
+
+def make_download(tickers, dates, base=100.0):
+    """
+    Builds a frame shaped like yf.download(..., group_by='ticker').
+    """
+    frames = {}
+    for i, ticker in enumerate(tickers):
+        close = base + i + np.arange(len(dates), dtype=float)
+        frames[ticker] = pd.DataFrame({
+            'Open': close, 'High': close + 1, 'Low': close - 1,
+            'Close': close, 'Volume': 1000.0,
+        }, index=pd.DatetimeIndex(dates, name='Date'))
+    data = pd.concat(frames, axis=1)
+    data.columns.names = ['Ticker', 'Price']
+    return data
+
+def count_rows(db_path, ticker=None):
+    with sqlite3.connect(db_path) as conn:
+        if ticker is None:
+            return conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM prices WHERE Ticker = ?", (ticker,)).fetchone()[0]
+
+def test_save_to_sql_upserts_instead_of_replacing(tmp_path):
+    db_path = str(tmp_path / 'prices.db')
+    engine = MarketDataEngine(db_name=db_path)
+    dates = pd.bdate_range('2020-01-01', periods=5)
+
+    engine.save_to_sql(make_download(['XOM', 'CVX'], dates))
+    # A partial batch must not wipe the other ticker
+    engine.save_to_sql(make_download(['XOM'], dates[-2:], base=500.0))
+
+    assert count_rows(db_path, 'XOM') == 5
+    assert count_rows(db_path, 'CVX') == 5
+    with sqlite3.connect(db_path) as conn:
+        closes = [r[0] for r in conn.execute(
+            "SELECT Close FROM prices WHERE Ticker = 'XOM' ORDER BY Date")]
+    assert closes == [100.0, 101.0, 102.0, 500.0, 501.0]
+
+def test_update_data_downloads_only_missing_range(tmp_path):
+    db_path = str(tmp_path / 'prices.db')
+    engine = MarketDataEngine(db_name=db_path)
+    all_dates = pd.bdate_range('2020-01-01', periods=10)
+    engine.save_to_sql(make_download(['XOM', 'CVX'], all_dates[:8]))
+    engine.save_to_sql(make_download(['ABBV'], all_dates[:5]))
+
+    # Stand-in for the network: record each request and serve it from all_dates
+    calls = []
+    def fake_download(tickers, start_date='2020-01-01', end_date=None):
+        calls.append((sorted(tickers), start_date))
+        return make_download(tickers, all_dates[all_dates >= start_date])
+    engine.download_data = fake_download
+
+    engine.update_data(['XOM', 'CVX', 'ABBV', 'MSFT'], start_date='2020-01-01', end_date='2020-01-14')
+
+    assert sorted(calls) == [
+        (['ABBV'], '2020-01-08'),
+        (['CVX', 'XOM'], '2020-01-11'),
+        (['MSFT'], '2020-01-01'),
+    ]
+    assert count_rows(db_path) == 40
+    with sqlite3.connect(db_path) as conn:
+        dupes = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM prices GROUP BY Ticker, Date HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+    assert dupes == 0
+
+def test_typed_schema_migrates_and_rejects_bad_values(tmp_path):
+    from sqlalchemy import create_engine
+    from src.price_store import ensure_price_table
+
+    db_path = str(tmp_path / 'prices.db')
+    # Old untyped table, as pandas' to_sql created it, with a duplicate and a bad price
+    legacy = pd.DataFrame({
+        'Date': ['2020-01-02 00:00:00.000000', '2020-01-03 00:00:00.000000',
+                 '2020-01-03 00:00:00.000000', '2020-01-06 00:00:00.000000'],
+        'Ticker': ['XOM', 'XOM', 'XOM', 'XOM'],
+        'Open': [1.0, 2.0, 2.5, 3.0], 'High': [1.0, 2.0, 2.5, 3.0], 'Low': [1.0, 2.0, 2.5, 3.0],
+        'Close': ['1.0', '2.0', '2.5', 'n/a'],
+        'Volume': [100.0, 200.0, 250.0, 300.0],
+    })
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE prices (Date TEXT, Ticker TEXT, Open, High, Low, Close, Volume)")
+        conn.executemany("INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", legacy.values.tolist())
+
+    ensure_price_table(create_engine(f'sqlite:///{db_path}'))
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT Date, typeof(Close), Close, typeof(Volume), Volume FROM prices ORDER BY Date").fetchall()
+        assert rows == [
+            ('2020-01-02 00:00:00.000000', 'real', 1.0, 'integer', 100),
+            ('2020-01-03 00:00:00.000000', 'real', 2.5, 'integer', 250),
+        ]
+        # The schema refuses values readers would have to coerce
+        try:
+            conn.execute("INSERT INTO prices VALUES ('2020-01-07', 'XOM', 1.0, 1.0, 1.0, 'bad', 1)")
+        except sqlite3.IntegrityError:
+            pass
+        else:
+            raise AssertionError("text Close was accepted")
+
+def test_universe_downloader_retries_and_resumes(tmp_path):
+    from src.downloader import UniverseDownloader
+
+    db_path = str(tmp_path / 'prices.db')
+    engine = MarketDataEngine(db_name=db_path)
+    dates = pd.bdate_range('2020-01-01', periods=5)
+    tickers = [f"T{i}" for i in range(7)] + ['DELISTED']
+
+    # Local stand-in for Yahoo: T3 fails once, T5 always fails
+    calls = []
+    def fetch(ticker, start_date, end_date):
+        calls.append(ticker)
+        if ticker == 'T5':
+            raise ConnectionError("boom")
+        if ticker == 'T3' and calls.count('T3') == 1:
+            raise ConnectionError("flaky")
+        if ticker == 'DELISTED':
+            return pd.DataFrame()
+        return make_download([ticker], dates)[ticker]
+
+    downloader = UniverseDownloader(engine, fetch=fetch, chunk_size=2, max_workers=3,
+                                    max_retries=1, backoff=0, rate_limit=None)
+    summary = downloader.run(tickers, end_date='2020-01-07', job='backfill')
+
+    # Only T5 failed; T4, in the same chunk, is stored
+    assert summary['failed'] == ['T5']
+    assert summary['empty'] == ['DELISTED']
+    assert sorted(summary['done']) == ['T0', 'T1', 'T2', 'T3', 'T4', 'T6']
+    assert calls.count('T3') == 2 and calls.count('T5') == 2 and calls.count('T4') == 1
+    assert count_rows(db_path) == 6 * 5
+
+    # Rerun: only the failed ticker is fetched again
+    calls.clear()
+    downloader.fetch = lambda ticker, s, e: calls.append(ticker) or make_download([ticker], dates)[ticker]
+    summary = downloader.run(tickers, end_date='2020-01-07', job='backfill')
+    assert calls == ['T5']
+    assert summary['done'] == ['T5']
+    assert count_rows(db_path) == 7 * 5
+
+def test_universe_downloader_starts_from_high_water_marks(tmp_path):
+    from src.downloader import UniverseDownloader
+
+    engine = MarketDataEngine(db_name=str(tmp_path / 'prices.db'))
+    engine.save_to_sql(make_download(['XOM'], pd.bdate_range('2020-01-01', periods=5)))
+
+    requests = []
+    def fetch(ticker, start_date, end_date):
+        requests.append((ticker, start_date))
+        return make_download([ticker], pd.bdate_range(start_date, end_date))[ticker]
+
+    downloader = UniverseDownloader(engine, fetch=fetch, rate_limit=None)
+    summary = downloader.run(['XOM', 'CVX'], start_date='2020-01-01', end_date='2020-01-10')
+    assert sorted(requests) == [('CVX', '2020-01-01'), ('XOM', '2020-01-08')]
+    assert sorted(summary['done']) == ['CVX', 'XOM']
+
+    # The next day's run: XOM and CVX are up to date for that job's range
+    requests.clear()
+    summary = downloader.run(['XOM', 'CVX'], start_date='2020-01-01', end_date='2020-01-10', job='next')
+    assert requests == [] and sorted(summary['skipped']) == ['CVX', 'XOM']
+
+def test_ticker_universe_serves_cache_and_refreshes_stale(tmp_path):
+    import datetime
+    import json
+    from src.sp500_tickers import TickerUniverse
+
+    cache_path = str(tmp_path / 'tickers.json')
+    live = [['AAPL', 'MSFT']]
+    fetches = []
+    def fetch():
+        fetches.append(1)
+        return live[0]
+
+    universe = TickerUniverse(cache_path, ttl=datetime.timedelta(days=1), fetch=fetch)
+
+    # No cache yet: fetched once, then served from disk
+    assert universe.get() == ['AAPL', 'MSFT']
+    assert universe.get() == ['AAPL', 'MSFT']
+    assert len(fetches) == 1
+
+    # Stale cache: the old list comes back at once, the refresh runs in the background
+    with open(cache_path) as f:
+        cached = json.load(f)
+    cached['fetched_at'] = (datetime.datetime.now() - datetime.timedelta(days=2)).isoformat()
+    with open(cache_path, 'w') as f:
+        json.dump(cached, f)
+    live[0] = ['AAPL', 'MSFT', 'NVDA']
+    assert universe.get() == ['AAPL', 'MSFT']
+    universe.refresh_thread.join()
+    assert universe.get() == ['AAPL', 'MSFT', 'NVDA']
+
+    # Offline: a failed on-demand refresh falls back to the cache
+    live[0] = []
+    assert universe.get(refresh=True) == ['AAPL', 'MSFT', 'NVDA']
+
+def test_migration_pages_through_large_legacy_tables(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from src import price_store
+
+    db_path = str(tmp_path / 'prices.db')
+    dates = pd.bdate_range('2020-01-01', periods=35).strftime('%Y-%m-%d %H:%M:%S.%f')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE prices (Date TEXT, Ticker TEXT, Open, High, Low, Close, Volume)")
+        conn.executemany("INSERT INTO prices VALUES (?, 'XOM', 1.0, 1.0, 1.0, ?, 100)",
+                         [(d, float(i)) for i, d in enumerate(dates)])
+
+    # Pages of 10 rows: the migration must write between reads without locking itself out
+    monkeypatch.setattr(price_store, 'UPSERT_BATCH_SIZE', 1)
+    price_store.ensure_price_table(create_engine(f'sqlite:///{db_path}', connect_args={'timeout': 1}))
+
+    assert count_rows(db_path) == 35
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'prices_legacy'").fetchone() is None
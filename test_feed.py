@@ -58,7 +58,7 @@ def run_test():
         
         if not events.empty():
             event = events.get()
-            print(f"Tick {i+1}: Event Received -> {event.type}")
+            print(f"Tick {i+1}: Event Received -> {event.type.name}")
             
             # Print the price
             latest = data.latest_symbol_data[tickers[0]][-1]
@@ -0,0 +1,47 @@
+# test_hedge_ratio.py
+import numpy as np
+import pandas as pd
+from src.hedge_ratio import RecursiveLeastSquares, KalmanHedgeRatio, hedge_ratio_path
+from src.pairs_strategy import PairsTradingStrategy
+from src.vectorized import backtest_pairs
+from conftest import make_db, make_pair, run_engine
+
+def test_rls_without_forgetting_is_ols():
+    rng = np.random.default_rng(0)
+    x = 50 + np.cumsum(rng.normal(0, 1, 500))
+    y = 1.3 * x + 4.0 + rng.normal(0, 0.5, 500)
+
+    rls = RecursiveLeastSquares(forgetting=1.0, delta=1e6)
+    for xt, yt in zip(x, y):
+        rls.update(xt, yt)
+    slope, intercept = np.polyfit(x, y, 1)
+    assert abs(rls.hedge_ratio - slope) < 1e-4
+    assert abs(rls.intercept - intercept) < 1e-2
+
+def test_online_estimators_track_a_drifting_ratio():
+    rng = np.random.default_rng(1)
+    x = 50 + np.cumsum(rng.normal(0, 1, 2000))
+    beta = np.linspace(0.8, 1.4, 2000)
+    y = beta * x + rng.normal(0, 0.2, 2000)
+
+    for estimator in [RecursiveLeastSquares(forgetting=0.98), KalmanHedgeRatio(delta=1e-4)]:
+        path = hedge_ratio_path(estimator, x, y)
+        # The estimate in force at each bar was fitted before that bar
+        assert path[0] == 1.0
+        error = np.abs(path[500:] - beta[500:])
+        assert np.median(error) < 0.05 and error.max() < 0.25
+
+def test_online_hedge_ratio_matches_between_event_and_vectorized(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    x, y = make_pair(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': x, 'CVX': y})
+
+    def make_strategy(data, events):
+        return PairsTradingStrategy(data, events, hedge_estimator=KalmanHedgeRatio(initial=1.0))
+    data, portfolio = run_engine(db_path, ['XOM', 'CVX'], make_strategy, clock='intersection')
+
+    closes = data.get_aligned_field('Close')
+    result = backtest_pairs(closes[0], closes[1], hedge_estimator=KalmanHedgeRatio(initial=1.0))
+    equity = np.array([h['Total'] for h in portfolio.all_holdings])
+    np.testing.assert_allclose(result['equity'], equity, rtol=0, atol=1e-6)
+    assert np.abs(np.diff(result['state'])).sum() >= 2
@@ -0,0 +1,51 @@
+# test_indicators.py
+import math
+import numpy as np
+import pandas as pd
+from src.data_handler import HistoricArrayDataHandler
+from src.event import EventQueue
+from conftest import make_db, make_bars
+
+def test_indicators_update_once_per_bar_and_match_pandas(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=60)
+    xom = make_bars(dates, seed=1)
+    cvx = make_bars(dates, seed=2).drop(dates[10:15])   # gaps: forward-filled ticks
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': xom, 'CVX': cvx})
+
+    data = HistoricArrayDataHandler(EventQueue(), db_path, ['XOM', 'CVX'], clock='union')
+    # Ten "strategies" asking for the same indicators share them
+    for _ in range(10):
+        sma = data.indicators.register('CVX', 'sma', 20)
+        data.indicators.register('CVX', 'ema', 10)
+        data.indicators.register('CVX', 'std', 20)
+        data.indicators.register('XOM', 'atr', 14)
+
+    seen = []
+    while True:
+        data.update_bars()
+        if not data.continue_backtest:
+            break
+        seen.append(data.indicators[sma])
+
+    # One update per new bar and indicator: 55 CVX bars x 3 + 60 XOM bars x 1
+    assert data.indicators.updates == 55 * 3 + 60
+    close = cvx['Close']
+    expected_sma = close.rolling(20).mean()
+    assert math.isnan(seen[18]) and abs(seen[-1] - expected_sma.iloc[-1]) < 1e-9
+    assert abs(data.indicators.get('CVX', 'ema', 10) - close.ewm(span=10, adjust=False).mean().iloc[-1]) < 1e-9
+    assert abs(data.indicators.get('CVX', 'std', 20) - close.iloc[-20:].std(ddof=0)) < 1e-9
+
+    high, low, prev = xom['High'], xom['Low'], xom['Close'].shift()
+    true_range = pd.concat([high - low, (high - prev).abs(), (low - prev).abs()], axis=1).max(axis=1)
+    atr = true_range.iloc[:14].mean()
+    for tr in true_range.iloc[14:]:
+        atr += (tr - atr) / 14
+    assert abs(data.indicators.get('XOM', 'atr', 14) - atr) < 1e-9
+
+    # A rewound handler replays from scratch with the same registrations
+    data.rewind()
+    data.update_bars()
+    assert math.isnan(data.indicators[sma])
+    assert not np.isnan(data.indicators.get('CVX', 'ema', 10))
+    # Counts start over too: one bar for each of the four indicators
+    assert data.indicators.updates == 4
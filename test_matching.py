@@ -0,0 +1,180 @@
+# test_matching.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_handler import HistoricArrayDataHandler
+from src.event import EventQueue, OrderEvent
+from src.execution import BarExecutionHandler
+from src.matching import MatchingExecutionHandler, OrderBook, RestingOrder
+from conftest import make_db
+
+def bar(open_, high, low, close=None, volume=1e6):
+    return {'Open': open_, 'High': high, 'Low': low, 'Close': close or open_, 'Volume': volume}
+
+def test_order_book_matches_best_price_first_with_partial_fills():
+    book = OrderBook()
+    orders = [RestingOrder(OrderEvent('XOM', 'LMT', 100, 'BUY', limit_price=p)) for p in (99.0, 101.0, 100.0)]
+    for order in orders:
+        book.add(order)
+    book.add(RestingOrder(OrderEvent('XOM', 'STP', 50, 'SELL', stop_price=95.0)))
+
+    # Low of 99.5 reaches the 101 and 100 limits, not 99 or the stop; 150 shares available
+    fills = book.match(bar(102.0, 103.0, 99.5), capacity=150)
+    assert [(o.price, q, p) for o, q, p, _ in fills] == [(101.0, 100, 101.0), (100.0, 50, 100.0)]
+    assert orders[2].remaining == 50 and len(book) == 3
+
+    # Gap down through everything: limits fill at the Open, the stop at the Open too
+    fills = book.match(bar(94.0, 94.5, 93.0))
+    assert [(q, p, stop) for _, q, p, stop in fills] == [(50, 94.0, False), (100, 94.0, False), (50, 94.0, True)]
+    assert len(book) == 0
+
+def test_order_book_caps_each_side_and_orders_books_by_time():
+    book = OrderBook()
+    buy_stop = RestingOrder(OrderEvent('XOM', 'STP', 100, 'BUY', stop_price=101.0))
+    buy_limit = RestingOrder(OrderEvent('XOM', 'LMT', 100, 'BUY', limit_price=100.0))
+    sell_limit = RestingOrder(OrderEvent('XOM', 'LMT', 100, 'SELL', limit_price=101.5))
+    for order in (buy_stop, buy_limit, sell_limit):
+        book.add(order)
+
+    # Both buys trigger (High 102, Low 99): the stop was placed first and
+    # takes 80 of the buy side's 80 shares; the sells have their own 80
+    fills = book.match(bar(100.5, 102.0, 99.0), capacity=80)
+    assert [(o, q) for o, q, _, _ in fills] == [(buy_stop, 80), (sell_limit, 80)]
+    assert buy_limit.remaining == 100
+
+def test_order_book_compacts_stale_entries():
+    book = OrderBook()
+    orders = [RestingOrder(OrderEvent('XOM', 'LMT', 10, 'BUY', limit_price=50.0 + i)) for i in range(100)]
+    for order in orders:
+        book.add(order)
+    # Replacing without ever matching leaves stale entries behind
+    for i in range(1000):
+        order = orders[i % 100]
+        book.discard(order)
+        order.active = True
+        book.add(order)
+
+    assert len(book) == 100
+    assert len(book.heaps[0]) <= 2 * len(book) + 1
+    fills = book.match(bar(200.0, 201.0, 40.0))
+    assert sorted(o.price for o, _, _, _ in fills) == [50.0 + i for i in range(100)]
+    assert len(book) == 0 and book.heaps[0] == []
+
+def test_bar_execution_rejects_resting_orders(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=2)
+    bars = pd.DataFrame({'Open': 100.0, 'High': 101.0, 'Low': 99.0, 'Close': 100.0, 'Volume': 1e6},
+                        index=pd.DatetimeIndex(dates, name='Date'))
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': bars})
+    broker = BarExecutionHandler(EventQueue(), HistoricArrayDataHandler(EventQueue(), db_path, ['XOM']))
+    with pytest.raises(ValueError):
+        broker.execute_order(OrderEvent('XOM', 'LMT', 100, 'BUY', limit_price=99.0))
+
+def test_matching_handler_rests_cancels_and_replaces(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=4)
+    bars = pd.DataFrame({
+        'Open': [100.0, 99.0, 97.0, 96.0],
+        'High': [101.0, 100.0, 98.0, 97.0],
+        'Low': [99.0, 97.5, 95.0, 94.0],
+        'Close': [100.0, 98.0, 96.0, 95.0],
+        'Volume': [1000.0, 1000.0, 1000.0, 1000.0],
+    }, index=pd.DatetimeIndex(dates, name='Date'))
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': bars})
+
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['XOM'])
+    broker = MatchingExecutionHandler(events, data, volume_limit=0.25)
+
+    def next_bar():
+        data.update_bars()
+        events.clear()
+        broker.flush()
+        fills = list(events)
+        events.clear()
+        return fills
+
+    next_bar()
+    # Placed on bar 0 (Low 99): must not fill against that bar
+    limit = OrderEvent('XOM', 'LMT', 400, 'BUY', limit_price=99.0)
+    doomed = OrderEvent('XOM', 'LMT', 100, 'BUY', limit_price=98.0)
+    broker.execute_order(limit)
+    broker.execute_order(doomed)
+    assert broker.flush() == 0 and not events
+    assert broker.cancel(doomed.order_id)
+    assert not broker.cancel(doomed.order_id)
+    # Cancelled before it was booked
+    late = OrderEvent('XOM', 'LMT', 100, 'BUY', limit_price=99.5)
+    broker.execute_order(late)
+    assert broker.cancel(late.order_id)
+    assert broker.flush() == 0 and len(broker.books['XOM']) == 1
+
+    # Bar 1 (Low 97.5): 250 of the 400 shares (25% of the Volume) at the limit
+    fills = next_bar()
+    assert [(f.quantity, f.fill_cost, f.timeindex) for f in fills] == [(250, 99.0, dates[1])]
+
+    # Cut to 100 open shares: it keeps its place and fills on bar 2
+    assert broker.replace(limit.order_id, quantity=100)
+    stop = OrderEvent('XOM', 'STP', 100, 'SELL', stop_price=90.0)
+    broker.execute_order(stop)
+    broker.flush()
+    fills = next_bar()
+    assert [(f.quantity, f.direction, f.fill_cost) for f in fills] == [(100, 'BUY', 97.0)]
+    assert limit.order_id not in broker.orders
+
+    # Raise the stop into bar 3's range (Low 94): fills at the stop
+    assert broker.replace(stop.order_id, stop_price=95.5)
+    fills = next_bar()
+    assert [(f.quantity, f.direction, f.fill_cost) for f in fills] == [(100, 'SELL', 95.5)]
+    assert broker.orders == {} and not broker._active
+
+def test_matching_handler_visits_only_triggered_orders(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=3)
+    bars = pd.DataFrame({'Open': 100.0, 'High': 101.0, 'Low': 99.0, 'Close': 100.0, 'Volume': 1e6},
+                        index=pd.DatetimeIndex(dates, name='Date'))
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': bars})
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['XOM'])
+    broker = MatchingExecutionHandler(events, data, volume_limit=None)
+
+    data.update_bars()
+    prices = np.linspace(50.0, 98.0, 5000)
+    for price in prices:
+        broker.execute_order(OrderEvent('XOM', 'LMT', 10, 'BUY', limit_price=float(price)))
+    broker.flush()
+    data.update_bars()
+    events.clear()
+
+    assert broker.flush() == 0
+    # None triggered: the book was only peeked at, nothing left it
+    assert len(broker.books['XOM']) == 5000
+    assert len(broker.books['XOM'].heaps[0]) == 5000
+
+def test_matching_handler_skips_nan_volume_bars_and_checks_replace_prices(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=3)
+    bars = pd.DataFrame({'Open': 100.0, 'High': 101.0, 'Low': 98.0, 'Close': 100.0,
+                         'Volume': [1000.0, np.nan, 1000.0]},
+                        index=pd.DatetimeIndex(dates, name='Date'))
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': bars})
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, ['XOM'])
+    broker = MatchingExecutionHandler(events, data, volume_limit=0.25)
+
+    data.update_bars()
+    limit = OrderEvent('XOM', 'LMT', 100, 'BUY', limit_price=99.0)
+    stop = OrderEvent('XOM', 'STP', 100, 'SELL', stop_price=90.0)
+    broker.execute_order(limit)
+    broker.execute_order(stop)
+    broker.flush()
+    with pytest.raises(ValueError):
+        broker.replace(stop.order_id, limit_price=95.0)
+    with pytest.raises(ValueError):
+        broker.replace(limit.order_id, stop_price=95.0)
+    assert stop.limit_price is None and limit.stop_price is None
+
+    # Bar 1 has no Volume: nothing trades; bar 2 fills the limit
+    data.update_bars()
+    events.clear()
+    assert broker.flush() == 0
+    data.update_bars()
+    events.clear()
+    assert broker.flush() == 1
+    assert [(f.quantity, f.fill_cost, f.timeindex) for f in events] == [(100, 99.0, dates[2])]
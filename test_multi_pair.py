@@ -0,0 +1,43 @@
+# test_multi_pair.py
+import numpy as np
+import pandas as pd
+from src.backtest import BacktestEngine
+from src.data_handler import HistoricArrayDataHandler
+from src.event import EventQueue
+from src.execution import SimulatedExecutionHandler
+from src.pairs_strategy import PairsTradingStrategy, MultiPairTradingStrategy
+from src.portfolio import Portfolio
+from conftest import make_db, make_pair
+
+def run(db_path, symbols, make_strategy):
+    events = EventQueue()
+    data = HistoricArrayDataHandler(events, db_path, symbols, clock='intersection')
+    portfolio = Portfolio(data, events, '2020-01-01', initial_capital=100000.0)
+    strategy = make_strategy(data, events)
+    BacktestEngine(data, strategy, portfolio, SimulatedExecutionHandler(events, data), events).run()
+    return portfolio
+
+def test_multi_pair_book_matches_separate_pair_runs(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=250)
+    frames, pairs = {}, []
+    for k, hedge_ratio in enumerate([1.055, 0.8, 1.3]):
+        x, y = make_pair(dates, hedge_ratio=hedge_ratio, seed=10 + k)
+        frames[f"X{k}"], frames[f"Y{k}"] = x, y
+        pairs.append((f"X{k}", f"Y{k}"))
+    db_path = make_db(tmp_path / 'prices.db', frames)
+    hedge_ratios = [1.055, 0.8, 1.3]
+
+    book = run(db_path, list(frames), lambda data, events: MultiPairTradingStrategy(
+        data, events, pairs, hedge_ratios, window=20))
+
+    # Each pair on its own: same trades, so the book is the sum of the runs
+    equity = np.zeros(len(book.all_holdings))
+    for (x, y), hedge_ratio in zip(pairs, hedge_ratios):
+        single = run(db_path, [x, y], lambda data, events: PairsTradingStrategy(
+            data, events, hedge_ratio=hedge_ratio, window=20))
+        equity += [h['Total'] - 100000.0 for h in single.all_holdings]
+        assert book.current_positions[x] == single.current_positions[x]
+        assert book.current_positions[y] == single.current_positions[y]
+
+    np.testing.assert_allclose([h['Total'] for h in book.all_holdings], equity + 100000.0, atol=1e-6)
+    assert np.ptp(equity) > 0   # the pairs did trade
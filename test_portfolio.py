@@ -1,8 +1,12 @@
 # test_portfolio.py
 import queue
+import numpy as np
+import pytest
 import pandas as pd
 from src.event import SignalEvent, FillEvent
-from src.portfolio import Portfolio
+from src.pairs_strategy import PairsTradingStrategy
+from src.portfolio import ArrayPortfolio, Portfolio
+from conftest import make_db, make_bars, make_pair, run_engine
 
 # Mock DataHandler (Fake Class just for testing)
 class MockHandler:
@@ -10,6 +14,10 @@ class MockHandler:
         self.symbol_list = ['ABBV']
         self.latest_symbol_data = {'ABBV': [{'Close': 70.00}]}
 
+class ArrayMockHandler(MockHandler):
+    def get_latest_bar_values(self, field='Close'):
+        return np.array([self.latest_symbol_data['ABBV'][-1][field]])
+
 def test_portfolio():
     print("--- Testing Portfolio Logic ---")
     
@@ -59,5 +67,89 @@ def test_portfolio():
     else:
         print(f"FAIL: Expected {expected_cash}, got {port.current_holdings['Cash']}")
 
+def test_array_portfolio_matches_portfolio(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    x, y = make_pair(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': x, 'CVX': y.drop(dates[50]),
+                                               'MSFT': make_bars(dates[10:], seed=2)})
+    symbols = ['XOM', 'CVX', 'MSFT']
+
+    _, expected = run_engine(db_path, symbols, PairsTradingStrategy, clock='union', fill_policy='skip')
+    _, port = run_engine(db_path, symbols, PairsTradingStrategy, portfolio_cls=ArrayPortfolio,
+                         clock='union', fill_policy='skip')
+
+    frame = port.holdings_frame()
+    assert list(frame.columns) == ['XOM', 'CVX', 'MSFT', 'Cash', 'Total']
+    assert len(frame) == len(expected.all_holdings) == len(port.all_holdings) == 300
+    np.testing.assert_allclose(frame.to_numpy(), pd.DataFrame(expected.all_holdings).to_numpy(),
+                               rtol=0, atol=1e-6)
+    assert port.all_holdings[-1] == pytest.approx(expected.all_holdings[-1])
+    assert dict(port.current_positions) == expected.current_positions
+    assert port.current_holdings['Cash'] == pytest.approx(expected.current_holdings['Cash'])
+
+    # The initial 1024 rows were never outgrown; the frame is a view of them
+    assert np.shares_memory(frame.to_numpy(), port._history)
+
+def test_array_portfolio_history_grows():
+    port = ArrayPortfolio(ArrayMockHandler(), queue.Queue(), '2020-01-01', capacity=2)
+    port.update_fill(FillEvent('2020-01-01', 'ABBV', 'ARCA', 100, 'BUY', 70.00, commission=5.00))
+    for _ in range(5):
+        port.update_timeindex()
+
+    assert len(port._history) == 8
+    assert port.current_positions['ABBV'] == 100
+    assert port.holdings_frame()['Total'].tolist() == [99995.0] * 5
+    assert port.all_holdings[-1] == {'ABBV': 7000.0, 'Cash': 92995.0, 'Total': 99995.0}
+
+def test_array_portfolio_runs_portfolio_fill_and_revalue_paths():
+    bars = ArrayMockHandler()
+    port = ArrayPortfolio(bars, queue.Queue(), '2020-01-01')
+    fill = FillEvent('2020-01-01', 'ABBV', 'ARCA', 100, 'BUY', 70.00, commission=5.00)
+    port.update_positions_from_fill(fill)
+    port.update_holdings_from_fill(fill)
+    assert port.current_positions['ABBV'] == 100
+    assert port.current_holdings['Cash'] == 92995.0
+
+    bars.latest_symbol_data['ABBV'].append({'Close': 72.00})
+    port.revalue()
+    assert port.current_holdings['ABBV'] == 7200.0
+    assert port.current_holdings['Total'] == 100195.0
+    assert port.max_revaluation_error == 0.0
+    assert len(port.all_holdings) == 0
+
+def test_incremental_marks_match_full_revaluation():
+    class WalkHandler:
+        def __init__(self, n_symbols):
+            self.symbol_list = [f"S{i}" for i in range(n_symbols)]
+            self.latest_symbol_data = {s: [] for s in self.symbol_list}
+            self.rng = np.random.default_rng(7)
+            self.prices = 50.0 + self.rng.random(n_symbols) * 50.0
+
+        def update_bars(self):
+            self.prices *= np.exp(self.rng.normal(0, 0.01, len(self.prices)))
+            for s, p in zip(self.symbol_list, self.prices):
+                # Leave the last symbol without bars for a while
+                if s != self.symbol_list[-1] or len(self.latest_symbol_data[s]) or self.rng.random() < 0.05:
+                    self.latest_symbol_data[s].append({'Close': p})
+
+    bars = WalkHandler(50)
+    incremental = Portfolio(bars, queue.Queue(), '2020-01-01', revalue_every=25)
+    full = Portfolio(bars, queue.Queue(), '2020-01-01', revalue_every=1)
+    rng = np.random.default_rng(11)
+    for t in range(300):
+        bars.update_bars()
+        for _ in range(3):
+            symbol = bars.symbol_list[rng.integers(len(bars.symbol_list))]
+            fill = FillEvent(t, symbol, 'ARCA', 100, rng.choice(['BUY', 'SELL']), 60.0)
+            incremental.update_fill(fill)
+            full.update_fill(fill)
+        incremental.update_timeindex()
+        full.update_timeindex()
+
+    np.testing.assert_allclose(pd.DataFrame(incremental.all_holdings).to_numpy(),
+                               pd.DataFrame(full.all_holdings).to_numpy(), rtol=0, atol=1e-6)
+    assert incremental.open_symbols == {s for s, q in full.current_positions.items() if q != 0}
+    assert incremental.max_revaluation_error < 1e-6
+
 if __name__ == "__main__":
-    test_portfolio()
\ No newline at end of file
+    test_portfolio()
@@ -0,0 +1,51 @@
+# test_rolling.py
+import numpy as np
+from src.rolling import RollingStats
+
+def test_rolling_stats_match_numpy_and_resync():
+    rng = np.random.default_rng(0)
+    values = 1000.0 + np.cumsum(rng.normal(0, 1, 5000))
+    stats = RollingStats(50, resync_every=10000)   # no periodic resync in this run
+
+    for i, v in enumerate(values):
+        stats.update(v)
+        assert stats.ready == (i >= 49)
+        window = values[max(0, i - 49):i + 1]
+        assert abs(stats.mean - window.mean()) < 1e-8
+        assert abs(stats.std - window.std()) <= 1e-6 * window.std()
+    # Memory is the fixed buffer, whatever the number of updates
+    assert stats.values.data.shape == (100,)
+
+    # A flat window is exactly flat (no drift left behind)
+    for _ in range(50):
+        stats.update(42.0)
+    assert stats.std == 0.0 and stats.mean == 42.0
+
+def test_rolling_stats_vector_with_missing_values():
+    stats = RollingStats(3, shape=(2,))
+    for row in [[np.nan, 1.0], [1.0, 2.0], [2.0, 3.0], [4.0, 4.0]]:
+        stats.update(row)
+    np.testing.assert_allclose(stats.mean, [7 / 3, 3.0])
+    np.testing.assert_allclose(stats.std, [np.std([1.0, 2.0, 4.0]), np.std([2.0, 3.0, 4.0])])
+
+def test_rolling_stats_resync_only_what_drifted():
+    stats = RollingStats(3, shape=(3,), resync_every=10000)
+    resyncs = []
+    resync = stats.resync
+    stats.resync = lambda mask=None: resyncs.append(mask) or resync(mask)
+
+    # Series 0 is flat, series 1 holds a NaN for a while, series 2 is ordinary
+    rows = [[5.0, 1.0, 1.0], [5.0, np.nan, 2.0], [5.0, 2.0, 4.0],
+            [5.0, 3.0, 3.0], [5.0, 4.0, 5.0], [5.0, 5.0, 8.0]]
+    for i, row in enumerate(rows):
+        stats.update(row)
+        if i in (1, 2, 3):
+            assert np.isnan(stats.mean[1]) and np.isnan(stats.var[1])
+    # A single resync, of series 1 only, when its NaN left the window
+    assert len(resyncs) == 1
+    np.testing.assert_array_equal(resyncs[0], [False, True, False])
+
+    window = np.array(rows[-3:])
+    np.testing.assert_allclose(stats.mean, window.mean(axis=0))
+    np.testing.assert_allclose(stats.var, window.var(axis=0))
+    assert stats.var[0] == 0.0
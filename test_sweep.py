@@ -0,0 +1,34 @@
+# test_sweep.py
+import numpy as np
+from src.analytics import max_drawdown
+from src.sweep import ParameterSweep, param_grid
+from conftest import make_pair_db
+
+def test_param_grid_and_drawdown():
+    assert param_grid({'window': [20, 30], 'entry_z': [2.0]}) == [
+        {'window': 20, 'entry_z': 2.0}, {'window': 30, 'entry_z': 2.0}]
+    assert max_drawdown([100.0, 120.0, 90.0, 130.0, 117.0]) == 0.25
+
+def test_sweep_vectorized_matches_event_loop(tmp_path):
+    db_path = make_pair_db(tmp_path)
+    grid = {'hedge_ratio': [1.055], 'window': [20, 30], 'entry_z': [1.5, 2.0], 'exit_z': [0.5]}
+
+    kwargs = dict(cache_dir=str(tmp_path / 'cache'), max_workers=2)
+    event = ParameterSweep(db_path, ['XOM', 'CVX'], **kwargs).run(grid)
+    vectorized = ParameterSweep(db_path, ['XOM', 'CVX'], vectorized=True, **kwargs).run(grid)
+
+    assert len(event) == 4
+    assert list(event.columns) == ['hedge_ratio', 'window', 'entry_z', 'exit_z',
+                                   'final_value', 'total_return', 'max_drawdown', 'sharpe']
+    metrics = ['final_value', 'total_return', 'max_drawdown', 'sharpe']
+    np.testing.assert_allclose(vectorized[metrics].to_numpy(), event[metrics].to_numpy(), atol=1e-6)
+
+def test_sweep_stops_early(tmp_path):
+    db_path = make_pair_db(tmp_path)
+    grid = {'window': list(range(10, 60)), 'entry_z': [2.0]}
+
+    sweep = ParameterSweep(db_path, ['XOM', 'CVX'], vectorized=True, cache_dir=str(tmp_path / 'cache'),
+                           max_workers=2, batch_size=1)
+    results = sweep.run(grid, on_result=lambda row: True)
+
+    assert 1 <= len(results) < 50
@@ -0,0 +1,38 @@
+# test_vectorized.py
+import numpy as np
+import pandas as pd
+from src.pairs_strategy import PairsTradingStrategy
+from src.strategy import BuyAndHoldStrategy
+from src.vectorized import backtest_pairs, backtest_buy_and_hold
+from conftest import make_db, make_bars, make_pair, run_engine
+
+def test_vectorized_pairs_reproduces_event_portfolio(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=400)
+    x, y = make_pair(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': x, 'CVX': y.drop(dates[50])})
+
+    data, portfolio = run_engine(db_path, ['XOM', 'CVX'], PairsTradingStrategy, clock='intersection')
+    closes = data.get_aligned_field('Close')
+    result = backtest_pairs(closes[0], closes[1], hedge_ratio=1.055)
+
+    equity = np.array([h['Total'] for h in portfolio.all_holdings])
+    assert len(equity) == len(dates) - 1
+    assert np.abs(np.diff(result['state'])).sum() >= 4   # it actually traded
+    np.testing.assert_allclose(result['equity'], equity, rtol=0, atol=1e-6)
+    assert result['positions'][0, -1] == portfolio.current_positions['XOM']
+    assert result['positions'][1, -1] == portfolio.current_positions['CVX']
+    np.testing.assert_allclose(result['cash'][-1], portfolio.current_holdings['Cash'], atol=1e-6)
+
+def test_vectorized_buy_and_hold_reproduces_event_portfolio(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=30)
+    db_path = make_db(tmp_path / 'prices.db', {
+        'ABBV': make_bars(dates, seed=1),
+        'MSFT': make_bars(dates[5:], seed=2),
+    })
+
+    data, portfolio = run_engine(db_path, ['ABBV', 'MSFT'], BuyAndHoldStrategy, clock='union')
+    result = backtest_buy_and_hold(data.get_aligned_field('Close'))
+
+    equity = np.array([h['Total'] for h in portfolio.all_holdings])
+    np.testing.assert_allclose(result['equity'], equity, rtol=0, atol=1e-6)
+    assert list(result['positions'][:, -1]) == [100, 100]
@@ -0,0 +1,58 @@
+# test_walk_forward.py
+import numpy as np
+import pandas as pd
+from src.walk_forward import WalkForward, walk_forward_folds
+from conftest import make_db, make_pair
+
+def test_walk_forward_folds_never_look_ahead():
+    folds = walk_forward_folds(100, train_size=40, test_size=20)
+    assert folds == [(0, 40, 60), (20, 60, 80), (40, 80, 100)]
+    # Extending the history only appends folds
+    assert walk_forward_folds(130, 40, 20)[:3] == folds
+
+def test_walk_forward_caches_folds_and_computes_only_new_ones(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=260)
+    x, y = make_pair(dates)
+    grid = {'window': [10, 20], 'entry_z': [1.5, 2.0], 'exit_z': [0.5]}
+    cache_dir = str(tmp_path / 'folds')
+
+    (tmp_path / 'short').mkdir()
+    (tmp_path / 'long').mkdir()
+    short_db = make_db(tmp_path / 'short' / 'prices.db', {'XOM': x.iloc[:200], 'CVX': y.iloc[:200]})
+    wf = WalkForward(short_db, ['XOM', 'CVX'], train_size=80, test_size=40, grid=grid,
+                     cache_dir=cache_dir, max_workers=2)
+    first = wf.run()
+    assert len(first) == 3
+    assert not first['cached'].any()
+    # Test slices follow their train slices and tile the out-of-sample period
+    assert (first['test_start'] > first['train_start']).all()
+    assert len(wf.equity) == 3 * 40
+    assert wf.equity.index.is_monotonic_increasing
+
+    first_equity = wf.equity
+
+    # Same history plus 60 more bars
+    long_db = make_db(tmp_path / 'long' / 'prices.db', {'XOM': x, 'CVX': y})
+    wf = WalkForward(long_db, ['XOM', 'CVX'], train_size=80, test_size=40, grid=grid,
+                     cache_dir=cache_dir, max_workers=2)
+    second = wf.run()
+    assert len(second) == 4
+    assert list(second['cached']) == [True, True, True, False]
+    cols = ['hedge_ratio', 'window', 'entry_z', 'exit_z', 'test_return']
+    pd.testing.assert_frame_equal(second[cols].iloc[:3], first[cols])
+    np.testing.assert_allclose(wf.equity.iloc[:120].to_numpy(), first_equity.to_numpy())
+
+def test_walk_forward_records_folds_without_a_usable_combination(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=120)
+    x, y = make_pair(dates)
+    db_path = make_db(tmp_path / 'prices.db', {'XOM': x, 'CVX': y})
+    grid = {'window': [10], 'entry_z': [0.5], 'exit_z': [1.0]}
+
+    wf = WalkForward(db_path, ['XOM', 'CVX'], train_size=60, test_size=30, grid=grid,
+                     cache_dir=str(tmp_path / 'folds'), max_workers=1)
+    table = wf.run()
+    assert len(table) == 2
+    assert (table['skipped'] == "no grid combination has exit_z <= entry_z").all()
+    assert table['test_return'].tolist() == [0.0, 0.0]
+    # The skipped folds hold cash, so the stitched curve stays flat
+    assert len(wf.equity) == 60 and (wf.equity == 100000.0).all()
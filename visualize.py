@@ -9,59 +9,40 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 # ----------------
 
-from src.data_handler import HistoricSQLDataHandler
+from src.data_handler import MemmapDataHandler
 from src.pairs_strategy import PairsTradingStrategy
-from src.portfolio import Portfolio
+from src.portfolio import ArrayPortfolio
 from src.execution import SimulatedExecutionHandler
-import queue
+from src.event import EventQueue, EventType
+from src.backtest import BacktestEngine
 
 def run_and_plot():
     print("--- Re-Running Simulation for Visualization ---")
     
     # 1. Setup Engine
-    events = queue.Queue()
+    events = EventQueue()
     db_path = os.path.join(current_dir, 'data', 'market_data.db')
     symbol_list = ['XOM', 'CVX']
     
-    data = HistoricSQLDataHandler(events, db_path, symbol_list)
-    portfolio = Portfolio(data, events, '2020-01-01', initial_capital=100000.0)
+    data = MemmapDataHandler(events, db_path, symbol_list, clock='intersection')
+    portfolio = ArrayPortfolio(data, events, '2020-01-01', initial_capital=100000.0,
+                               capacity=len(data.timeline))
     strategy = PairsTradingStrategy(data, events, hedge_ratio=1.0552)
-    broker = SimulatedExecutionHandler(events)
+    broker = SimulatedExecutionHandler(events, data)
     
     # 2. Run Loop
     print("Processing Data...")
-    while True:
-        if data.continue_backtest:
-            data.update_bars()
-        else:
-            break
-        
-        while True:
-            try:
-                event = events.get(False)
-            except queue.Empty:
-                break
-            
-            if event.type == 'MARKET':
-                strategy.calculate_xy_signals(event)
-                portfolio.update_timeindex()
-            elif event.type == 'SIGNAL':
-                portfolio.update_signal(event)
-            elif event.type == 'ORDER':
-                broker.execute_order(event)
-            elif event.type == 'FILL':
-                latest_bar = data.get_latest_bar(event.symbol)
-                if latest_bar:
-                    event.fill_cost = latest_bar[1]['Close']
-                portfolio.update_fill(event)
+    engine = BacktestEngine(data, strategy, portfolio, broker, events)
+    # Record the strategy's Z-score once per bar (one entry per equity point)
+    z_scores = []
+    engine.add_listener(EventType.MARKET, lambda event: z_scores.append(strategy.z_score))
+    engine.run()
 
     # 3. Extract Data for Plotting
     print("Generating Charts...")
     
-    # Convert portfolio history to DataFrame
-    curve = pd.DataFrame(portfolio.all_holdings)
-    # The 'all_holdings' list doesn't have dates by default in our simple Portfolio class
-    # We need to rely on the index being sequential days.
+    # Portfolio history as a DataFrame (a view, no copy), one row per bar
+    curve = portfolio.holdings_frame()
     
     # Create the Plot
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
@@ -74,13 +55,10 @@ def run_and_plot():
     ax1.grid(True, alpha=0.3)
     
     # Plot 2: Z-Score Signals
-    # We'll extract Z-scores from the strategy history
-    z_scores = strategy.spread_history
-    # We need to align lengths (strategy starts calculating after 'window' days)
-    # This is a rough visualization, so simple slicing is fine for now
+    # NaN during the warm-up window, so both plots share the same x axis
     ax2.plot(z_scores, label='Spread Z-Score', color='blue', alpha=0.6)
-    ax2.axhline(2.0, color='red', linestyle='--', label='Short Threshold (+2)')
-    ax2.axhline(-2.0, color='green', linestyle='--', label='Long Threshold (-2)')
+    ax2.axhline(strategy.entry_z, color='red', linestyle='--', label=f'Short Threshold (+{strategy.entry_z})')
+    ax2.axhline(-strategy.entry_z, color='green', linestyle='--', label=f'Long Threshold (-{strategy.entry_z})')
     ax2.set_title('Z-Score & Trade Signals')
     ax2.legend()
     ax2.grid(True, alpha=0.3)
@@ -0,0 +1,29 @@
+# walk_forward.py
+import os
+import sys
+
+# --- PATH FIX ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+# ----------------
+
+from src.walk_forward import WalkForward
+
+def run_walk_forward():
+    db_path = os.path.join(current_dir, 'data', 'market_data.db')
+    symbol_list = ['XOM', 'CVX']
+
+    # One year to fit, the next quarter to trade, then roll forward a quarter.
+    # Folds already computed are read from data/walk_forward_cache/.
+    wf = WalkForward(db_path, symbol_list, train_size=252, test_size=63)
+    folds = wf.run()
+
+    if folds.empty:
+        return
+    print("\n--- Folds (out-of-sample) ---")
+    columns = ['test_start', 'test_end', 'hedge_ratio', 'window', 'entry_z', 'exit_z',
+               'train_return', 'test_return', 'test_max_drawdown', 'cached']
+    print(folds[columns].to_string())
+
+if __name__ == "__main__":
+    run_walk_forward()